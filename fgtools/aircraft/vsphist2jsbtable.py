@@ -5,8 +5,6 @@ import argparse
 import os, sys
 import math
 
-import scipy.interpolate
-
 from fgtools.utils.interpolator import Interpolator
 from fgtools.utils import range
 
@@ -111,6 +109,8 @@ def get_raw_coeffs(cases, coeff):
 	return coeffs
 
 def get_interpolated_coeffs(cases, coeff, alphas, betas, symmetrize):
+	import scipy.interpolate
+	
 	coeffs = get_raw_coeffs(cases, coeff)
 	ralphas = list(coeffs.keys())
 	rbetas = list(coeffs[ralphas[0]].keys())
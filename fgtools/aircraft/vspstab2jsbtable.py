@@ -5,8 +5,6 @@ import argparse
 import os, sys
 import math
 
-import scipy.interpolate
-
 from fgtools.utils.interpolator import Interpolator
 from fgtools.utils import range
 
@@ -114,6 +112,8 @@ def get_raw_coeffs(cases, axis, coeff):
 	return coeffs
 
 def get_interpolated_coeffs(cases, axis, coeff, alphas, betas, symmetrize):
+	import scipy.interpolate
+	
 	coeffs = get_raw_coeffs(cases, axis, coeff)
 	ralphas = list(coeffs.keys())
 	rbetas = list(coeffs[ralphas[0]].keys())
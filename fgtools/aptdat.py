@@ -3,65 +3,107 @@
 
 import logging
 import os
+import hashlib
+import math
+import io
+import json
+import threading
+import concurrent.futures
 
+import numpy
 from plum import dispatch
 
 from fgtools.utils import files
+from fgtools.utils import constants
+from fgtools.utils.progress import Progress
 from fgtools import geo
 from fgtools.utils import unit_convert
 from fgtools import utils
-from fgtools.geo.rectangle import Rectangle
+from fgtools.geo.rectangle import make_rectangle
 
-class Code:
-	def __init__(self, name, code):
+# A single apt.dat code value - an int carrying its symbolic name, so codes can be written
+# out, compared and used as dict / set keys like plain ints. Codes don't compare equal to their
+# name, look names up in the CodeEnum instead, like SurfaceCode["Asphalt"].
+class Code(int):
+	def __new__(cls, name, code):
+		self = int.__new__(cls, code)
 		self.name = name
-		self.code = code
+		return self
+	
+	def __getnewargs__(self):
+		return (self.name, int(self))
+	
+	@property
+	def code(self):
+		return int(self)
 	
 	def __str__(self):
 		return self.name
 	
 	def __repr__(self):
-		return str(self.code)
+		return int.__repr__(self)
 	
-	def __int__(self):
-		return self.code
-	
-	def __float__(self):
-		return float(self.code)
+	def __format__(self, spec):
+		return int.__format__(int(self), spec)
 	
 	def __eq__(self, other):
-		if isinstance(other, Code):
-			return self.name == other.name
-		elif isinstance(other, str):
-			return self.name == other
-		elif isinstance(other, int):
-			return self.code == other
+		if self is other:
+			return True
+		elif isinstance(other, Code):
+			return int.__eq__(self, other) and self.name == other.name
+		return int.__eq__(self, other)
 	
 	def __ne__(self, other):
-		if isinstance(other, Code):
-			return self.name != other.name
-		elif isinstance(other, str):
-			return self.name != other
-		elif isinstance(other, int):
-			return self.code != other
+		result = self.__eq__(other)
+		if result is NotImplemented:
+			return result
+		return not result
+	
+	__hash__ = int.__hash__
 
+# Set of interned Code singletons - all codes are created once, lookups by int code, by
+# name or by the code as it appears in an apt.dat line go through a single prebuilt table
 class CodeEnum:
-    def __init__(self, names, codes, default_key=None):
-        self._codemap = {}
-        for name, code in zip(names, codes):
-            codeobject = Code(name, code)
-            setattr(self, name, codeobject)
-            self._codemap[code] = codeobject
-
-        self._default_key = default_key
-
-    def __getitem__(self, key):
-        if key in self._codemap:
-            return self._codemap[key]
-        elif self._default_key is not None:
-            return self._codemap[self._default_key]
-        else:
-            raise KeyError(f"Key {key} not found and no default specified.")
+	def __init__(self, names, codes, default_key=None):
+		self._codes = []
+		self._lookup = {}
+		for name, code in zip(names, codes):
+			codeobject = Code(name, code)
+			setattr(self, name, codeobject)
+			self._codes.append(codeobject)
+			self._lookup[code] = codeobject
+			self._lookup[str(code)] = codeobject
+		for codeobject in self._codes:
+			self._lookup.setdefault(codeobject.name, codeobject)
+		
+		self._default_key = default_key
+	
+	def __getitem__(self, key):
+		codeobject = self._lookup.get(key)
+		if codeobject is None:
+			# tolerate tokens like "01" or " 1" that are not in the table verbatim
+			if key.__class__ is str:
+				try:
+					codeobject = self._lookup.get(int(key))
+				except ValueError:
+					pass
+			if codeobject is None:
+				if self._default_key is None:
+					raise KeyError(f"Key {key} not found and no default specified.")
+				codeobject = self._lookup[self._default_key]
+		return codeobject
+	
+	def get(self, key, default=None):
+		return self._lookup.get(key, default)
+	
+	def __contains__(self, key):
+		return key in self._lookup
+	
+	def __iter__(self):
+		return iter(self._codes)
+	
+	def __len__(self):
+		return len(self._codes)
 
 
 SurfaceCode = CodeEnum(
@@ -147,6 +189,9 @@ AirportType = CodeEnum(
     default_key=1
 )
 
+# Size of the write buffer used for apt.dat output files
+WRITE_BUFFER_SIZE = 1 << 20
+
 class Object:
 	def __init__(self):
 		pass
@@ -154,9 +199,13 @@ class Object:
 	def read(self, line):
 		pass
 	
-	def write(self, f):
+	def format(self):
 		if None in vars(self).values():
-			raise RuntimeError("object fields " + list(filter(lambda item: item[1] == None, vars(self).items())) + " are uninitialized")
+			raise RuntimeError("object fields " + str([key for key, value in vars(self).items() if value is None]) + " are uninitialized")
+		return ""
+	
+	def write(self, f):
+		f.write(self.format())
 
 class Helipad(Object):
 	@dispatch
@@ -182,17 +231,16 @@ class Helipad(Object):
 	
 	def read(self, line):
 		Object.read(self, line)
-		print(line)
 		self.id, self.lat, self.lon, self.heading, self.length, self.width, self.surface, self.markings, self.shoulder, self.smoothness, self.edge_lights = \
-						line[1], float(line[2]), float(line[3]), float(line[4]), float(line[5]), float(line[6]), SurfaceCode[int(line[7])], \
-						int(line[8]), RunwayShoulderCode[int(line[9])], float(line[10]), bool(int(line[11]))
+						line[1], float(line[2]), float(line[3]), float(line[4]), float(line[5]), float(line[6]), SurfaceCode[line[7]], \
+						int(line[8]), RunwayShoulderCode[line[9]], float(line[10]), bool(int(line[11]))
 	
-	def write(self, f):
-		Object.write(self. f)
-		f.write((f"102 {self.id} {float(self.lat)} {float(self.lon)} {float(self.heading)} {float(self.length):.2f}" +
-				f" {float(self.width):.2f} {int(self.surface)} {int(self.markings)} {int(self.shoulder)} {float(self.smoothness):.2f} {int(self.edge_lights)}\n"))
+	def format(self):
+		Object.format(self)
+		return (f"102 {self.id} {float(self.lat)} {float(self.lon)} {float(self.heading)} {float(self.length):.2f}" +
+				f" {float(self.width):.2f} {int(self.surface)} {int(self.markings)} {int(self.shoulder)} {float(self.smoothness):.2f} {int(self.edge_lights)}\n")
 
-class Runway:
+class Runway(Object):
 	@dispatch
 	def __init__(self, width, id1, lon1, lat1, id2, lon2, lat2):
 		Object.__init__(self)
@@ -224,8 +272,8 @@ class Runway:
 	def read(self, line):
 		Object.read(self, line)
 	
-	def write(self, f):
-		Object.write(self. f)
+	def format(self):
+		return Object.format(self)
 
 class WaterRunway(Runway):
 	@dispatch
@@ -243,10 +291,10 @@ class WaterRunway(Runway):
 		self.width, self.perimeter_buoys, self.id1, self.lat1, self.lon1, self.id2, self.lat2, self.lon2 = \
 						float(line[1]), bool(int(line[2])), line[3], float(line[4]), float(line[5]), line[6], float(line[7]), float(line[8])
 	
-	def write(self, f):
-		Runway.write(self, f)
-		f.write((f"101 {float(self.width):.2f} {int(self.perimeter_buoys)} {self.id1} {float(self.lat1):.8f}" + 
-				f" {float(self.lon1):.8f} {self.id2} {float(self.lat2):.8f} {float(self.lon2):.8f}\n"))
+	def format(self):
+		Runway.format(self)
+		return (f"101 {float(self.width):.2f} {int(self.perimeter_buoys)} {self.id1} {float(self.lat1):.8f}" + 
+				f" {float(self.lon1):.8f} {self.id2} {float(self.lat2):.8f} {float(self.lon2):.8f}\n")
 
 class LandRunway(Runway):
 	@dispatch
@@ -300,21 +348,21 @@ class LandRunway(Runway):
 			self.markings1, self.appr_lights1, self.tdz_lights1, self.reil_type1, \
 			self.id2, self.lat2, self.lon2, self.displ_thresh2, self.blastpad2, \
 			self.markings2, self.appr_lights2, self.tdz_lights2, self.reil_type2 = \
-						float(line[1]), SurfaceCode[int(line[2])], RunwayShoulderCode[shoulder_code], float(line[4]), \
+						float(line[1]), SurfaceCode[line[2]], RunwayShoulderCode[shoulder_code], float(line[4]), \
 						bool(int(line[5])), bool(int(line[6])), bool(int(line[7])), \
 						line[8], float(line[9]), float(line[10]), float(line[11]), float(line[12]), \
-						RunwayMarkingCode[int(line[13])], ApproachLightsCode[int(line[14])], bool(int(line[15])), REILCode[int(line[16])], \
+						RunwayMarkingCode[line[13]], ApproachLightsCode[line[14]], bool(int(line[15])), REILCode[line[16]], \
 						line[17], float(line[18]), float(line[19]), float(line[20]), float(line[21]), \
-						RunwayMarkingCode[int(line[22])], ApproachLightsCode[int(line[23])], bool(int(line[24])), REILCode[int(line[25])]
+						RunwayMarkingCode[line[22]], ApproachLightsCode[line[23]], bool(int(line[24])), REILCode[line[25]]
 	
-	def write(self, f):
-		Runway.write(self, f)
-		f.write((f"100 {float(self.width):.2f} {int(self.surface)} {int(self.shoulder) + int(self.shoulder_width * 100 * 2)} {float(self.smoothness)} {int(self.center_lights)}" +
+	def format(self):
+		Runway.format(self)
+		return (f"100 {float(self.width):.2f} {int(self.surface)} {int(self.shoulder) + int(self.shoulder_width * 100 * 2)} {float(self.smoothness)} {int(self.center_lights)}" +
 				f" {int(self.edge_lights)} {int(self.distance_signs)}" + 
 				f" {self.id1} {float(self.lat1):.8f} {float(self.lon1):.8f} {float(self.displ_thresh1):.2f} {float(self.blastpad1):.2f} {int(self.markings1)}" + 
 				f" {int(self.appr_lights1)} {int(self.tdz_lights1)} {int(self.reil_type1)}" + 
 				f" {self.id2} {float(self.lat2):.8f} {float(self.lon2):.8f} {float(self.displ_thresh2):.2f} {float(self.blastpad2):.2f} {int(self.markings2)}" + 
-				f" {int(self.appr_lights2)} {int(self.tdz_lights2)} {int(self.reil_type2)}\n"))
+				f" {int(self.appr_lights2)} {int(self.tdz_lights2)} {int(self.reil_type2)}\n")
 
 class Metadata(Object):
 	@dispatch
@@ -333,21 +381,14 @@ class Metadata(Object):
 		Object.read(self, line)
 		self.key, self.value = line[1], " ".join(line[2:])
 	
-	def write(self, f):
-		Object.write(self, f)
-		f.write(f"1302 {key} {value}\n")
+	def format(self):
+		Object.format(self)
+		return f"1302 {self.key} {self.value}\n"
 
 class Airport:
 	@dispatch
 	def __init__(self, elev, icao, name, bbox, lon, lat, type=AirportType.Land):
-		self.metadata = {}
-		self.runways = {}
-		self.helipads = {}
-		self.parkings = []
-		self.aprons = []
-		self.tower = None
-		self.windsocks = []
-		self.beacons = []
+		self._init_members()
 		
 		self.elev = elev
 		self.icao = icao
@@ -359,6 +400,10 @@ class Airport:
 	
 	@dispatch
 	def __init__(self):
+		self._init_members()
+		self.elev = self.icao = self.type = self.bbox = self.lon = self.lat = None
+	
+	def _init_members(self):
 		self.metadata = {}
 		self.runways = {}
 		self.helipads = {}
@@ -367,8 +412,6 @@ class Airport:
 		self.tower = None
 		self.windsocks = []
 		self.beacons = []
-		
-		self.elev = self.icao = self.type = self.bbox = self.lon = self.lat = None
 	
 	def __repr__(self):
 		return f"Airport(elev={self.elev}, icao={self.icao}, type={self.type}, bbox={self.bbox})"
@@ -388,9 +431,9 @@ class Airport:
 		else:
 			return
 		line = line.split()
-		self.type, self.elev, _, _, self.icao = AirportType[int(line[0])], float(line[1]), line[2], line[3], line[4]
+		self.type, self.elev, _, _, self.icao = AirportType[line[0]], float(line[1]), line[2], line[3], line[4]
 		if len(line) > 5:
-			self.name = " ".join(line[5])
+			self.name = " ".join(line[5:])
 		else:
 			self.name = ""
 		
@@ -408,67 +451,120 @@ class Airport:
 				break
 			
 			if rowcode == 100:
-				obj = LandRunway()
+				obj = LandRunway.__new__(LandRunway)
 				obj.read(line)
 				self.add_runway(obj)
 			elif rowcode == 101:
-				obj = WaterRunway()
+				obj = WaterRunway.__new__(WaterRunway)
 				obj.read(line)
 				self.add_runway(obj)
 			elif rowcode == 102:
-				obj = Helipad()
+				obj = Helipad.__new__(Helipad)
 				obj.read(line)
 				self.add_helipad(obj)
 			elif rowcode == 1302:
-				obj = Metadata()
+				obj = Metadata.__new__(Metadata)
 				obj.read(line)
 				self.metadata[obj.key] = obj
 			
 			last_line_start = f.tell()
 		
-		runway_lons = list(map(lambda id: self.runways[id].lon1, self.runways)) + list(map(lambda id: self.runways[id].lon2, self.runways))
-		runway_lats = list(map(lambda id: self.runways[id].lat1, self.runways)) + list(map(lambda id: self.runways[id].lat2, self.runways))
-		helipad_lons = list(map(lambda id: self.helipads[id].lon, self.helipads))
-		helipad_lats = list(map(lambda id: self.helipads[id].lat, self.helipads))
-		min_lon = min(runway_lons + helipad_lons)
-		max_lon = max(runway_lons + helipad_lons)
-		min_lat = min(runway_lats + helipad_lats)
-		max_lat = min(runway_lats + helipad_lats)
-		self.bbox = Rectangle((float(min_lon), float(min_lat)), (float(max_lon), float(max_lat)))
+		lons, lats = self.get_endpoints()
+		if lons:
+			self.bbox = make_rectangle(float(min(lons)), float(min(lats)), float(max(lons)), float(max(lats)))
 		
-		try:
-			self.lon = float(self.metadata["datum_lon"].value)
-			self.lat = float(self.metadata["datum_lat"].value)
-		except:
+		datum = self.get_datum()
+		if datum:
+			self.lon, self.lat = datum
+		elif self.bbox:
 			self.lon = self.bbox.midpoint().lon
 			self.lat = self.bbox.midpoint().lat
-		
-	def write(self, f):
+	
+	# Longitudes and latitudes of all runway ends and helipads
+	def get_endpoints(self):
+		lons = []
+		lats = []
+		for runway in self.runways.values():
+			lons += (runway.lon1, runway.lon2)
+			lats += (runway.lat1, runway.lat2)
+		for helipad in self.helipads.values():
+			lons.append(helipad.lon)
+			lats.append(helipad.lat)
+		return lons, lats
+	
+	def get_datum(self):
+		if "datum_lon" in self.metadata and "datum_lat" in self.metadata:
+			try:
+				return float(self.metadata["datum_lon"].value), float(self.metadata["datum_lat"].value)
+			except ValueError:
+				pass
+		return None
+	
+	def format(self):
 		if None in (self.elev, self.icao, self.name, self.type, self.lon, self.lat):
-			raise RuntimeError("object fields " + list(filter(lambda item: item[1] == None, vars(self).items())) + " are uninitialized")
-		f.write(f"{repr(self.type)} {float(self.elev):.2f} 0 0 {self.icao} {self.name}\n")
-		
-		for metadata in self.metadata:
-			metadata.write(f)
+			raise RuntimeError("object fields " + str([key for key, value in vars(self).items() if value is None]) + " are uninitialized")
+		parts = [f"{repr(self.type)} {float(self.elev):.2f} 0 0 {self.icao} {self.name}\n"]
 		
-		for id in self.runways:
-			self.runways[id].write(f)
-		for id in self.helipads:
-			self.helipads[id].write(f)
-		for parking in self.parkings:
-			parking.write(f)
-		for apron in self.aprons:
-			apron.write(f)
-		if self._tower:
-			self.tower.write(f)
-		for windsock in self.windsocks:
-			windsock.write(f)
-		for beacon in self.beacons:
-			beacon.write(f)
+		parts.extend(metadata.format() for metadata in self.metadata.values())
+		parts.extend(runway.format() for runway in self.runways.values())
+		parts.extend(helipad.format() for helipad in self.helipads.values())
+		parts.extend(parking.format() for parking in self.parkings)
+		parts.extend(apron.format() for apron in self.aprons)
+		if self.tower:
+			parts.append(self.tower.format())
+		parts.extend(windsock.format() for windsock in self.windsocks)
+		parts.extend(beacon.format() for beacon in self.beacons)
+		return "".join(parts)
+	
+	def write(self, f):
+		f.write(self.format())
+
+# Dispatch-free version of Airport() for the parsers - resolving the overloaded constructor takes longer than
+# reading a small airport. Runways, helipads and metadata rows are created with __new__ directly since read() sets all their fields.
+def new_airport():
+	airport = Airport.__new__(Airport)
+	airport._init_members()
+	airport.elev = airport.icao = airport.type = airport.bbox = airport.lon = airport.lat = None
+	return airport
+
+# Compute the bounding boxes and datums of many airports at once
+# @param airports -> list 	Airport objects
+# @return tuple 			(n, 4) array of left, bottom, right, top and (n, 2) array of datum lon, lat -
+#							bounding boxes of airports without runways and helipads are NaN
+def get_airport_extents(airports):
+	counts = []
+	lons = []
+	lats = []
+	for airport in airports:
+		airport_lons, airport_lats = airport.get_endpoints()
+		lons += airport_lons
+		lats += airport_lats
+		counts.append(len(airport_lons))
+	
+	counts = numpy.array(counts, dtype=numpy.int64)
+	lons = numpy.array(lons, dtype=numpy.float64)
+	lats = numpy.array(lats, dtype=numpy.float64)
+	bboxes = numpy.full((len(counts), 4), numpy.nan)
+	nonempty = counts > 0
+	if nonempty.any():
+		# the points of each airport are contiguous, so each airport is one reduceat segment
+		starts = (numpy.cumsum(counts) - counts)[nonempty]
+		bboxes[nonempty, 0] = numpy.minimum.reduceat(lons, starts)
+		bboxes[nonempty, 1] = numpy.minimum.reduceat(lats, starts)
+		bboxes[nonempty, 2] = numpy.maximum.reduceat(lons, starts)
+		bboxes[nonempty, 3] = numpy.maximum.reduceat(lats, starts)
+	
+	datums = numpy.column_stack(((bboxes[:, 0] + bboxes[:, 2]) / 2, (bboxes[:, 1] + bboxes[:, 3]) / 2))
+	for i, airport in enumerate(airports):
+		datum = airport.get_datum()
+		if datum:
+			datums[i] = datum
+	return bboxes, datums
 
 class ReaderWriterAptDat:
 	def __init__(self, file_header="Generated by fgtools.aptdat.ReaderWriterAptDat"):
 		self._airports = []
+		self._indices = []
 		self.file_header = file_header
 	
 	def _get_airport_index(self, icao):
@@ -486,9 +582,28 @@ class ReaderWriterAptDat:
 			self.add_airport(airport)
 	
 	def get_airport(self, icao):
-		i = _get_airport_index(icao)
+		i = self._get_airport_index(icao)
 		if i > -1:
 			return self._airports[i]
+		for index in self._indices:
+			if icao in index:
+				return index.read_airport(icao)
+	
+	# Make the airports in path available to get_airport / get_airports_in_bbox without reading the whole file
+	def open_index(self, path):
+		index = AptDatIndex.load(path)
+		self._indices.append(index)
+		return index
+	
+	def get_airports_in_bbox(self, bbox):
+		airports = [airport for airport in self._airports if airport.lon is not None and bbox.is_inside(geo.make_coord(airport.lon, airport.lat))]
+		icaos = set(airport.icao for airport in airports)
+		for index in self._indices:
+			for icao in index.query_bbox(bbox.left, bbox.bottom, bbox.right, bbox.top):
+				if icao not in icaos:
+					icaos.add(icao)
+					airports.append(index.read_airport(icao))
+		return airports
 	
 	def get_airports(self, icaos=None):
 		if icaos == None:
@@ -538,7 +653,7 @@ class ReaderWriterAptDat:
 			f.readline()
 			
 			while f.tell() != file_size:
-				airport = Airport()
+				airport = new_airport()
 				airport.read(f)
 				self.add_airport(airport)
 	
@@ -554,66 +669,419 @@ class ReaderWriterAptDat:
 	#									output_path as positional argument, will be called only if path actually
 	#									exists and is a file
 	# @return bool 						0 on success, 1 if the apt.dat file already exists and overwrite == False
-	def write(self, output, merge=False, overwrite=False, overwrite_func=None):
+	def write(self, output, merge=False, overwrite=False, overwrite_func=None, num_threads=0):
 		if len(self._airports) == 0:
 			print("ReaderWriterAptDat has no airports - not writing anything !")
 			return 1
 		if merge:
-			exists = files.check_exists(output, type="file", exit=False)
-			if exists == 2:
+			if os.path.isdir(output):
 				output = os.path.join(output, "apt.dat")
 			
-			exists = files.check_exists(output, type="file", exit=False)
-			if exists == 1:
+			if os.path.isfile(output):
 				if callable(overwrite_func):
-					overwrite = overwrite_func(path)
+					overwrite = overwrite_func(output)
 					if not overwrite:
 						print(f"Output file {output} exists already - not writing any airports !")
 						return 1
-			elif exists == 2:
-				print(f"Output path {path} for airport is a directory - skipping", end=" " * 100 + "\n")
+			elif os.path.exists(output):
+				print(f"Output path {output} for airports is a directory - skipping")
 				return 1
 			
-			with open(output, "w") as f:
-				self._write_header(f)
-				i = 0
-				total = len(airports)
+			os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+			with open(output, "w", buffering=WRITE_BUFFER_SIZE) as f, Progress("Writing airports", len(self._airports), " airports") as progress:
+				f.write(self._format_header())
 				for airport in self._airports:
-					print(f"Writing airports … {i / total * 100}% ({i} of {total} airports done)", end="\r")
-					i += 1
-					airport.write(f)
-				print(f"Writing airports … {i / total * 100}% ({i} of {total} airports done)")
-				self._write_footer(f)
+					f.write(airport.format())
+					progress.update()
+				f.write(self._format_footer())
 		else:
-			files.check_exists(output, type="dir")
-			i = 0
-			total = len(self._airports)
+			os.makedirs(output, exist_ok=True)
+			# list the output directory once instead of stat'ing every airport file
+			with os.scandir(output) as it:
+				existing = {entry.name: entry.is_file() for entry in it}
+			
+			jobs = []
 			skipped = 0
 			for airport in self._airports:
-				print(f"Writing airports … {i / total * 100}% ({i} of {total} airports done, {skipped} skipped)", end="\r")
-				i += 1
-				path = os.path.join(output, airport.icao + ".dat")
-				exists = files.check_exists(path, type="file", exit=False, create=True)
-				if exists == 1:
+				name = airport.icao + ".dat"
+				path = os.path.join(output, name)
+				if name in existing:
+					if not existing[name]:
+						print(f"Output path {path} for airport is a directory - skipping")
+						skipped += 1
+						continue
+					path_overwrite = overwrite
 					if callable(overwrite_func):
-						overwrite = overwrite_func(path)
-					if not overwrite:
-						print(f"Output file {path} for airport exists already - skipping", end=" " * 100 + "\n")
+						path_overwrite = overwrite_func(path)
+					if not path_overwrite:
 						skipped += 1
 						continue
-				elif exists == 2:
-					print(f"Output path {path} for airport is a directory - skipping", end=" " * 100 + "\n")
-					continue
-				with open(path, "w") as f:
-					self._write_header(f)
-					airport.write(f)
-					self._write_footer(f)
-			print(f"Writing airports … {i / total * 100}% ({i} of {total} airports done, {skipped} skipped)", end=" " * 100 + "\n")
+				jobs.append((path, airport))
+			
+			with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads or min(32, (os.cpu_count() or 1) + 4)) as executor, \
+					Progress("Writing airports", len(jobs), " airports") as progress:
+				progress.count("skipped", skipped)
+				futures = [executor.submit(self._write_airport_file, path, airport) for path, airport in jobs]
+				for future in concurrent.futures.as_completed(futures):
+					future.result()
+					progress.update()
 		return 0
 	
+	# Update apt.dat files in output, rewriting only airports whose content changed
+	# @param output -> str 				Path to put apt.dat files into
+	# @param merge -> bool 			Whether output is one merged apt.dat file or a directory with one file per airport
+	# @param remove -> bool 			Whether to remove airports from output that this object doesn't contain
+	# @param overwrite_func -> callable Like for write, gets called for every existing file that would be changed
+	# @return AptDatDiff 				Added, removed and modified ICAOs
+	def update(self, output, merge=False, remove=False, overwrite_func=None, num_threads=0):
+		return update_aptdat(AirportRecordSource(self._airports), output, merge=merge, remove=remove,
+					overwrite_func=overwrite_func, file_header=self.file_header, num_threads=num_threads)
+	
+	def _write_airport_file(self, path, airport):
+		text = "".join((self._format_header(), airport.format(), self._format_footer()))
+		with open(path, "w", buffering=WRITE_BUFFER_SIZE) as f:
+			f.write(text)
+	
+	def _format_header(self):
+		return f"I\n1130 {self.file_header}\n"
+	
+	def _format_footer(self):
+		return "99\n"
+	
 	def _write_header(self, f):
-		f.write("I\n")
-		f.write(f"1130 {self.file_header}\n")
+		f.write(self._format_header())
 	
 	def _write_footer(self, f):
-		f.write("99\n")
+		f.write(self._format_footer())
+
+AIRPORT_ROW_CODES = (b"1", b"16", b"17")
+
+def _hash_line(h, line):
+	line = line.rstrip()
+	if line:
+		h.update(line)
+		h.update(b"\n")
+
+# Content hash of an airport record, independent of line endings, trailing whitespace and blank lines
+def hash_record(text):
+	h = hashlib.sha1()
+	for line in text.encode("utf-8").splitlines():
+		_hash_line(h, line)
+	return h.hexdigest()
+
+# Find all airport records in an apt.dat file in one streaming pass, without caching the result
+# @return dict 		ICAO => (byte offset, byte length, content hash, datum lon, datum lat), in file order
+def index_records(path):
+	return AptDatIndex.build(path).records
+
+def _float_or_none(s):
+	try:
+		return float(s)
+	except ValueError:
+		return None
+
+# Maps ICAO codes to the byte range of their record in an apt.dat file and to their datum position
+class AptDatIndex:
+	VERSION = 1
+	
+	def __init__(self, path, records=None):
+		self.path = path
+		self.records = records if records is not None else {}
+		self._grid = None
+	
+	def __contains__(self, icao):
+		return icao in self.records
+	
+	def __len__(self):
+		return len(self.records)
+	
+	# The index lives in the cache directory, keyed by the absolute path of the apt.dat, never next to the input
+	@staticmethod
+	def get_index_path(path):
+		cache_name = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest() + ".idx"
+		return os.path.join(constants.CACHEDIR, "aptdat-index", cache_name)
+	
+	# Load the cached index of path, (re)building it when path was modified since
+	@classmethod
+	def load(cls, path, cache=True):
+		stat = os.stat(path)
+		try:
+			with open(cls.get_index_path(path), "r") as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			data = {}
+		if data.get("version") == cls.VERSION and data.get("mtime") == stat.st_mtime_ns and data.get("size") == stat.st_size:
+			return cls(path, {icao: tuple(record) for icao, record in data["airports"].items()})
+		
+		index = cls.build(path)
+		if cache:
+			index.save(stat)
+		return index
+	
+	# Write the index to the cache, return its path or None if the cache directory isn't writable
+	def save(self, stat=None):
+		stat = stat or os.stat(self.path)
+		data = {"version": self.VERSION, "mtime": stat.st_mtime_ns, "size": stat.st_size, "airports": self.records}
+		index_path = self.get_index_path(self.path)
+		try:
+			os.makedirs(os.path.dirname(index_path), exist_ok=True)
+			files.write_atomic(index_path, json.dumps(data, separators=(",", ":")))
+		except OSError:
+			return None
+		return index_path
+	
+	@classmethod
+	def build(cls, path):
+		records = {}
+		icao = None
+		
+		def finish(end):
+			if datum_lon is not None and datum_lat is not None:
+				lon, lat = datum_lon, datum_lat
+			elif lons and lats:
+				lon, lat = (min(lons) + max(lons)) / 2, (min(lats) + max(lats)) / 2
+			else:
+				lon = lat = None
+			records[icao] = (start, end - start, h.hexdigest(), lon, lat)
+		
+		with open(path, "rb") as f:
+			offset = 0
+			for line in f:
+				parts = line.split()
+				if parts:
+					rowcode = parts[0]
+					if rowcode in AIRPORT_ROW_CODES or rowcode == b"99":
+						if icao is not None:
+							finish(offset)
+							icao = None
+						if rowcode == b"99":
+							break
+						if len(parts) >= 5:
+							icao = parts[4].decode("utf-8")
+							start = offset
+							h = hashlib.sha1()
+							lons = []
+							lats = []
+							datum_lon = datum_lat = None
+					elif icao is not None:
+						if rowcode == b"100" and len(parts) >= 20:
+							lats += (float(parts[9]), float(parts[18]))
+							lons += (float(parts[10]), float(parts[19]))
+						elif rowcode == b"101" and len(parts) >= 9:
+							lats += (float(parts[4]), float(parts[7]))
+							lons += (float(parts[5]), float(parts[8]))
+						elif rowcode == b"102" and len(parts) >= 4:
+							lats.append(float(parts[2]))
+							lons.append(float(parts[3]))
+						elif rowcode == b"1302" and len(parts) >= 3:
+							if parts[1] == b"datum_lon":
+								datum_lon = _float_or_none(parts[2])
+							elif parts[1] == b"datum_lat":
+								datum_lat = _float_or_none(parts[2])
+				if icao is not None:
+					_hash_line(h, line)
+				offset += len(line)
+			if icao is not None:
+				finish(offset)
+		return cls(path, records)
+	
+	def _get_grid(self):
+		if self._grid is None:
+			self._grid = {}
+			for icao, record in self.records.items():
+				if record[3] is None:
+					continue
+				self._grid.setdefault((math.floor(record[3]), math.floor(record[4])), []).append(icao)
+		return self._grid
+	
+	# ICAO codes of all airports whose datum lies inside the given bounding box
+	def query_bbox(self, left, bottom, right, top):
+		grid = self._get_grid()
+		icaos = []
+		for lon in range(math.floor(left), math.floor(right) + 1):
+			for lat in range(math.floor(bottom), math.floor(top) + 1):
+				for icao in grid.get((lon, lat), ()):
+					record = self.records[icao]
+					if left <= record[3] <= right and bottom <= record[4] <= top:
+						icaos.append(icao)
+		return icaos
+	
+	def read_record(self, icao):
+		offset, length = self.records[icao][:2]
+		with open(self.path, "rb") as f:
+			return _read_range(f, offset, length)
+	
+	def read_airport(self, icao):
+		airport = new_airport()
+		airport.read(io.StringIO(self.read_record(icao).decode("utf-8", errors="replace")))
+		return airport
+
+class AptDatDiff:
+	def __init__(self, added=(), removed=(), modified=(), unchanged=()):
+		self.added = list(added)
+		self.removed = list(removed)
+		self.modified = list(modified)
+		self.unchanged = list(unchanged)
+	
+	def __bool__(self):
+		return bool(self.added or self.removed or self.modified)
+	
+	def __repr__(self):
+		return f"AptDatDiff(added={len(self.added)}, removed={len(self.removed)}, modified={len(self.modified)}, unchanged={len(self.unchanged)})"
+	
+	def summary(self):
+		return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.modified)} modified, {len(self.unchanged)} unchanged"
+
+# @param old -> dict 		ICAO => content hash of the existing airports
+# @param new -> dict 		ICAO => content hash of the updated airports
+# @param remove -> bool 	Whether airports missing from new count as removed or are kept as they are
+def diff_hashes(old, new, remove=True):
+	diff = AptDatDiff()
+	for icao, h in new.items():
+		if icao not in old:
+			diff.added.append(icao)
+		elif old[icao] != h:
+			diff.modified.append(icao)
+		else:
+			diff.unchanged.append(icao)
+	if remove:
+		diff.removed = [icao for icao in old if icao not in new]
+	return diff
+
+# Updated airport records taken from Airport objects
+class AirportRecordSource:
+	def __init__(self, airports):
+		self._texts = {}
+		for airport in airports:
+			self._texts[airport.icao] = airport.format()
+		self._hashes = None
+	
+	def __contains__(self, icao):
+		return icao in self._texts
+	
+	def hashes(self):
+		if self._hashes is None:
+			self._hashes = {icao: hash_record(text) for icao, text in self._texts.items()}
+		return self._hashes
+	
+	def get_bytes(self, icao):
+		return self._texts[icao].encode("utf-8")
+
+# Updated airport records taken verbatim from an apt.dat file, without parsing them. The file stays open
+# until close() is called, use it as a context manager:
+#	with FileRecordSource(path) as source:
+#		update_aptdat(source, output)
+class FileRecordSource:
+	def __init__(self, path):
+		self.path = path
+		self._records = AptDatIndex.load(path).records
+		self._file = open(path, "rb")
+		# get_bytes is called from several threads when writing one file per airport
+		self._lock = threading.Lock()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *args):
+		self.close()
+	
+	def close(self):
+		self._file.close()
+	
+	def __contains__(self, icao):
+		return icao in self._records
+	
+	def hashes(self):
+		return {icao: record[2] for icao, record in self._records.items()}
+	
+	def get_bytes(self, icao):
+		offset, length = self._records[icao][:2]
+		with self._lock:
+			return _read_range(self._file, offset, length)
+
+def _read_range(f, offset, length):
+	f.seek(offset)
+	return f.read(length)
+
+def _update_merged(source, output, remove, overwrite_func, header):
+	old_records = {}
+	if os.path.isfile(output):
+		old_records = AptDatIndex.load(output, cache=False).records
+	
+	diff = diff_hashes({icao: record[2] for icao, record in old_records.items()}, source.hashes(), remove=remove)
+	if not diff:
+		return diff
+	if old_records and callable(overwrite_func) and not overwrite_func(output):
+		print(f"Output file {output} exists already - not updating any airports !")
+		return AptDatDiff(unchanged=source.hashes())
+	
+	os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+	modified = set(diff.modified)
+	removed = set(diff.removed)
+	with files.open_atomic(output, "wb", buffering=WRITE_BUFFER_SIZE) as new:
+		if old_records:
+			with open(output, "rb") as old:
+				# keep the existing file header, copy unchanged records byte for byte
+				new.write(_read_range(old, 0, next(iter(old_records.values()))[0]))
+				for icao, (offset, length, *_) in old_records.items():
+					if icao in modified:
+						new.write(source.get_bytes(icao))
+					elif icao not in removed:
+						new.write(_read_range(old, offset, length))
+		else:
+			new.write(header.encode("utf-8"))
+		for icao in diff.added:
+			new.write(source.get_bytes(icao))
+		new.write(b"99\n")
+	return diff
+
+def _update_directory(source, output, remove, overwrite_func, header, num_threads):
+	os.makedirs(output, exist_ok=True)
+	with os.scandir(output) as it:
+		existing = [entry.name[:-4] for entry in it if entry.name.endswith(".dat") and entry.is_file()]
+	
+	old_hashes = {}
+	for icao in existing:
+		if icao in source or remove:
+			record = index_records(os.path.join(output, icao + ".dat")).get(icao)
+			# files not containing the airport they are named after are left alone
+			if record:
+				old_hashes[icao] = record[2]
+	
+	diff = diff_hashes(old_hashes, source.hashes(), remove=remove)
+	if callable(overwrite_func):
+		kept = [icao for icao in diff.modified + diff.removed if not overwrite_func(os.path.join(output, icao + ".dat"))]
+		diff.modified = [icao for icao in diff.modified if icao not in kept]
+		diff.removed = [icao for icao in diff.removed if icao not in kept]
+		diff.unchanged += kept
+	
+	header = header.encode("utf-8")
+	def write_file(icao):
+		data = b"".join((header, source.get_bytes(icao), b"99\n"))
+		with open(os.path.join(output, icao + ".dat"), "wb", buffering=WRITE_BUFFER_SIZE) as f:
+			f.write(data)
+	
+	with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads or min(32, (os.cpu_count() or 1) + 4)) as executor:
+		for _ in executor.map(write_file, diff.added + diff.modified):
+			pass
+	for icao in diff.removed:
+		os.remove(os.path.join(output, icao + ".dat"))
+	return diff
+
+# Apply updated airport records to an existing apt.dat output, rewriting only what changed
+# @param source -> AirportRecordSource | FileRecordSource 	The updated airports
+# @param output -> str 				Merged apt.dat file or directory with one apt.dat file per airport
+# @param merge -> bool 			Whether output is a merged file
+# @param remove -> bool 			Whether to remove airports from output that are not in source
+# @return AptDatDiff
+def update_aptdat(source, output, merge=False, remove=False, overwrite_func=None,
+				file_header="Generated by fgtools.aptdat.ReaderWriterAptDat", num_threads=0):
+	header = f"I\n1130 {file_header}\n"
+	if merge:
+		if os.path.isdir(output):
+			output = os.path.join(output, "apt.dat")
+		diff = _update_merged(source, output, remove, overwrite_func, header)
+	else:
+		diff = _update_directory(source, output, remove, overwrite_func, header, num_threads)
+	print(f"Updated airports in {output}: {diff.summary()}")
+	return diff
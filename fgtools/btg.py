@@ -12,7 +12,7 @@ import time
 from plum import dispatch
 
 from fgtools.utils import binary
-from fgtools.geo import Coord
+from fgtools.geo import make_coord, coord_from_cartesian
 
 class NotABtgFileError(Exception):
 	def __init__(self, path):
@@ -73,33 +73,21 @@ class BTGElement:
 class BTGObject(BTGElement):
 	@dispatch
 	def __init__(self, element_class, object_type):
-		BTGElement.__init__(self)
-		self.element_class = element_class
-		self.element_args = []
-		self.object_type = object_type
-		self.properties = {}
-		self.elements = []
+		self._init(element_class, [], object_type, {}, [])
 	
 	@dispatch
 	def __init__(self, element_class, element_args, object_type):
-		BTGElement.__init__(self)
-		self.element_class = element_class
-		self.element_args = element_args
-		self.object_type = object_type
-		self.properties = {}
-		self.elements = []
+		self._init(element_class, element_args, object_type, {}, [])
 	
 	@dispatch
 	def __init__(self, element_class, object_type, properties, elements):
-		BTGElement.__init__(self)
-		self.element_class = element_class
-		self.element_args = []
-		self.object_type = object_type
-		self.properties = properties
-		self.elements = elements
+		self._init(element_class, [], object_type, properties, elements)
 	
 	@dispatch
 	def __init__(self, element_class, element_args, object_type, properties, elements):
+		self._init(element_class, element_args, object_type, properties, elements)
+	
+	def _init(self, element_class, element_args, object_type, properties, elements):
 		BTGElement.__init__(self)
 		self.element_class = element_class
 		self.element_args = element_args
@@ -119,8 +107,9 @@ class BTGObject(BTGElement):
 			self.properties[prop_type] = prop_data
 	
 	def _read_elements(self, reader: "ReaderWriterBTG", f: typing.BinaryIO, num_elements: int):
+		new_element = _ELEMENT_FACTORIES.get(self.element_class, self.element_class)
 		for i in range(num_elements):
-			element = self.element_class(*self.element_args)
+			element = new_element(*self.element_args)
 			element.read(reader, f)
 			self.elements.append(element)
 	
@@ -162,8 +151,7 @@ class BTGObject(BTGElement):
 
 class BTGGeometryObject(BTGObject):
 	def __init__(self, element_class, object_type):
-		BTGObject.__init__(self, element_class, object_type)
-		self.element_class = element_class
+		self._init(element_class, [], object_type, {}, [])
 		self.material = ""
 		self.index_mask = BTGIndexTypes.VERTICES
 		if element_class != BTGGeometryElementPoint:
@@ -183,8 +171,9 @@ class BTGGeometryObject(BTGObject):
 			raise ValueError(f"index mask has no bits set")
 	
 	def _read_elements(self, reader: "ReaderWriterBTG", f: typing.BinaryIO, num_elements: int):
+		new_element = _ELEMENT_FACTORIES.get(self.element_class, self.element_class)
 		for i in range(num_elements):
-			element = self.element_class(*self.element_args)
+			element = new_element(*self.element_args)
 			element.read(reader, f, self)
 			self.elements.append(element)
 	
@@ -285,8 +274,9 @@ class BTGListElement(BTGElement):
 	def read(self, reader: "ReaderWriterBTG", f: typing.BinaryIO):
 		BTGElement.read(self, reader, f)
 		item_count = self.num_bytes // self.item_class.bytes_size
+		new_item = _ELEMENT_FACTORIES.get(self.item_class, self.item_class)
 		for i in range(item_count):
-			item = self.item_class()
+			item = new_item()
 			item.read(reader, self.bytes)
 			self.items.append(item)
 	
@@ -313,17 +303,17 @@ class BTGListElementVertexItem(BTGListElementItem):
 		self.x = x
 		self.y = y
 		self.z = z
-		self.coord = Coord.from_cartesian(self.x, self.y, self.z)
+		self.coord = coord_from_cartesian(self.x, self.y, self.z)
 	
 	@dispatch
 	def set(self, lon: numbers.Real, lat: numbers.Real, alt: numbers.Real):
-		self.coord = Coord(lon, lat, alt)
+		self.coord = make_coord(lon, lat, alt)
 	
 	def read(self, reader: "ReaderWriterBTG", f: typing.BinaryIO):
 		self.x = reader.bs.elements[0].x + binary.read_float(f)
 		self.y = reader.bs.elements[0].y + binary.read_float(f)
 		self.z = reader.bs.elements[0].z + binary.read_float(f)
-		self.coord = Coord.from_cartesian(self.x, self.y, self.z)
+		self.coord = coord_from_cartesian(self.x, self.y, self.z)
 	
 	def write(self, writer: "ReaderWriterBTG", f: typing.BinaryIO):
 		binary.write_float(f, self.x - writer.bs.elements[0].x)
@@ -584,6 +574,45 @@ class BTGGeometryElementTriangleFan(BTGGeometryElement):
 class BTGGeometryElementTriangleStrip(BTGGeometryElement):
 	pass
 
+# Dispatch-free factories for the elements and list items created while reading, indexed by class - resolving
+# the overloaded constructors takes longer than reading an item, and one item is created per vertex / normal / color.
+# read() sets all fields of the bounding sphere and of the list items, so those are created uninitialized.
+def _new_uninitialized(cls):
+	return lambda: cls.__new__(cls)
+
+def _new_list_element(item_class):
+	element = BTGListElement.__new__(BTGListElement)
+	element.items = []
+	element.item_class = item_class
+	return element
+
+def _new_geometry_element(cls):
+	def new_element():
+		element = cls.__new__(cls)
+		element.vertex_indices = []
+		element.normal_indices = []
+		element.color_indices = []
+		element.tex_coord_indices = [[], [], [], []]
+		element.vertex_attribute_indices = [[], [], [], [], [], [], [], []]
+		return element
+	return new_element
+
+_ELEMENT_FACTORIES = {
+	BTGBoundingSphereElement: _new_uninitialized(BTGBoundingSphereElement),
+	BTGListElement: _new_list_element,
+	BTGListElementVertexItem: _new_uninitialized(BTGListElementVertexItem),
+	BTGListElementColorItem: _new_uninitialized(BTGListElementColorItem),
+	BTGListElementNormalItem: _new_uninitialized(BTGListElementNormalItem),
+	BTGListElementTexCoordItem: _new_uninitialized(BTGListElementTexCoordItem),
+	BTGListElementVAIntegerItem: _new_uninitialized(BTGListElementVAIntegerItem),
+	BTGListElementVAFloatItem: _new_uninitialized(BTGListElementVAFloatItem),
+	BTGGeometryElement: _new_geometry_element(BTGGeometryElement),
+	BTGGeometryElementPoint: _new_geometry_element(BTGGeometryElementPoint),
+	BTGGeometryElementTriangleFace: _new_geometry_element(BTGGeometryElementTriangleFace),
+	BTGGeometryElementTriangleFan: _new_geometry_element(BTGGeometryElementTriangleFan),
+	BTGGeometryElementTriangleStrip: _new_geometry_element(BTGGeometryElementTriangleStrip),
+}
+
 class ReaderWriterBTG:
 	@dispatch
 	def __init__(self):
@@ -1,27 +1,101 @@
 #!/usr/bin/env python
 #-*- coding:utf-8 -*-
 
+import os
+import sys
 import subprocess
+import threading
+
+# Number of requests written to fgelev in one go when querying many coordinates
+BATCH_SIZE = 4096
+
+# Parse one answer of fgelev, of the form "<id>: <elevation>"
+# @return	tuple (id, elevation)
+def parse_reply(line):
+	if isinstance(line, bytes):
+		line = line.decode("utf-8", "replace")
+	fields = line.split()
+	if len(fields) != 2:
+		raise ValueError(f"malformed fgelev reply {line.strip()!r}")
+	return int(fields[0].rstrip(":")), float(fields[1])
 
 class Pipe:
-	def __init__(self, fgelev, fgscenery, fgdata):
+	def __init__(self, fgelev, fgscenery, fgdata, expire=1):
 		print("Creating pipe to fgelev … ", end="")
 		sys.stdout.flush()
 		self.env = os.environ.copy()
-		self.env["FG_SCENERY"] = os.pathsep.join(fgscenery)
-		self.env["FG_ROOT"] = fgdata
-		self.pipe = subprocess.Popen(args=[fgelev, "--expire", "1"], env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-		self.pipe.stdout.flush()
+		self.env["FG_SCENERY"] = os.pathsep.join(map(os.path.expanduser, fgscenery))
+		self.env["FG_ROOT"] = os.path.expanduser(fgdata)
+		# stderr is discarded - nobody reads it, and a full stderr pipe would block fgelev in the middle of a batch
+		self.pipe = subprocess.Popen(args=[fgelev, "--expire", str(expire)], env=self.env, stdin=subprocess.PIPE,
+								stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
 		self.pipe.stdout.readline()
-		self.pipe.stdin.flush()
-		self.pipe.stdin.flush()
 		print("done")
-	
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		if self.pipe.poll() is None:
+			self.pipe.stdin.close()
+			self.pipe.wait()
+
 	def get_elevation(self, lon, lat):
-		elevpipe.stdin.write(f"_ {lon} {lat}\n".encode("utf-8"))
-		elevpipe.stdin.flush()
-		elevout = elevpipe.stdout.readline().split()
+		self.pipe.stdin.write(f"_ {lon} {lat}\n".encode("utf-8"))
+		self.pipe.stdin.flush()
+		elevout = self.pipe.stdout.readline().split()
 		if len(elevout) == 2:
 			return float(elevout[1])
-		else
-	
+		else:
+			return None
+
+	# Query the elevations of many coordinates at once - requests are written from a separate thread while
+	# the answers are read back, so fgelev never waits for a round trip through Python
+	# @param coords	sequence of (lon, lat) tuples
+	# @param callback	optional function called with the number of answers received so far after each batch
+	# @return	list of elevations in the order of coords, raises RuntimeError if fgelev answers with anything it can't parse
+	def get_elevations(self, coords, callback=None):
+		elevs = [None] * len(coords)
+		if not coords:
+			return elevs
+
+		error = []
+		def feed():
+			try:
+				for start in range(0, len(coords), BATCH_SIZE):
+					self.pipe.stdin.write("".join(f"{i} {lon} {lat}\n" for i, (lon, lat) in
+													enumerate(coords[start:start + BATCH_SIZE], start)).encode("utf-8"))
+					self.pipe.stdin.flush()
+			except (BrokenPipeError, OSError) as e:
+				error.append(e)
+
+		feeder = threading.Thread(target=feed, daemon=True)
+		feeder.start()
+
+		bad = []
+		for received in range(1, len(coords) + 1):
+			line = self.pipe.stdout.readline()
+			if not line:
+				break
+			try:
+				i, elev = parse_reply(line)
+				if not 0 <= i < len(coords):
+					raise ValueError(f"fgelev reply {line.decode('utf-8', 'replace').strip()!r} has an unknown id")
+				elevs[i] = elev
+			except ValueError as e:
+				bad.append(str(e))
+			if callback and received % BATCH_SIZE == 0:
+				callback(received)
+
+		feeder.join()
+		if error or len(line) == 0:
+			raise RuntimeError(f"fgelev exited while calculating elevations: {error[0] if error else 'no more output'}")
+		if bad:
+			raise RuntimeError(f"{len(bad)} of {len(coords)} fgelev replies could not be parsed, first: {bad[0]}")
+		if callback:
+			callback(len(coords))
+		return elevs
+
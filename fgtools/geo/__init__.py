@@ -1,22 +1,44 @@
 #!/usr/bin/env python
 #-*- coding:utf-8 -*-
 
+import os
+import re
 import math
 import numbers
 import typing
 
+import numpy
 from plum import dispatch
 
-from .rectangle import Rectangle
-from .coord import Coord
-from fgtools.utils import range
-from fgtools import math as fgmath
+from .rectangle import Rectangle, make_rectangle
+from .coord import Coord, make_coord, coord_from_cartesian
 
 EARTH_RADIUS = 6378138.12
 FG_TILE_HEIGHT = 0.125
 
-@dispatch
-def get_fg_tile_span(lat: numbers.Real) -> numbers.Real:
+# Name of an SRTM-style elevation tile, for example N47E008.hgt, named after its lower left corner
+_HGT_NAME_RE = re.compile(r"^([NS])(\d{1,2})([EW])(\d{1,3})\.hgt$", re.IGNORECASE)
+
+# Great circle distance in meters between two points - works on scalars as well as on numpy arrays
+def great_circle_distance_m(lon1, lat1, lon2, lat2):
+	lon1, lat1, lon2, lat2 = map(numpy.radians, (lon1, lat1, lon2, lat2))
+	a = numpy.sin((lat2 - lat1) / 2) ** 2 + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+	return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(a))
+
+# Initial true bearing in degrees from the first to the second point
+def get_bearing_deg(lon1, lat1, lon2, lat2):
+	lon1, lat1, lon2, lat2 = map(numpy.radians, (lon1, lat1, lon2, lat2))
+	y = numpy.sin(lon2 - lon1) * numpy.cos(lat2)
+	x = numpy.cos(lat1) * numpy.sin(lat2) - numpy.sin(lat1) * numpy.cos(lat2) * numpy.cos(lon2 - lon1)
+	return numpy.degrees(numpy.arctan2(y, x)) % 360
+
+# latitude band edges and the tile spans of the bands between them, same as get_fg_tile_span
+_FG_TILE_SPAN_EDGES = numpy.array([-89, -86, -83, -76, -62, -22, 22, 62, 76, 83, 86, 89], dtype=numpy.float64)
+_FG_TILE_SPANS = numpy.array([12, 4, 2, 1, 0.5, 0.25, 0.125, 0.25, 0.5, 1, 2, 4, 12], dtype=numpy.float64)
+
+# Dispatch-free scalar versions of the get_fg_tile_* functions below, for hot paths calling them per object or per tile -
+# resolving a plum overload takes many times longer than the computation itself
+def fg_tile_span(lat):
 	if lat >= 89:
 		return 12
 	elif lat >= 86:
@@ -44,13 +66,8 @@ def get_fg_tile_span(lat: numbers.Real) -> numbers.Real:
 	else:
 		return 12
 
-@dispatch
-def get_fg_tile_span(coord: Coord) -> numbers.Real:
-	return get_fg_tile_span(coord.lat)
-
-@dispatch
-def get_fg_tile_index(dlon: numbers.Real, dlat: numbers.Real) -> int:
-	tile_width = get_fg_tile_span(dlat)
+def fg_tile_index(dlon, dlat):
+	tile_width = fg_tile_span(dlat)
 	lon = math.floor(dlon)
 	lat = math.floor(dlat)
 	if tile_width <= 1:
@@ -67,12 +84,9 @@ def get_fg_tile_index(dlon: numbers.Real, dlat: numbers.Real) -> int:
 	
 	return ((lon + 180) << 14) + ((lat + 90) << 6) + (y << 3) + x
 
-@dispatch
-def get_fg_tile_index(coord: Coord) -> int:
-	return get_fg_tile_index(coord.llon, coord.lat)
-
-@dispatch
-def get_fg_tile_coords(index: numbers.Real) -> Coord:
+# @return	tuple (lon, lat) of the south west corner of the tile
+def fg_tile_coords(index):
+	index = int(index)
 	lon = index >> 14;
 	index -= lon << 14;
 	lon -= 180;
@@ -87,32 +101,13 @@ def get_fg_tile_coords(index: numbers.Real) -> Coord:
 	x = index
 	
 	lat += FG_TILE_HEIGHT * y
-	lon += get_fg_tile_span(lat) * x
-	return Coord(lon, lat)
-
-@dispatch
-def get_fg_tile_bbox(lon: numbers.Real, lat: numbers.Real) -> Rectangle:
-	rect = Rectangle(0, 0, 0, 0)
-	rect.set_left(lon)
-	rect.set_bottom(lat)
-	rect.set_top(lat + FG_TILE_HEIGHT)
-	rect.set_right(lon + get_fg_tile_span(max(abs(rect.top), abs(rect.bottom))))
-	return rect
+	lon += fg_tile_span(lat) * x
+	return lon, lat
 
-@dispatch
-def get_fg_tile_bbox(ll_coords: typing.Tuple[numbers.Real, numbers.Real]):
-	return get_fg_tile_bbox(ll_coords[0], ll_coords[1])
-
-@dispatch
-def get_fg_tile_bbox(tile_index: numbers.Real) -> Rectangle:
-	return get_fg_tile_bbox(get_fg_tile_coords(tile_index))
-
-@dispatch
-def get_fg_tile_bbox(ll_coord: Coord) -> Rectangle:
-	return get_fg_tile_bbox(ll_coord.lon, ll_coord.lat)
+def fg_tile_bbox(lon, lat):
+	return make_rectangle(lon, lat, lon + fg_tile_span(lat + FG_TILE_HEIGHT / 2), lat + FG_TILE_HEIGHT)
 
-@dispatch
-def get_fg_tile_path(lon: numbers.Real, lat: numbers.Real) -> str:
+def fg_tile_path(lon, lat):
 	top_lon = int(lon / 10);
 	main_lon = int(lon);
 	if (lon < 0) and (top_lon * 10 != lon):
@@ -139,41 +134,171 @@ def get_fg_tile_path(lon: numbers.Real, lat: numbers.Real) -> str:
 	if main_lat < 0:
 		main_lat *= -1
 	
-	return f"{hem}{int(top_lon):03d}{pole}{int(top_lat):02d}/{hem}{int(main_lon):03d}{pole}{int(main_lat):02d}/{get_fg_tile_index(lon, lat)}"
+	return f"{hem}{int(top_lon):03d}{pole}{int(top_lat):02d}/{hem}{int(main_lon):03d}{pole}{int(main_lat):02d}/{fg_tile_index(lon, lat)}"
+
+def fg_tile_path_from_index(index):
+	return fg_tile_path(*fg_tile_coords(index))
+
+@dispatch
+def get_fg_tile_span(lat: numbers.Real) -> numbers.Real:
+	return fg_tile_span(lat)
+
+@dispatch
+def get_fg_tile_span(coord: Coord) -> numbers.Real:
+	return fg_tile_span(coord.lat)
+
+@dispatch
+def get_fg_tile_index(dlon: numbers.Real, dlat: numbers.Real) -> int:
+	return fg_tile_index(dlon, dlat)
+
+@dispatch
+def get_fg_tile_index(coord: Coord) -> int:
+	return fg_tile_index(coord.lon, coord.lat)
+
+@dispatch
+def get_fg_tile_coords(index: numbers.Real) -> Coord:
+	return make_coord(*fg_tile_coords(index))
+
+@dispatch
+def get_fg_tile_bbox(lon: numbers.Real, lat: numbers.Real) -> Rectangle:
+	return fg_tile_bbox(lon, lat)
+
+@dispatch
+def get_fg_tile_bbox(ll_coords: typing.Tuple[numbers.Real, numbers.Real]):
+	return fg_tile_bbox(ll_coords[0], ll_coords[1])
+
+@dispatch
+def get_fg_tile_bbox(tile_index: numbers.Real) -> Rectangle:
+	return fg_tile_bbox(*fg_tile_coords(tile_index))
+
+@dispatch
+def get_fg_tile_bbox(ll_coord: Coord) -> Rectangle:
+	return fg_tile_bbox(ll_coord.lon, ll_coord.lat)
+
+@dispatch
+def get_fg_tile_path(lon: numbers.Real, lat: numbers.Real) -> str:
+	return fg_tile_path(lon, lat)
 
 @dispatch
 def get_fg_tile_path(coord: Coord) -> str:
-	return get_fg_tile_path(coord.lon, coord.lat)
+	return fg_tile_path(coord.lon, coord.lat)
 
 @dispatch
 def get_fg_tile_path(index: int) -> str:
-	return get_fg_tile_path(get_fg_tile_coords(index))
+	return fg_tile_path_from_index(index)
 
+# Indices of the tiles touched by bbox, row by row from south to north - the tile span changes between rows, so each
+# row is split with the span at its own latitude
 def get_fg_tile_indices(bbox: Rectangle) -> list[int]:
-	bbox = Rectangle(bbox)
-	bbox.set_left(fgmath.floor(bbox.left, get_fg_tile_span(max(abs(bbox.top), abs(bbox.bottom)))))
-	bbox.set_right(fgmath.ceil(bbox.right, get_fg_tile_span(max(abs(bbox.top), abs(bbox.bottom)))))
-	bbox.set_bottom(fgmath.floor(bbox.bottom, 0.125))
-	bbox.set_top(fgmath.ceil(bbox.top, 0.125))
+	indices = get_fg_tile_indices_for_bboxes([[bbox.left, bbox.bottom, bbox.right, bbox.top]])
+	return sorted(map(int, indices), key=lambda index: fg_tile_coords(index)[::-1])
+
+def get_fg_tile_paths(bbox: Rectangle) -> list[str]:
+	return [fg_tile_path_from_index(index) for index in get_fg_tile_indices(bbox)]
+
+def get_fg_tile_spans(lats: numpy.ndarray) -> numpy.ndarray:
+	return _FG_TILE_SPANS[numpy.searchsorted(_FG_TILE_SPAN_EDGES, lats, side="right")]
+
+# Vectorized get_fg_tile_index for arrays of longitudes and latitudes
+def get_fg_tile_indices_array(lons: numpy.ndarray, lats: numpy.ndarray) -> numpy.ndarray:
+	lons = numpy.asarray(lons, dtype=numpy.float64)
+	lats = numpy.asarray(lats, dtype=numpy.float64)
+	widths = get_fg_tile_spans(lats)
+	lon = numpy.floor(lons)
+	lat = numpy.floor(lats)
+	narrow = widths <= 1
+	x = numpy.where(narrow, numpy.floor((lons - lon) / widths), 0)
+	lon = numpy.where(narrow, lon, numpy.floor(lon / widths) * widths)
+	y = numpy.floor((lats - lat) * 8)
+	pole = lat == 90
+	lat = numpy.where(pole, 89, lat)
+	y = numpy.where(pole, 7, y)
 	
-	tiles = []
+	lon = lon.astype(numpy.int64)
+	lat = lat.astype(numpy.int64)
+	return ((lon + 180) << 14) + ((lat + 90) << 6) + (y.astype(numpy.int64) << 3) + x.astype(numpy.int64)
+
+def _expand_ranges(starts: numpy.ndarray, counts: numpy.ndarray) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+	owners = numpy.repeat(numpy.arange(len(counts)), counts)
+	offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+	return owners, starts[owners] + offsets
+
+# Indices of all tiles touched by any of the bounding boxes, without duplicates
+# @param bboxes -> numpy.ndarray 	(n, 4) array of left, bottom, right, top
+def get_fg_tile_indices_for_bboxes(bboxes: numpy.ndarray) -> numpy.ndarray:
+	bboxes = numpy.asarray(bboxes, dtype=numpy.float64).reshape(-1, 4)
+	if len(bboxes) == 0:
+		return numpy.array([], dtype=numpy.int64)
 	
-	for lat in range(bbox.bottom, bbox.top - 0.125, 0.125):
-		for lon in range(bbox.left, bbox.right - get_fg_tile_span(lat), get_fg_tile_span(lat)):
-			tiles.append(get_fg_tile_index(lon, lat))
+	first_rows = numpy.floor(bboxes[:, 1] / FG_TILE_HEIGHT).astype(numpy.int64)
+	last_rows = numpy.maximum(first_rows, numpy.ceil(bboxes[:, 3] / FG_TILE_HEIGHT).astype(numpy.int64) - 1)
+	owners, rows = _expand_ranges(first_rows, last_rows - first_rows + 1)
 	
-	return tiles
+	# use the tile centers so that floating point errors at tile edges don't matter
+	row_lats = (rows + 0.5) * FG_TILE_HEIGHT
+	spans = get_fg_tile_spans(row_lats)
+	first_cols = numpy.floor(bboxes[owners, 0] / spans).astype(numpy.int64)
+	last_cols = numpy.maximum(first_cols, numpy.ceil(bboxes[owners, 2] / spans).astype(numpy.int64) - 1)
+	row_owners, cols = _expand_ranges(first_cols, last_cols - first_cols + 1)
+	
+	lons = numpy.clip((cols + 0.5) * spans[row_owners], -180, 180 - 1e-9)
+	return numpy.unique(get_fg_tile_indices_array(lons, row_lats[row_owners]))
 
-def get_fg_tile_paths(bbox: Rectangle) -> list[str]:
-	bbox = Rectangle(bbox)
-	bbox.set_left(fgmath.floor(bbox.left, get_fg_tile_span(max(abs(bbox.top), abs(bbox.bottom)))))
-	bbox.set_right(fgmath.ceil(bbox.right, get_fg_tile_span(max(abs(bbox.top), abs(bbox.bottom)))))
-	bbox.set_bottom(fgmath.floor(bbox.bottom, 0.125))
-	bbox.set_top(fgmath.ceil(bbox.top, 0.125))
+# Merge tiles into as few disjoint rectangles as possible - neighbouring tiles in a row are merged,
+# then neighbouring rows covering the same longitudes
+def merge_fg_tiles(tile_indices: typing.Iterable[int]) -> list[Rectangle]:
+	rows = {}
+	for tile_index in tile_indices:
+		bbox = fg_tile_bbox(*fg_tile_coords(tile_index))
+		rows.setdefault(round(bbox.bottom / FG_TILE_HEIGHT), []).append([bbox.left, bbox.right])
 	
-	paths = []
-	for lat in range(bbox.bottom, bbox.top - 0.125, 0.125):
-		for lon in range(bbox.left, bbox.right - get_fg_tile_span(lat), get_fg_tile_span(lat)):
-			paths.append(get_fg_tile_path(lon, lat))
-	return paths
+	# row => list of [left, right]
+	for row in rows:
+		spans = []
+		for left, right in sorted(rows[row]):
+			if spans and math.isclose(spans[-1][1], left):
+				spans[-1][1] = right
+			else:
+				spans.append([left, right])
+		rows[row] = spans
+	
+	rects = []
+	open_rects = {}
+	for row in sorted(rows):
+		next_open_rects = {}
+		for left, right in rows[row]:
+			key = (round(left, 9), round(right, 9))
+			if key in open_rects and open_rects[key][1] == row - 1:
+				rect_index = open_rects[key][0]
+				rects[rect_index][3] = (row + 1) * FG_TILE_HEIGHT
+			else:
+				rect_index = len(rects)
+				rects.append([left, row * FG_TILE_HEIGHT, right, (row + 1) * FG_TILE_HEIGHT])
+			next_open_rects[key] = (rect_index, row)
+		open_rects = next_open_rects
+	return [Rectangle(*map(float, rect)) for rect in rects]
+
+# Area covered by an SRTM-style elevation tile, parsed from its file name - the tiles cover one degree each
+# @return	Rectangle, None if the name isn't the name of such a tile
+def get_hgt_tile_bbox(path: str) -> typing.Optional[Rectangle]:
+	match = _HGT_NAME_RE.match(os.path.basename(path))
+	if not match:
+		return None
+	lat = int(match.group(2)) * (1 if match.group(1).upper() == "N" else -1)
+	lon = int(match.group(4)) * (1 if match.group(3).upper() == "E" else -1)
+	return Rectangle(lon, lat, lon + 1, lat + 1)
+
+# File name of the SRTM-style elevation tile whose lower left corner is at lon, lat
+def get_hgt_tile_name(lon: int, lat: int) -> str:
+	return f"{'N' if lat >= 0 else 'S'}{abs(lat):02d}{'E' if lon >= 0 else 'W'}{abs(lon):03d}.hgt"
+
+# File names of the elevation tiles covering a bbox, tiles only touching it along an edge aren't needed since
+# neighbouring tiles share their edge samples
+def get_hgt_tile_names(bbox: Rectangle) -> list[str]:
+	return [get_hgt_tile_name(lon, lat)
+		for lat in range(math.floor(bbox.bottom), math.ceil(bbox.top))
+		for lon in range(math.floor(bbox.left), math.ceil(bbox.right))]
 
+# Whether two rectangles overlap, rectangles only touching along an edge count as overlapping
+def bboxes_intersect(a: Rectangle, b: Rectangle) -> bool:
+	return a.left <= b.right and b.left <= a.right and a.bottom <= b.top and b.bottom <= a.top
@@ -6,15 +6,23 @@ import typing
 import numbers
 
 from plum import dispatch
-import pyproj
 
 from fgtools.utils import unit_convert, wrap_period
 from fgtools import geo
 
-_proj_ecef = pyproj.Proj(proj='geocent', ellps='WGS84', datum='WGS84')
-_proj_lla = pyproj.Proj(proj='latlong', ellps='WGS84', datum='WGS84')
-_transformer_to_lla = pyproj.Transformer.from_proj(_proj_ecef, _proj_lla, always_xy=True)
-_transformer_to_ecef = pyproj.Transformer.from_proj(_proj_lla, _proj_ecef, always_xy=True)
+_transformers = None
+
+# pyproj takes long to import and to set up the transformers, so that is only done when they are first needed
+# @return	tuple (ECEF -> lon/lat/alt transformer, lon/lat/alt -> ECEF transformer)
+def _get_transformers():
+	global _transformers
+	if _transformers is None:
+		import pyproj
+		proj_ecef = pyproj.Proj(proj='geocent', ellps='WGS84', datum='WGS84')
+		proj_lla = pyproj.Proj(proj='latlong', ellps='WGS84', datum='WGS84')
+		_transformers = (pyproj.Transformer.from_proj(proj_ecef, proj_lla, always_xy=True),
+						pyproj.Transformer.from_proj(proj_lla, proj_ecef, always_xy=True))
+	return _transformers
 
 class Coord:
 	@dispatch
@@ -47,16 +55,15 @@ class Coord:
 	@classmethod
 	@dispatch
 	def from_cartesian(cls, c: typing.Tuple[numbers.Real, numbers.Real, numbers.Real]):
-		return Coord.from_cartesian(c[0], c[1], c[2])
+		return coord_from_cartesian(c[0], c[1], c[2])
 	
 	@classmethod
 	@dispatch
 	def from_cartesian(cls, x: numbers.Real, y: numbers.Real, z: numbers.Real):
-		lon, lat, alt = _transformer_to_lla.transform(x, y, z, radians=False)
-		return Coord(lon, lat, alt)
+		return coord_from_cartesian(x, y, z)
 	
 	def to_cartesian(self):
-		x, y, z = _transformer_to_ecef.transform(self.lon, self.lat, self.alt, radians=False)
+		x, y, z = _get_transformers()[1].transform(self.lon, self.lat, self.alt, radians=False)
 		return x, y, z
 	
 	def __repr__(self):
@@ -64,11 +71,11 @@ class Coord:
 	
 	@dispatch
 	def __sub__(self, other: "Coord"):
-		return Coord((self.lon - other.lon, self.lat - other.lat, self.alt))
+		return make_coord(self.lon - other.lon, self.lat - other.lat, self.alt)
 	
 	@dispatch
 	def __sub__(self, other: typing.Tuple[numbers.Real, numbers.Real]):
-		return Coord((self.lon - other[0], self.lat - other[1], self.alt))
+		return make_coord(self.lon - other[0], self.lat - other[1], self.alt)
 	
 	@dispatch
 	def __isub__(self, other: "Coord"):
@@ -84,11 +91,11 @@ class Coord:
 	
 	@dispatch
 	def __add__(self, other: "Coord"):
-		return Coord((self.lon + other.lon, self.lat + other.lat, self.alt))
+		return make_coord(self.lon + other.lon, self.lat + other.lat, self.alt)
 	
 	@dispatch
 	def __add__(self, other: typing.Tuple[numbers.Real, numbers.Real]):
-		return Coord((self.lon + other[0], self.lat + other[1], self.alt))
+		return make_coord(self.lon + other[0], self.lat + other[1], self.alt)
 	
 	@dispatch
 	def __iadd__(self, other: "Coord"):
@@ -142,5 +149,17 @@ class Coord:
 		elif lon < -180:
 			lon += 360
 				
-		return Coord(lon, lat, self.alt)
+		return make_coord(lon, lat, self.alt)
+
+# Dispatch-free constructors for hot paths - resolving an overload of Coord.__init__ takes
+# many times longer than building the Coord itself
+def make_coord(lon, lat, alt=0):
+	coord = Coord.__new__(Coord)
+	coord.lon = lon
+	coord.lat = lat
+	coord.alt = alt
+	return coord
 
+def coord_from_cartesian(x, y, z):
+	lon, lat, alt = _get_transformers()[0].transform(x, y, z, radians=False)
+	return make_coord(lon, lat, alt)
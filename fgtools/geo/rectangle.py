@@ -5,15 +5,15 @@ import typing
 import numbers
 from plum import dispatch
 
-from fgtools.geo.coord import Coord
+from fgtools.geo.coord import Coord, make_coord
 
 class Rectangle:
 	@dispatch
 	def __init__(self, ll: Coord, ur: Coord):
 		self.ll = ll
 		self.ur = ur
-		self.lr = Coord(ll.lon, ur.lat)
-		self.ul = Coord(ur.lon, ll.lat)
+		self.lr = make_coord(ur.lon, ll.lat)
+		self.ul = make_coord(ll.lon, ur.lat)
 		self.left = ll.lon
 		self.top = ur.lat
 		self.right = ur.lon
@@ -21,50 +21,39 @@ class Rectangle:
 	
 	@dispatch
 	def __init__(self, ll: typing.Iterable[typing.Union[int, float]], ur: typing.Iterable[typing.Union[int, float]]):
-		self.ll = Coord(ll[0], ll[1])
-		self.ur = Coord(ur[0], ur[1])
-		self.lr = Coord(self.ll.lon, self.ur.lat)
-		self.ul = Coord(self.ur.lon, self.ll.lat)
-		self.left = self.ll.lon
-		self.top = self.ur.lat
-		self.right = self.ur.lon
-		self.bottom = self.ll.lat
+		self._set(ll[0], ll[1], ur[0], ur[1])
 	
 	@dispatch
 	def __init__(self, coords: typing.Iterable[numbers.Real]):
-		self.ll = Coord(coords[0], coords[1])
-		self.ur = Coord(coods[2], coords[3])
-		self.lr = Coord(self.ll.lon, self.ur.lat)
-		self.ul = Coord(self.ur.lon, self.ll.lat)
-		self.left = self.ll.lon
-		self.top = self.ur.lat
-		self.right = self.ur.lon
-		self.bottom = self.ll.lat
+		self._set(coords[0], coords[1], coords[2], coords[3])
 	
 	@dispatch
 	def __init__(self, left: numbers.Real, bottom: numbers.Real, right: numbers.Real, top: numbers.Real):
-		self.ll = Coord(left, bottom)
-		self.ur = Coord(right, top)
-		self.lr = Coord(self.ll.lon, self.ur.lat)
-		self.ul = Coord(self.ur.lon, self.ll.lat)
-		self.left = self.ll.lon
-		self.top = self.ur.lat
-		self.right = self.ur.lon
-		self.bottom = self.ll.lat
+		self._set(left, bottom, right, top)
 	
 	@dispatch
 	def __init__(self, other: "Rectangle"):
-		self.ll = Coord(other.ll.lon, other.ll.lat)
-		self.ur = Coord(other.ur.lon, other.ur.lat)
-		self.lr = Coord(other.lr.lon, other.lr.lat)
-		self.ul = Coord(other.ul.lon, other.ul.lat)
+		self.ll = make_coord(other.ll.lon, other.ll.lat)
+		self.ur = make_coord(other.ur.lon, other.ur.lat)
+		self.lr = make_coord(other.lr.lon, other.lr.lat)
+		self.ul = make_coord(other.ul.lon, other.ul.lat)
 		self.left = other.left
 		self.top = other.top
 		self.right = other.right
 		self.bottom = other.bottom
 	
+	def _set(self, left, bottom, right, top):
+		self.ll = make_coord(left, bottom)
+		self.ur = make_coord(right, top)
+		self.lr = make_coord(right, bottom)
+		self.ul = make_coord(left, top)
+		self.left = left
+		self.top = top
+		self.right = right
+		self.bottom = bottom
+	
 	def __iter__(self):
-		return iter([self.ll, self.ul, self.ur, self.ul])
+		return iter([self.ll, self.ul, self.ur, self.lr])
 	
 	def __repr__(self):
 		return f"Rectangle(left={self.left}, top={self.top}, right={self.right}, bottom={self.bottom})"
@@ -90,7 +79,7 @@ class Rectangle:
 		self.lr.lat = bottom
 	
 	def midpoint(self):
-		return Coord((self.ll.lon + self.ur.lon) / 2, (self.ll.lat + self.ur.lat) / 2)
+		return make_coord((self.ll.lon + self.ur.lon) / 2, (self.ll.lat + self.ur.lat) / 2)
 	
 	def is_inside(self, coord):
 		return self.ll.lon <= coord.lon <= self.ur.lon and self.ll.lat <= coord.lat <= self.ur.lat
@@ -99,8 +88,13 @@ class Rectangle:
 		return self.ll.distance_m(self.ur)
 	
 	def length_m(self):
-		return self.ur.distance_m(Coord(self.ur.lon, self.ll.lat))
+		return self.ur.distance_m(make_coord(self.ur.lon, self.ll.lat))
 		
 	def width_m(self):
-		return self.ll.distance_m(Coord(self.ur.lon, self.ll.lat))
+		return self.ll.distance_m(make_coord(self.ur.lon, self.ll.lat))
 
+# Dispatch-free constructor for hot paths, same as Rectangle(left, bottom, right, top)
+def make_rectangle(left, bottom, right, top):
+	rect = Rectangle.__new__(Rectangle)
+	rect._set(left, bottom, right, top)
+	return rect
@@ -52,7 +52,7 @@ def write_pdf(paths, output, keep):
 		os.remove(path)
 	print("done")
 
-def main()
+def main():
 	argp = argparse.ArgumentParser()
 	
 	argp.add_argument(
@@ -11,6 +11,7 @@ from PIL import Image
 from bs4 import BeautifulSoup
 
 from fgtools.utils import constants
+from fgtools.utils import progress
 json_pattern = r'(?<=content-url: ")https:\/\/html.scribdassets.com\/.+\.jsonp(?=")'
 img_pattern = r'<img .+?\/>'
 
@@ -73,14 +74,12 @@ def download_pages(url, output):
 	pages = sorted(parse_pages_script(str(pages_script)), key=lambda p: p.number)
 	
 	paths = []
-	for i, page in enumerate(pages):
-		print(f"Downloading page {i} of {len(pages)}", end="\r")
+	for page in progress.track(pages, "Downloading pages", unit=" pages"):
 		path = os.path.join(constants.CACHEDIR, os.path.split(output)[-1] + f"-{page.number}.jpg")
 		image = page.get_image()
 		if image:
 			paths.append(path)
 			image.save(path, "JPEG")
-	print()
 	
 	return paths
 
@@ -108,7 +107,10 @@ def main():
 		required=True
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	os.makedirs(os.path.join(*os.path.split(os.path.relpath(args.output))[:-1]) or ".", exist_ok=True)
 	
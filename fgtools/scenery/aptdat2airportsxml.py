@@ -2,7 +2,6 @@
 #-*- coding:utf-8 -*-
 
 import os
-import sys
 import argparse
 import statistics
 
@@ -10,6 +9,7 @@ from fgtools.utils.files import find_input_files
 from fgtools import utils
 from fgtools.geo import coord
 from fgtools.utils import unit_convert
+from fgtools.utils import progress
 
 def format_coord(coord, lonlat):
 	prefix = {"lon": ["E", "W"], "lat": ["N", "S"]}[lonlat][coord < 0]
@@ -231,10 +231,7 @@ def parse_aptdat_files(files, nav_dat, print_runway_lengths):
 	
 	runway_lengths = []
 	
-	i = 1
-	total = len(files)
-	for path in files:
-		print(f"\rParsing apt.dat files … {i / total * 100:.1f}% ({i} of {total})", end="")
+	for path in progress.track(files, "Parsing apt.dat files"):
 		with open(path, "r") as f:
 			aptdat = list(map(str.split, filter(None, map(str.strip, f.readlines()))))
 		
@@ -310,9 +307,6 @@ def parse_aptdat_files(files, nav_dat, print_runway_lengths):
 			del runways[icao]
 		if not ils_d[icao]:
 			del ils_d[icao]
-		
-		i += 1
-	print()
 	
 	if print_runway_lengths > 0:
 		print("ICAO	Length	Lon		Lat		Tile index")
@@ -325,16 +319,15 @@ def find_or_create_pushback_node(taxi_nodes, p):
 	pass
 
 def write_groundnet_files(parkings, taxi_nodes, taxi_edges, output, overwrite):
-	i = 1
-	total = len(parkings)
+	report = progress.Progress("Writing groundnet files", len(parkings))
 	for icao in parkings:
-		print(f"\rWriting groundnet files … {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
+		report.update()
 		path = os.path.join(output, "Airports", get_icao_xml_path(icao, "groundnet"))
 		os.makedirs(os.path.join(*os.path.split(path)[:-1]), exist_ok=True)
 		
 		if os.path.isfile(path) and not overwrite:
-			print(f"\rGroundnet file {path} already exists - skipping, use --overwrite                                             ")
+			report.message(f"Groundnet file {path} already exists - skipping, use --overwrite")
+			report.count("skipped")
 			continue
 		elif len(parkings[icao]) == 0 and (len(taxi_nodes) == 0 or len(taxi_edges == 0)):
 			continue
@@ -366,40 +359,36 @@ def write_groundnet_files(parkings, taxi_nodes, taxi_edges, output, overwrite):
 				f.write("	</TaxiWaySegments>\n")
 			
 			f.write("</groundnet>\n")
-		
-		i += 1
-	print()
+	report.close()
 
 def write_tower_files(towers, output, elevpipe, overwrite):
-	i = 1
-	total = len(towers)
+	report = progress.Progress("Writing tower files", len(towers))
 	for icao in towers:
-		print(f"\rWriting tower files … {i / total * 100:.1f}% ({i} of {total})", end="")
+		report.update()
 		path = os.path.join(output, "Airports", get_icao_xml_path(icao, "twr"))
 		os.makedirs(os.path.join(*os.path.split(path)[:-1]), exist_ok=True)
 		
 		if os.path.isfile(path) and not overwrite:
-			print(f"\rTower file {path} already exists - skipping, use --overwrite                                             ")
+			report.message(f"Tower file {path} already exists - skipping, use --overwrite")
+			report.count("skipped")
+			continue
 		with open(path, "w") as f:
 			utils.files.write_xml_header(f)
 			f.write("<PropertyList>\n")
 			f.write(repr(towers[icao]))
 			f.write("</PropertyList>\n")
-		
-		i += 1
-	print()
+	report.close()
 
 def write_threshold_files(runways, output, overwrite):
-	i = 1
-	total = len(runways)
+	report = progress.Progress("Writing threshold files", len(runways))
 	for icao in runways:
-		print(f"\rWriting threshold files … {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
+		report.update()
 		path = os.path.join(output, "Airports", get_icao_xml_path(icao, "threshold"))
 		os.makedirs(os.path.join(*os.path.split(path)[:-1]), exist_ok=True)
 		
 		if os.path.isfile(path) and not overwrite:
-			print(f"\rThreshold file {path} already exists - skipping, use --overwrite                                             ")
+			report.message(f"Threshold file {path} already exists - skipping, use --overwrite")
+			report.count("skipped")
 			continue
 		elif len(runways[icao]) == 0:
 			continue
@@ -410,16 +399,12 @@ def write_threshold_files(runways, output, overwrite):
 			for runway in runways[icao]:
 				f.write(repr(runway))
 			f.write("</PropertyList>")
-		
-		i += 1
-	print()
+	report.close()
 
 def write_ils_files(ils_d, output, elevpipe, overwrite):
-	i = 1
-	total = len(ils_d)
+	report = progress.Progress("Writing ILS files", len(ils_d))
 	for icao in ils_d:
-		print(f"\rWriting ILS files … {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
+		report.update()
 		for ils in ils_d[icao]:
 			elevout1, elevout2 = [], []
 			if ils.lon1 and ils.lat1:
@@ -446,7 +431,9 @@ def write_ils_files(ils_d, output, elevpipe, overwrite):
 		os.makedirs(os.path.join(*os.path.split(path)[:-1]), exist_ok=True)
 		
 		if os.path.isfile(path) and not overwrite:
-			print(f"\rILS file {path} already exists - skipping, use --overwrite                                             ")
+			report.message(f"ILS file {path} already exists - skipping, use --overwrite")
+			report.count("skipped")
+			continue
 		with open(path, "w") as f:
 			utils.files.write_xml_header(f)
 			f.write("<PropertyList>\n")
@@ -454,9 +441,7 @@ def write_ils_files(ils_d, output, elevpipe, overwrite):
 				if ils:
 					f.write(repr(ils))
 			f.write("</PropertyList>\n")
-		
-		i += 1
-	print()
+	report.close()
 
 def main():
 	argp = argparse.ArgumentParser(description="Convert apt.dat files to groundnet.xml files")
@@ -513,7 +498,10 @@ def main():
 		metavar="N"
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	print("Searching apt.dat files … ", end="")
 	files = find_input_files(args.input, suffix=".dat")
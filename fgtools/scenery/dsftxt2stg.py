@@ -3,13 +3,20 @@
 
 import os
 import argparse
-import random
 import sys
+import math
+import array
+import concurrent.futures
 
-from fgtools.dsf2stg_lookup import lookup
-from fgtools import utils
+import numpy
+
+from fgtools import dsf2stg_lookup
+from fgtools.fgelev import Pipe
+from fgtools import stg
+from fgtools.utils import files
 from fgtools.utils.files import find_input_files
-from fgtools.geo import get_fg_tile_index, get_fg_tile_path
+from fgtools.utils import progress
+from fgtools.geo import fg_tile_path_from_index, get_fg_tile_indices_array
 
 cars = [
 	"hatchback_red.ac",
@@ -34,92 +41,167 @@ cessnas = [
 	"Cessna150_no_reg.ac"
 ]
 
-def parse_txt_file(path):
-	with open(path) as f:
-		content = list(map(str.strip, f.readlines()))
+# Objects of one or more DSF/TXT files - the OBJECT_DEF paths are interned once, the objects themselves are kept
+# in typed arrays of path ids and coordinates instead of one dict per object
+class DSFObjects:
+	def __init__(self):
+		self.paths = []
+		self._path_ids = {}
+		self.path_ids = array.array("I")
+		self.lons = array.array("d")
+		self.lats = array.array("d")
+		self.hdgs = array.array("d")
+		self.alts = array.array("d")
 	
-	objpaths = []
-	for line in content:
-		if line.startswith("OBJECT_DEF"):
-			objpaths.append(line.split()[1])
+	def __len__(self):
+		return len(self.path_ids)
 	
-	objects = []
-	for line in content:
-		if line.startswith("OBJECT "):
-			line = line.split()
-			objects.append({"path": objpaths[int(line[1])], "lon": float(line[2]), "lat": float(line[3]), "hdg": float(line[4])})
+	def intern(self, path):
+		path_id = self._path_ids.get(path)
+		if path_id is None:
+			path_id = self._path_ids[path] = len(self.paths)
+			self.paths.append(path)
+		return path_id
 	
+	def extend(self, other):
+		remap = [self.intern(path) for path in other.paths]
+		self.path_ids.extend(remap[path_id] for path_id in other.path_ids)
+		self.lons.extend(other.lons)
+		self.lats.extend(other.lats)
+		self.hdgs.extend(other.hdgs)
+
+# Parse a DSF/TXT file in a single pass - OBJECT_DEF lines always precede the OBJECT lines referring to them
+def parse_txt_file(path):
+	objects = DSFObjects()
+	defs = []
+	append_path_id, append_lon, append_lat, append_hdg = objects.path_ids.append, objects.lons.append, objects.lats.append, objects.hdgs.append
+	with open(path) as f:
+		for line in f:
+			if line.startswith("OBJECT "):
+				tokens = line.split()
+				append_path_id(defs[int(tokens[1])])
+				append_lon(float(tokens[2]))
+				append_lat(float(tokens[3]))
+				append_hdg(float(tokens[4]))
+			elif line.startswith("OBJECT_DEF"):
+				defs.append(objects.intern(line.split()[1]))
 	return objects
 
-def parse_txt_files(files):
-	objects = []
+def parse_txt_files(files, jobs=1):
+	objects = DSFObjects()
 	total = len(files)
-	i = 1
-	for f in files:
-		print(f"\rParsing DSF/TXT files …  {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
-		objects += parse_txt_file(f)
-		i += 1
-	print()
+	if jobs > 1 and total > 1:
+		executor = concurrent.futures.ProcessPoolExecutor(min(jobs, total))
+		parsed = executor.map(parse_txt_file, files)
+	else:
+		executor = None
+		parsed = map(parse_txt_file, files)
+	
+	try:
+		with progress.Progress("Parsing DSF/TXT files", total) as report:
+			for file_objects in parsed:
+				objects.extend(file_objects)
+				report.update(objects=len(file_objects))
+	finally:
+		if executor:
+			executor.shutdown()
 	return objects
 
 def calc_object_elevs(objects, fgelev_pipe):
-	total = len(objects)
-	i = 1
-	for o in objects:
-		print(f"\rCalculating object elevations … {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
-		fgelev_pipe.stdin.write(f"{o['path']} {o['lon']} {o['lat']}\n".encode("utf-8"))
-		fgelev_pipe.stdin.flush()
-		fgelevout = fgelev_pipe.stdout.readline().split()
-		if len(fgelevout) == 2:
-			o["alt"] = float(fgelevout[1])
-		else:
-			print(f"\rReceived unusable output from FGElev: {fgelevout} for longitude {o['lon']} and latitude {o['lat']} - skipping object")
-			print(f"\rCalculating object elevations … {i / total * 100:.1f}% ({i} of {total})", end="")
-		i += 1
-	print()
+	with progress.Progress("Calculating object elevations", len(objects), " objects") as report:
+		elevs = fgelev_pipe.get_elevations(list(zip(objects.lons, objects.lats)), callback=report.set)
+	missing = elevs.count(None)
+	if missing:
+		print(f"Received unusable output from FGElev for {missing} objects - skipping them")
+	objects.alts = array.array("d", (math.nan if elev is None else elev for elev in elevs))
 	return objects
 
-def group_objects_by_tile(objects):
-	tiles = {}
-	for o in objects:
-		tile_index = get_fg_tile_index(o["lon"], o["lat"])
-		if not tile_index in tiles:
-			tiles[tile_index] = []
-		tiles[tile_index].append(o)
-	
-	return tiles
-
-def write_stg_files(objects, output):
-	total = len(objects)
-	i = 1
-	not_found_xpaths = []
-	for tile_index in objects:
-		print(f"\rWriting STG files … {i / total * 100:.1f}% ({i} of {total})", end="")
-		sys.stdout.flush()
-		stgpath = os.path.join(output, get_fg_tile_path(objects[tile_index][0]["lon"], objects[tile_index][0]["lat"]) + ".stg")
-		os.makedirs(os.path.join(*os.path.split(stgpath)[:-1]), exist_ok=True)
-		with open(stgpath, "w") as f:
-			for o in objects[tile_index]:
-				opath = lookup.get(o["path"], None)
-				if not opath:
-					if o["path"] not in not_found_xpaths:
-						print(f"\rNo FlightGear model found for XPlane model {o['path']} - skipping")
-						print(f"\rWriting STG files … {i / total * 100:.1f}% ({i} of {total})", end="")
-						not_found_xpaths.append(o["path"])
-					continue
-				
-				opath = opath["path"]
-				
-				if opath == "CAR":
-					opath = "Models/Transport/" + random.choice(cars)
-				elif opath == "CESSNA":
-					opath = "Models/Aircraft/" + random.choice(cessnas)
-				
-				f.write(f"OBJECT_SHARED {opath} {o['lon']} {o['lat']} {o['alt'] + lookup[o['path']]['alt-offset']} {o['hdg'] + lookup[o['path']]['hdg-offset']}\n")
-		i += 1	
-	print()
+# Placeholder model paths in the lookup table, replaced by a random model of the group per object
+RANDOM_MODEL_GROUPS = {
+	"CAR": ["Models/Transport/" + car for car in cars],
+	"CESSNA": ["Models/Aircraft/" + cessna for cessna in cessnas],
+}
+
+# Map the interned X-Plane model paths to FlightGear models once, so objects only need integer lookups
+# @return	tuple (list of FlightGear model paths, model id per path id (-1 if there is no mapping, -2 - n for the
+# 			n-th random model group), altitude offset per path id, heading offset per path id)
+def resolve_models(paths, mapping):
+	indices = mapping.find_all(paths)
+	for xpath in numpy.array(paths, dtype=object)[indices < 0]:
+		print(f"No FlightGear model found for XPlane model {xpath} - skipping")
+	if not len(mapping):
+		return [], indices, numpy.zeros(len(paths)), numpy.zeros(len(paths))
+	
+	groups = list(RANDOM_MODEL_GROUPS)
+	models = list(mapping.models)
+	model_remap = numpy.array([-2 - groups.index(model) if model in RANDOM_MODEL_GROUPS else i for i, model in enumerate(models)], dtype=numpy.int64)
+	mapped = indices >= 0
+	path_models = numpy.where(mapped, model_remap[mapping.model_ids[indices]], -1)
+	alt_offsets = numpy.where(mapped, mapping.alt_offsets[indices], 0)
+	hdg_offsets = numpy.where(mapped, mapping.hdg_offsets[indices], 0)
+	return models, path_models, alt_offsets, hdg_offsets
+
+# Compute the FlightGear model, elevation and heading of all objects at once and sort them by tile
+# @return	tuple (model paths, tile indices, offsets of the first object of each tile plus the total count,
+# 			and the per-object model ids, lons, lats, alts and hdgs in tile order)
+def group_objects_by_tile(objects, mapping):
+	models, path_models, alt_offsets, hdg_offsets = resolve_models(objects.paths, mapping)
+	path_ids = numpy.frombuffer(objects.path_ids, dtype=numpy.uint32).astype(numpy.int64)
+	lons = numpy.frombuffer(objects.lons, dtype=numpy.float64)
+	lats = numpy.frombuffer(objects.lats, dtype=numpy.float64)
+	alts = numpy.frombuffer(objects.alts, dtype=numpy.float64)
+	hdgs = numpy.frombuffer(objects.hdgs, dtype=numpy.float64)
+	
+	object_models = path_models[path_ids]
+	for i, models_in_group in enumerate(RANDOM_MODEL_GROUPS.values()):
+		mask = object_models == -2 - i
+		if mask.any():
+			object_models[mask] = len(models) + numpy.random.randint(0, len(models_in_group), int(mask.sum()))
+			models += models_in_group
+	
+	keep = (object_models >= 0) & ~numpy.isnan(alts)
+	tiles = get_fg_tile_indices_array(lons[keep], lats[keep])
+	order = numpy.argsort(tiles, kind="stable")
+	tiles = tiles[order]
+	unique_tiles, starts = numpy.unique(tiles, return_index=True)
+	
+	return (models, unique_tiles, numpy.append(starts, len(tiles)), object_models[keep][order], lons[keep][order], lats[keep][order],
+			(alts + alt_offsets[path_ids])[keep][order], (hdgs + hdg_offsets[path_ids])[keep][order])
+
+def format_stg_lines(models, model_ids, lons, lats, alts, hdgs):
+	return "".join(f"OBJECT_SHARED {models[m]} {lon} {lat} {alt} {hdg}\n" for m, lon, lat, alt, hdg in
+						zip(model_ids.tolist(), lons.tolist(), lats.tolist(), alts.tolist(), hdgs.tolist()))
+
+# Write the objects of one tile, depending on mode replacing the STG file, appending to it, or merging into it
+# (keeping the existing entries and adding only objects that don't exist at the same position yet)
+def write_stg_file(stgpath, content, mode="overwrite"):
+	os.makedirs(os.path.dirname(stgpath), exist_ok=True)
+	if mode == "append":
+		with open(stgpath, "a") as f:
+			f.write(content)
+	elif mode == "merge" and os.path.isfile(stgpath):
+		stgfile = stg.read_stg_file(stgpath)
+		existing = set((object.lon, object.lat) for object in stgfile.get_objects(stg.POSITIONED_VERBS))
+		new = stg.STGFile().parse(content)
+		for object in new.get_objects():
+			if (object.lon, object.lat) not in existing:
+				stgfile.add_object(object)
+		stgfile.write()
+	else:
+		files.write_atomic(stgpath, content)
+
+def write_stg_files(groups, output, mode="overwrite", jobs=1):
+	models, tiles, starts, model_ids, lons, lats, alts, hdgs = groups
+	with concurrent.futures.ThreadPoolExecutor(max(1, jobs)) as executor, progress.Progress("Writing STG files", len(tiles)) as report:
+		futures = []
+		for i, tile_index in enumerate(tiles.tolist()):
+			a, b = starts[i], starts[i + 1]
+			stgpath = os.path.join(output, fg_tile_path_from_index(tile_index) + ".stg")
+			content = format_stg_lines(models, model_ids[a:b], lons[a:b], lats[a:b], alts[a:b], hdgs[a:b])
+			futures.append(executor.submit(write_stg_file, stgpath, content, mode))
+		for future in concurrent.futures.as_completed(futures):
+			future.result()
+			report.update()
 
 def main():
 	argp = argparse.ArgumentParser(description="Convert XPlane scenery DSF/TXT files to FlightGear scenery STG files")
@@ -156,24 +238,48 @@ def main():
 		default="fgelev",
 	)
 	
+	argp.add_argument(
+		"-j", "--jobs",
+		help="Number of processes to parse DSF/TXT files with and threads to write STG files with, default is the number of CPUs",
+		type=int,
+		default=os.cpu_count() or 1
+	)
+	
+	argp.add_argument(
+		"-l", "--lookup",
+		help="Additional files mapping X-Plane models to FlightGear models, layered on top of the builtin mapping. " +
+			"Each line contains the X-Plane model path, the FlightGear model path, the elevation offset and the heading offset. " +
+			f"Files can also be given in the {dsf2stg_lookup.LOOKUP_PATH_ENV} environment variable.",
+		nargs="+",
+		default=[]
+	)
+	
+	argp.add_argument(
+		"-m", "--mode",
+		help="What to do with existing STG files: overwrite them, append the new objects to them, " +
+			"or merge the new objects into them, skipping objects that already exist at the same position",
+		choices=["overwrite", "append", "merge"],
+		default="overwrite"
+	)
+	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	print("Searching for DSF/TXT files … ", end="")
 	sys.stdout.flush()
 	txt_files = find_input_files(args.input)
 	print(f"done, found {len(txt_files)} files")
 	
-	objects = parse_txt_files(txt_files)
-	print("Connecting to fgelev … ", end="")
-	sys.stdout.flush()
-	fgelev_pipe = utils.make_fgelev_pipe(args.fgelev, args.fgscenery, args.fgdata)
-	print("done")
-	elev_objects = calc_object_elevs(objects, fgelev_pipe)
+	objects = parse_txt_files(txt_files, args.jobs)
+	with Pipe(args.fgelev, args.fgscenery, args.fgdata) as fgelev_pipe:
+		elev_objects = calc_object_elevs(objects, fgelev_pipe)
 	print("Grouping objects by tile … ", end="")
 	sys.stdout.flush()
-	stg_groups = group_objects_by_tile(elev_objects)
+	stg_groups = group_objects_by_tile(elev_objects, dsf2stg_lookup.load_lookup(args.lookup))
 	print("done")
-	write_stg_files(stg_groups, args.output)
+	write_stg_files(stg_groups, args.output, args.mode, args.jobs)
 
 if __name__ == '__main__':
 	main()
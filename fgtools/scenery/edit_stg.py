@@ -4,163 +4,197 @@
 import argparse
 import sys
 import os
-import subprocess
-import time
+import json
+import hashlib
+import concurrent.futures
 
-from fgtools.utils import make_fgelev_pipe
+import numpy
+
+from fgtools.fgelev import Pipe
+from fgtools import stg
+from fgtools.geo import fg_tile_path_from_index, get_fg_tile_indices_array
 from fgtools.utils import files
+from fgtools.utils import constants
+from fgtools.utils import progress
 
-class SkipReason:
-	NotFound = 0
-	DirEmpty = 1
-	NoSTG = 2
+def _hash_file(path):
+	with open(path, "rb") as f:
+		return hashlib.sha1(f.read()).hexdigest()
 
-def read_stg_file(path):
-	result = []
-	offset = 0
-	skipnext = False
-	with open(path, "r") as fp:
-		content = fp.readlines()
-		for number, line in enumerate(content):
-			line = line.strip()
-			if line.startswith("#"): # is a comment
-				if line.startswith("# offset"):
-					offset = line.split(" ")[-1]
-					result.append(line)
-				elif line.startswith("# skipnext"):
-					skipnext = True
-					result.append(line)
-				else:
-					offset = 0
-					skipnext = False
-					result.append(line)
-			elif line.strip() == "": # empty line
-				result.append(line)
-			else: # is an object
-				etype, *data = list(map(lambda s: s.strip(), line.split(" ")))
-				if etype in ["OBJECT_SHARED", "OBJECT_SHARED_AGL", "OBJECT_STATIC", "OBJECT_STATIC_AGL", "OBJECT_SIGN", "OBJECT_SIGN_AGL", "BUILDING_ROUGH", "BUILDING_DETAILED", "OBJECT_ROAD_ROUGH", "OBJECT_ROAD_DETAILED", "OBJECT_RAILWAY_ROUGH", "OBJECT_RAILWAY_DETAILED", "OBJECT_BUILDING_MESH_ROUGH", "OBJECT_BUILDING_MESH_DETAILED"]:
-					if len(data) == 5:
-						objectfile, longitude, latitude, elevation, heading, pitch, roll = *data, 0, 0
-					elif len(data) == 7:
-						objectfile, longitude, latitude, elevation, heading, pitch, roll = data
-					else:
-						print(f"Warning: file {path}, line {number} is malformed - not recalculating elevation")
-						result.append(line)
-						continue
-					
-					result.append({
-						"etype": etype,
-						"objectfile": objectfile,
-						"longitude": longitude,
-						"latitude": latitude,
-						"elevation": float(elevation),
-						"offset": float(offset),
-						"heading": heading,
-						"pitch": pitch,
-						"roll": roll,
-						"skip": skipnext
-					})
-				elif etype in ["BUILDING_LIST", "TREE_LIST"]:
-					if len(data) == 5:
-						objectfile, material, longitude, latitude, elevation = data
-					else:
-						print(f"Warning: file {path}, line {number} is malformed - not recalculating elevation")
-						result.append(line)
-						continue
-					result.append({
-						"etype": etype,
-						"objectfile": objectfile,
-						"material": material,
-						"longitude": longitude,
-						"latitude": latitude,
-						"elevation": float(elevation),
-						"offset": float(offset),
-						"skip": skipnext
-					})
-				elif etype in ["OBJECT", "OBJECT_BASE",  "LINEAR_FEATURE_LIST"]:
-					result.append(line)
-				else:
-					print(f"Warning: file {path} line {number} has wrong type - commenting out to prevent FG not loading scenery")
-					result.append("# " + line)
-	return result
+def _stat_file(path):
+	try:
+		st = os.stat(path)
+	except FileNotFoundError:
+		return None
+	return [st.st_mtime_ns, st.st_size]
+
+# Record of the STG files processed by earlier runs - for every input file the hash of its contents,
+# the output it was written to and the mtimes of the terrain files its objects sit on, so that
+# files for which none of those changed are not processed again
+class Manifest:
+	VERSION = 1
+	
+	def __init__(self, path, fgscenery):
+		self.path = path
+		self.sceneries = [os.path.abspath(os.path.expanduser(p)) for p in fgscenery if os.path.isdir(os.path.expanduser(p))]
+		self.entries = {}
+		self._terrain_mtimes = {}
+		self._tile_terrain = {}
+		self.load()
+	
+	def load(self):
+		if not os.path.isfile(self.path):
+			return
+		try:
+			with open(self.path, "r") as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			print(f"Warning: manifest {self.path} is unreadable, processing all files")
+			return
+		# the elevations depend on the scenery directories, so a manifest made with other ones is of no use
+		if data.get("version") == self.VERSION and data.get("sceneries") == self.sceneries:
+			self.entries = data.get("files", {})
+	
+	def save(self):
+		os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		files.write_atomic(self.path, json.dumps({"version": self.VERSION, "sceneries": self.sceneries, "files": self.entries},
+									separators=(",", ":")))
+	
+	def _get_terrain_mtime(self, path):
+		if path not in self._terrain_mtimes:
+			stat = _stat_file(path)
+			self._terrain_mtimes[path] = stat[0] if stat else None
+		return self._terrain_mtimes[path]
+	
+	def get_terrain_paths(self, tile_index):
+		if tile_index not in self._tile_terrain:
+			tile_path = fg_tile_path_from_index(tile_index)
+			self._tile_terrain[tile_index] = [os.path.join(scenery, "Terrain", tile_path + ext)
+												for scenery in self.sceneries for ext in (".stg", ".btg.gz")]
+		return self._tile_terrain[tile_index]
+	
+	# Check whether a file matches its recorded state, comparing mtime and size first and the hash only when those differ
+	def _matches(self, path, state):
+		if not state:
+			return False
+		stat = _stat_file(path)
+		if stat is None:
+			return False
+		return stat == state[:2] or _hash_file(path) == state[2]
+	
+	def is_current(self, inpath, outpath):
+		entry = self.entries.get(os.path.abspath(inpath))
+		if not entry or entry["output"] != os.path.abspath(outpath):
+			return False
+		if os.path.abspath(inpath) == entry["output"]:
+			# processed in place, so the input now is what was written last time
+			if not self._matches(inpath, entry["written"]):
+				return False
+		elif not (self._matches(inpath, entry["input"]) and self._matches(outpath, entry["written"])):
+			return False
+		return all(self._get_terrain_mtime(path) == mtime for path, mtime in entry["terrain"].items())
+	
+	def update(self, stgfile, outpath, input_state):
+		objects = list(stgfile.get_objects(stg.POSITIONED_VERBS))
+		tiles = numpy.unique(get_fg_tile_indices_array(numpy.array([o.lon for o in objects], dtype=numpy.float64),
+													numpy.array([o.lat for o in objects], dtype=numpy.float64)))
+		terrain = {}
+		for tile_index in tiles:
+			for path in self.get_terrain_paths(int(tile_index)):
+				terrain[path] = self._get_terrain_mtime(path)
+		
+		written = _stat_file(outpath)
+		self.entries[os.path.abspath(stgfile.path)] = {
+			"output": os.path.abspath(outpath),
+			"input": input_state,
+			"written": written + [_hash_file(outpath)] if written else None,
+			"terrain": terrain,
+		}
+
+# State of an input file before it is processed, as recorded in the manifest
+def get_input_state(path):
+	stat = _stat_file(path)
+	return stat + [_hash_file(path)] if stat else None
 
-def read_stg_files(paths):
-	stg_dict = dict.fromkeys(paths, {"infiles": [], "contents": []})
+def find_stg_files(paths):
+	stg_paths = []
 	for path in paths:
 		if not os.path.exists(path):
 			print(f"Warning: Input file / directory {path} does not exist, skipping")
-			stg_dict[path] = SkipReason.NotFound
-		elif os.path.isdir(path):
-			for file in os.listdir(path):
-				if os.splitext(path)[1] == ".stg":
-					realpath = os.path.join(path, file)
-					content = read_stg_file(realpath)
-					stg_dict[path]["infiles"].append(file)
-					stg_dict[path]["contents"].append(content)
+			continue
+		found = list(stg.iter_stg_files(path))
+		if not found:
+			print(f"Warning: No STG file found in input {path}, skipping")
+		stg_paths += found
+	return stg_paths
+
+def get_output_paths(stg_paths, outfiles):
+	outpaths = []
+	for i, path in enumerate(stg_paths):
+		if len(outfiles) == 1:
+			if outfiles[0] == "__INPUT__":
+				outpaths.append(path)
 			else:
-				print(f"Warning: No STG file found in input directory {path}, skipping")
-				stg_dict[path] = SkipReason.DirEmpty
+				outpaths.append(outfiles[0])
 		else:
-			if os.path.splitext(path)[1] == ".stg":
-				content = read_stg_file(path)
-				stg_dict[path]["infiles"].append(path)
-				stg_dict[path]["contents"].append(content)
+			if i < len(outfiles):
+				outpaths.append(outfiles[i])
 			else:
-				print(f"Warning: Input file {path} is not an STG file, skipping")
-				stg_dict[path] = SkipReason.NoSTG
-	return stg_dict
+				outpaths.append(outfiles[-1])
+	return outpaths
 
-def recalc_elevs(stg_dict, elevpipe):
-	for path in stg_dict:
-		if type(stg_dict[path]) == int: # some SkipReason, so let's skip this path
-			continue
-		else:
-			for content in stg_dict[path]["contents"]:
-				for object in content:
-					if type(object) == str:
-						continue
-					elif type(object) == dict:
-						if "elevation" in object.keys():
-							if not object["skip"]:
-								print(f"Recalculating elevation of {object['objectfile']}")
-								elevpipe.stdin.write(f"{object['objectfile']} {object['longitude']} {object['latitude']}\n".encode("utf-8"))
-								elevpipe.stdin.flush()
-								fgelevout = elevpipe.stdout.readline().split()
-								if len(fgelevout) == 2:
-									object["elevation"] = float(fgelevout[1])
-							else:
-								print(f"Skipping {object['objectfile']}")
-							object["elevation"] += object["offset"]
-							print(f"Final elevation: {object['elevation']} meters, offset was {object['offset']}")
-	return stg_dict
-
-def write_stg_files(output_stg, outfiles):
-	for i, path in enumerate(output_stg):
-		for infile, content in zip(output_stg[path]["infiles"], output_stg[path]["contents"]):
-			if len(outfiles) == 1:
-				if outfiles[0] == "__INPUT__":
-					outfile = infile
-				else:
-					outfile = outfiles[0]
-			else:
-				if i < len(outfiles):
-					outfile = outfiles[i]
-				else:
-					outfile = outfiles[-1]
-			
-			with open(outfile, "w") as outfp:
-				for object in content:
-					if type(object) == str:
-						line = object
+def read_stg_files(stg_paths, jobs=1):
+	total = len(stg_paths)
+	if jobs > 1 and total > jobs:
+		executor = concurrent.futures.ProcessPoolExecutor(jobs)
+		parsed = executor.map(stg.read_stg_file, stg_paths, chunksize=max(1, min(256, total // (jobs * 4))))
+	else:
+		executor = None
+		parsed = map(stg.read_stg_file, stg_paths)
+	
+	stg_files = []
+	try:
+		with progress.Progress("Parsing STG files", total) as report:
+			for stgfile in parsed:
+				for number, line, reason in stgfile.problems:
+					if reason.startswith("unknown type"):
+						report.message(f"Warning: file {stgfile.path} line {number} has wrong type - commenting out to prevent FG not loading scenery")
+						stgfile.entries[number - 1] = "# " + line.strip()
 					else:
-						if object["etype"] in ["BUILDING_LIST", "TREE_LIST"]:
-							line = f"{object['etype']} {object['objectfile']} {object['material']} {object['longitude']} {object['latitude']} {object['elevation']}"
-						else:
-							line = f"{object['etype']} {object['objectfile']} {object['longitude']} {object['latitude']} {object['elevation']} {object['heading']}"
-							if "pitch" in object.keys():
-								line += f" {object['pitch']} {object['roll']}"
-					line += "\n"
-					outfp.write(line)
+						report.message(f"Warning: file {stgfile.path}, line {number} is malformed - not recalculating elevation")
+				stg_files.append(stgfile)
+				report.update(objects=sum(1 for entry in stgfile.entries if entry.__class__ is stg.STGObject))
+	finally:
+		if executor:
+			executor.shutdown()
+	return stg_files
+
+def recalc_elevs(stg_files, elevpipe):
+	objects = [object for stgfile in stg_files for object in stgfile.get_objects(stg.POSITIONED_VERBS)]
+	queried = [object for object in objects if not object.skip]
+	total = len(queried)
+	
+	with progress.Progress("Recalculating elevations", total, " objects") as report:
+		elevs = elevpipe.get_elevations([(object.lon, object.lat) for object in queried], callback=report.set)
+	
+	# get_elevations raises on missing or malformed fgelev replies instead of returning None
+	for object, elev in zip(queried, elevs):
+		object.elev = elev
+	for object in objects:
+		object.elev += object.offset
+	
+	print(f"Recalculated the elevation of {total} objects, skipped {len(objects) - total} objects")
+	return stg_files
+
+def write_stg_files(stg_files, outpaths, jobs=1):
+	# several inputs going into the same output file overwrite each other, only the last one survives
+	jobs_by_outfile = dict(zip(outpaths, stg_files))
+	
+	with concurrent.futures.ThreadPoolExecutor(max(1, jobs)) as executor, progress.Progress("Writing STG files", len(jobs_by_outfile)) as report:
+		futures = [executor.submit(stgfile.write, outfile) for outfile, stgfile in jobs_by_outfile.items()]
+		for future in concurrent.futures.as_completed(futures):
+			future.result()
+			report.update()
 	return 0
 
 def main():
@@ -192,6 +226,26 @@ def main():
 		default="fgelev",
 	)
 	
+	argp.add_argument(
+		"-j", "--jobs",
+		help="Number of processes to parse and threads to write STG files with, default is the number of CPUs",
+		type=int,
+		default=os.cpu_count() or 1
+	)
+	
+	argp.add_argument(
+		"-m", "--manifest",
+		help="Manifest recording the files processed by earlier runs, only files that changed since or whose terrain changed are processed again. " +
+			"Default is edit-stg-manifest.json in the cache directory, pass an empty string to process all files without a manifest.",
+		default=None
+	)
+	
+	argp.add_argument(
+		"-f", "--force",
+		help="Process all files even if the manifest says they are up to date",
+		action="store_true"
+	)
+	
 	argp.add_argument(
 		"-o", "--output",
 		help="Output STG file. Default is to overwrite the input file(s).",
@@ -199,17 +253,41 @@ def main():
 		default=["__INPUT__"]
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
-	infiles = files.find_input_files(args.input)
+	progress.apply_args(args)
+	infiles = args.input
 	outfiles = args.output
 	fgdata = args.fgdata
 	fgscenery = args.fgscenery
 	fgelev = args.fgelev
 	
-	elevpipe = make_fgelev_pipe(fgelev, fgscenery, fgdata)
-	input_stg = read_stg_files(infiles)
-	output_stg = recalc_elevs(input_stg, elevpipe)
-	exitstatus = write_stg_files(output_stg, outfiles)
+	stg_paths = find_stg_files(infiles)
+	outpaths = get_output_paths(stg_paths, outfiles)
+	
+	manifest = None
+	if args.manifest is None:
+		args.manifest = os.path.join(constants.CACHEDIR, "edit-stg-manifest.json")
+	if args.manifest:
+		manifest = Manifest(args.manifest, fgscenery)
+		if not args.force:
+			pending = [(inpath, outpath) for inpath, outpath in zip(stg_paths, outpaths) if not manifest.is_current(inpath, outpath)]
+			print(f"{len(stg_paths) - len(pending)} of {len(stg_paths)} STG files are up to date")
+			stg_paths, outpaths = [p[0] for p in pending], [p[1] for p in pending]
+	if not stg_paths:
+		return 0
+	
+	input_states = list(map(get_input_state, stg_paths)) if manifest else None
+	input_stg = read_stg_files(stg_paths, args.jobs)
+	with Pipe(fgelev, fgscenery, fgdata) as elevpipe:
+		output_stg = recalc_elevs(input_stg, elevpipe)
+	exitstatus = write_stg_files(output_stg, outpaths, args.jobs)
+	
+	if manifest:
+		for stgfile, outpath, input_state in zip(output_stg, outpaths, input_states):
+			manifest.update(stgfile, outpath, input_state)
+		manifest.save()
 	return exitstatus
 
 if __name__ == "__main__":
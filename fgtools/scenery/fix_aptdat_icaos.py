@@ -4,17 +4,18 @@
 import os
 import sys
 import csv
-import requests
 import argparse
 import shutil
 
 from fgtools.utils.files import find_input_files
 from fgtools.geo.coord import Coord
 from fgtools.utils import constants
+from fgtools.utils import progress
 
 def _get_ourairports_csv(what):
 	path = os.path.join(constants.CACHEDIR, what + ".csv")
 	if not os.path.isfile(path):
+		import requests
 		with open(path, "w") as f:
 			f.write(requests.get(f"https://davidmegginson.github.io/ourairports-data/{what}.csv").content.decode())
 	f = open(path, "r", newline="")
@@ -32,19 +33,16 @@ def get_ourairports_icao(airport, csv):
 		if len(airport["icao"]) != 4:
 			airport["newicao"] = matches[0]["icao"]
 	else:
-		print(f"No matching airport found for {airport['icao']} - skipping", end=" " * 100 + "\n")
+		progress.message(f"No matching airport found for {airport['icao']} - skipping")
 	return airport
 
 def process(files, output):
 	csv = _get_ourairports_csv("airports")
-	i = 0
 	n = 0
-	skipped = 0
-	total = len(files)
 	files_d = {}
+	report = progress.Progress("Parsing files", len(files))
 	for p in files:
-		print(f"Parsing files … {i / total * 100:.1f}% ({i} of {total} done, found {n} airports)", end="\r")
-		i += 1
+		report.update()
 		file_d = {"lines": [], "airports": {}}
 		with open(p, "r") as f:
 			file_d["lines"] = list(map(lambda l: list(filter(None, l)), map(lambda s: s.split(" "), filter(None, map(str.strip, f.readlines())))))
@@ -54,6 +52,7 @@ def process(files, output):
 				curicao = line[4]
 				skip = False
 				file_d["airports"][curicao] = {"icao": curicao}
+				report.count("airports")
 				n += 1
 			elif line[0] == "1302":
 				if line[1] == "datum_lon":
@@ -80,28 +79,24 @@ def process(files, output):
 			
 		for icao in list(file_d["airports"].keys()):
 			if not ("lon" in file_d["airports"][icao] and "lat" in file_d["airports"][icao]):
-				print(f"Unable to get longitude / latitude of airport {curicao} in file {p} - skipping", end=" " * 100 + "\n")
+				report.message(f"Unable to get longitude / latitude of airport {icao} in file {p} - skipping")
 				del file_d["airports"][icao]
+				report.count("airports", -1)
+				report.count("skipped")
 				n -= 1
-				skipped += 1
 		
 		files_d[p] = file_d
-	print(f"Parsing files … {i / total * 100:.1f}% ({i} of {total} done, found {n} airports, skipped {skipped})", end=" " * 100 + "\n")
+	report.close()
 	
-	i = 0
-	total = n
-	for p in files_d:
-		for icao in files_d[p]["airports"]:
-			print(f"Getting ICAOs for airports … {i / total * 100:.1f}% ({i} of {total} done)", end="\r")
-			i += 1
-			files_d[p]["airports"][icao] = get_ourairports_icao(files_d[p]["airports"][icao], csv)
-	print(f"Getting ICAOs for airports … {i / total * 100:.1f}% ({i} of {total} done)", end=" " * 100 + "\n")
+	with progress.Progress("Getting ICAOs for airports", n, " airports") as report:
+		for p in files_d:
+			for icao in files_d[p]["airports"]:
+				files_d[p]["airports"][icao] = get_ourairports_icao(files_d[p]["airports"][icao], csv)
+				report.update()
 	
-	i = 0
-	total = len(files_d)
+	report = progress.Progress("Writing new apt.dat files", len(files_d))
 	for p in files_d:
-		print(f"Writing new apt.dat files … {i / total * 100:.1f}% ({i} of {total} done)", end="\r")
-		i += 1
+		report.update()
 		if output == None:
 			outp = p
 		else:
@@ -122,9 +117,9 @@ def process(files, output):
 				f.write(" ".join(line) + "\n")
 		
 		if outp != newoutp:
-			print(f"Renaming file: {outp} -> {newoutp}", end=" " * 100 + "\n")
+			report.message(f"Renaming file: {outp} -> {newoutp}")
 			shutil.move(outp, newoutp)
-	print(f"Writing new apt.dat files … {i / total * 100:.1f}% ({i} of {total} done)", end=" " * 100 + "\n")
+	report.close()
 
 def main():
 	argp = argparse.ArgumentParser(description="Fix apt.dat ICAO's - some apt.dat files from the XPlane gateway have them of the form XAY0016 - this script gets the right ICAO from OurAirports data (if the airport is found there)")
@@ -142,7 +137,10 @@ def main():
 		default=None
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	infiles = find_input_files(args.input)
 	process(infiles, args.output)
@@ -3,26 +3,36 @@
 
 import sys
 import os
+import copy
 import argparse
-import requests
-import subprocess
 import typing
 import json
-import zipfile
+import math
+import heapq
 import shutil
 import logging
-import tqdm
+import threading
+import concurrent.futures
 if sys.version_info[0:2] >= (3, 9):
 	from importlib.resources import files as importlib_resources_files
 else:
 	from importlib_resources import files as importlib_resources_files
 
-import shapely.geometry
+import numpy
 
-from fgtools.geo import Rectangle, Coord, get_fg_tile_coords, get_fg_tile_span, get_fg_tile_indices, get_fg_tile_paths, FG_TILE_HEIGHT
+from fgtools.geo import Rectangle, Coord, make_rectangle, get_fg_tile_coords
+from fgtools.geo import get_fg_tile_indices_for_bboxes, merge_fg_tiles, get_hgt_tile_bbox, get_hgt_tile_names, bboxes_intersect
+from fgtools.geo import fg_tile_bbox, fg_tile_coords, fg_tile_path_from_index
 from fgtools import aptdat, get_logger
-from fgtools.utils.files import find_input_files, get_cached_file, get_newest_mtime
-from fgtools.utils import padded_print, read_timestamp, write_timestamp, format_size, download, run_command, quote
+from fgtools.utils.files import find_input_files, get_cached_file, write_atomic
+from fgtools.utils import format_size, parse_size, run_command, quote
+from fgtools.utils import downloader
+from fgtools.utils import archive
+from fgtools.utils import progress
+from fgtools.utils import telemetry
+from fgtools.utils.workspace import collect_garbage
+from fgtools.utils.tasks import TaskGraph, TaskError, FAILED
+from fgtools.utils.buildcache import BuildCache
 
 GEOFABRIK_REGIONS = {
 	"africa": [
@@ -75,26 +85,65 @@ GEOFABRIK_REGIONS = {
 }
 
 GEOFABRIK_DOWNLOAD_URL = "http://download.geofabrik.de/"
+LAND_POLYGONS_URL = "https://osmdata.openstreetmap.de/download/land-polygons-complete-4326.zip"
+
+# Maximum number of instances of each tool running at the same time - downloads are limited by bandwidth,
+# genapts, terrafit and tg-construct write to shared work folders / are multithreaded themselves. terrafit only fits
+# the tiles of one elevation tile per run, so two runs overlap the startup of one with the work of the other.
+DEFAULT_TOOL_LIMITS = {
+	"download": 4,
+	"unzip": 2,
+	"gdalchop": os.cpu_count() or 1,
+	"terrafit": 2,
+	"genapts": 1,
+	"osmium": 2,
+	"ogr2ogr": 2,
+	"ogr-decode": os.cpu_count() or 1,
+	# number of processes the tiles are split across, all of them together use the number of threads set with --threads
+	"tg-construct": 2,
+}
+# Estimated cost of constructing a tile without any polygons, in bytes of chopped data, see estimate_tile_costs
+TILE_BASE_COST = 64 * 1024
+# Grid in degrees the bboxes of OSM extracts are snapped to, see plan_osm_extracts
+OSM_EXTRACT_GRID = 0.25
 DEMSEARCH_URL = "http://www.imagico.de/map/dem_json.php?date=&lon={lon_ll}&lat={lat_ll}&lonE={lon_ur}&latE={lat_ur}&srtm=0&glcf1=0&glcf2=0&glcf3=0&glcf4=0&gls=0&cgiar=0&vf=1&aster=0&ca=0&ca2=0&ned1=0&ned3=0&ned2=0&srtm1=0&srtm1o=0"
 
 class OsmSelector:
+	# OGR layer of the OSM driver the selector applies to
+	LAYER = None
+	
 	def __init__(self, selector, material):
 		self.selector = selector
 		self.material = material
+	
+	def get_width(self):
+		return None
 
 class OsmSelectorPolygon(OsmSelector):
+	LAYER = "multipolygons"
+	
 	def __init__(self, selector, material):
 		OsmSelector.__init__(self, selector, material)
 
 class OsmSelectorLine(OsmSelector):
+	LAYER = "lines"
+	
 	def __init__(self, selector, material, line_width):
 		OsmSelector.__init__(self, selector, material)
 		self.line_width = line_width
+	
+	def get_width(self):
+		return self.line_width
 
 class OsmSelectorPoint(OsmSelector):
+	LAYER = "points"
+	
 	def __init__(self, selector, material, point_width):
 		OsmSelector.__init__(self, selector, material)
 		self.point_width = point_width
+	
+	def get_width(self):
+		return self.point_width
 
 
 OSM_MATERIAL_MAPPINGS = [
@@ -175,7 +224,9 @@ OSM_MATERIAL_MAPPINGS = [
 
 _region_boundary_cache = {}
 
-def get_region_boundary(region: str) -> shapely.geometry.Polygon:
+def get_region_boundary(region: str) -> "shapely.geometry.Polygon":
+	import shapely.geometry
+	
 	if region in _region_boundary_cache:
 		return _region_boundary_cache[region]
 	
@@ -192,6 +243,8 @@ def get_region_boundary(region: str) -> shapely.geometry.Polygon:
 	return _region_boundary_cache[region]
 
 def find_region(coord: Coord) -> str:
+	import shapely.geometry
+	
 	region = None
 	continent = None
 	for continent in GEOFABRIK_REGIONS:
@@ -213,26 +266,15 @@ def find_region(coord: Coord) -> str:
 	else:
 		return continent
 
+# Indices of all tiles touched by any of the bboxes, each tile only once
+def get_bbox_tiles(bboxes: typing.Iterable[Rectangle]) -> list[int]:
+	return get_fg_tile_indices_for_bboxes([[bbox.left, bbox.bottom, bbox.right, bbox.top] for bbox in bboxes]).tolist()
+
+# Rectangles covering every tile touched by any of the airports, each tile only once
 def get_airport_tiles(airports: typing.Iterable[aptdat.Airport]) -> list[Rectangle]:
-	tiles = []
-	for airport in airports:
-		ll = [airport.bbox.left, airport.bbox.bottom]
-		ll[1] = ll[1] - (ll[1] % FG_TILE_HEIGHT)
-		ll[0] = ll[0] - (ll[0] % get_fg_tile_span(ll[1]))
-		
-		ur = [airport.bbox.right, airport.bbox.top]
-		ur[1] = ur[1] + (FG_TILE_HEIGHT - (ur[1] % FG_TILE_HEIGHT))
-		ur[0] = ur[0] + (get_fg_tile_span(ur[1]) - (ur[0] % get_fg_tile_span(ur[1])))
-		
-		if ll[1] < -90:
-			ll[1] = -(ll[1] + 180)
-			ll[0] += 180
-		if ll[0] > 180:
-			ll[0] -= 360
-		
-		tile = Rectangle(ll, ur)
-		tiles.append(tile)
-	return tiles
+	bboxes, _ = aptdat.get_airport_extents(list(airports))
+	bboxes = bboxes[~numpy.isnan(bboxes).any(axis=1)]
+	return merge_fg_tiles(get_fg_tile_indices_for_bboxes(bboxes))
 
 def find_osm_regions(bboxes: typing.Iterable[Rectangle]):
 	regions = set()
@@ -244,351 +286,493 @@ def find_osm_regions(bboxes: typing.Iterable[Rectangle]):
 	regions.discard(None)
 	return regions
 
-def download_osm_data(regions: typing.Iterable[str], workspace: str):
+# Name of the files / directories belonging to one bbox
+def get_bbox_name(bbox: Rectangle) -> str:
+	return f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}"
+
+def get_osm_region_file(workspace: str, region: str) -> str:
+	return os.path.join(workspace, "data", "osm", os.path.basename(region) + ".osm.pbf")
+
+# Run an external command, raising TaskError when it fails - the output is written to the log file in that case
+def run_tool(cmd: str, log_path: str, env: typing.Optional[dict]=None):
+	if run_command(cmd, log_path, env=env) != 0:
+		raise TaskError(f"command '{cmd}' failed, see {log_path}.log for details")
+
+# Download a file as a build task, only transferring it if the remote file changed and resuming partial downloads
+# @param checksum_url	URL of a checksum file to verify the download against, like the .md5 files of Geofabrik
+def fetch_file(url: str, path: str, checksum_url: typing.Optional[str]=None):
+	try:
+		checksum = downloader.fetch_checksum(checksum_url) if checksum_url else None
+		return downloader.download_file(url, path, checksum=checksum)
+	except downloader.DownloadError as e:
+		raise TaskError(str(e))
+
+def download_osm_region(workspace: str, region: str):
+	url = GEOFABRIK_DOWNLOAD_URL + region + "-latest.osm.pbf"
+	return fetch_file(url, get_osm_region_file(workspace, region), checksum_url=url + ".md5")
+
+def download_land_polygons(workspace: str):
+	return fetch_file(LAND_POLYGONS_URL, os.path.join(workspace, "data", "osm", "land-polygons.zip"))
+
+def extract_land_polygons(workspace: str):
 	osm_data_folder = os.path.join(workspace, "data", "osm")
-	os.makedirs(osm_data_folder, exist_ok=True)
-	
-	osm_zips = []
-	any_data_files_updated = False
-	pbar = tqdm.tqdm(desc="Downloading OSM landuse data for regions", total=len(regions), unit=" regions")
-	for i, region in enumerate(regions):
-		path = os.path.join(osm_data_folder, region.split("/")[-1] + ".osm.pbf")
-		osm_zips.append(path)
-		old_mtime = os.path.getmtime(path) if os.path.exists(path) else -1
-		pbar.update(1)
-		if not download(
-			GEOFABRIK_DOWNLOAD_URL + region + "-latest.osm.pbf",
-			path,
-			prolog=f"Downloading OSM landuse data … {i + 1} of {len(regions)} ({region}) - ",
-		):
-			sys.exit(1)
-		
-		if old_mtime != os.path.getmtime(path):
-			any_data_files_updated = True
-	
-	if not download(
-		"https://osmdata.openstreetmap.de/download/land-polygons-complete-4326.zip",
-		os.path.join(osm_data_folder, "land-polygons.zip"),
-		prolog=f"Downloading OSM landmass polygons - "
-	):
-		sys.exit(1)
-	
-	padded_print(f"Extracting OSM landmass polygons …")
-	zip_path = os.path.join(osm_data_folder, "land-polygons.zip")
-	zf = zipfile.ZipFile(zip_path, mode="r")
-	for zip_info in zf.infolist():
-		if zip_info.is_dir():
-			continue
-		zip_info.filename = os.path.basename(zip_info.filename)
-		if zip_info.filename == "README.txt":
-			continue
-		out_path = os.path.join(osm_data_folder, zip_info.filename)
-		if not os.path.exists(out_path) or os.path.getmtime(zip_path) >= os.path.getmtime(out_path):
-			zf.extract(zip_info, osm_data_folder)
-			any_data_files_updated = True
+	try:
+		return archive.extract_archive(os.path.join(osm_data_folder, "land-polygons.zip"), osm_data_folder,
+			select=lambda name: os.path.basename(name) != "README.txt", flatten=True)
+	except archive.ExtractError as e:
+		raise TaskError(str(e))
 
-def download_dem_data(bboxes: typing.Iterable[Rectangle], workspace: str):
-	dem_data_folder = os.path.join(workspace, "data", "dem")
-	os.makedirs(dem_data_folder, exist_ok=True)
-	dempkgs = {}
-	demzips = set()
-	
+# Find the elevation data packages covering the bboxes
+# @return	dict mapping package names to the package records returned by the DEM search
+def search_dem_packages(bboxes: typing.Iterable[Rectangle]) -> dict:
+	import requests
 	
-	for i, bbox in enumerate(bboxes):
-		padded_print(f"Searching elevation data packages … {i + 1} of {len(bboxes)}", end="\r")
-		demsearch = requests.get(
-			DEMSEARCH_URL.format(lon_ll=bbox.left, lat_ll=bbox.bottom, lon_ur=bbox.right, lat_ur=bbox.top)
-		)
+	dempkgs = {}
+	for bbox in progress.track(bboxes, "Searching elevation data packages"):
+		url = DEMSEARCH_URL.format(lon_ll=bbox.left, lat_ll=bbox.bottom, lon_ur=bbox.right, lat_ur=bbox.top)
+		demsearch = requests.get(url)
 		if demsearch.status_code >= 400:
-			print(f"\nError {r.status_code}: {url}")
+			get_logger().fatal(f"Error {demsearch.status_code}: {url}")
 			sys.exit(1)
 		
 		for dempkg in demsearch.json():
 			dempkgs[dempkg["name"]] = dempkg
-	padded_print(f"Searching elevation data packages … {len(bboxes)} of {len(bboxes)}")
-	
-	
-	for i, dempkg in enumerate(dempkgs.values()):
-		path = os.path.join(dem_data_folder, dempkg["name"])
-		if not download(
-			dempkg["link"], path, 
-			prolog=f"Downloading elevation data packages … {i + 1} of {len(dempkgs)} ({dempkg['name']}) - ",
-		):
-			sys.exit(1)
-		
-		demzips.add(path)
-	
-	any_data_files_updated = False
-	for i, demzip in enumerate(demzips):
-		padded_print(f"Extracting elevation data … {i + 1} of {len(demzips)} ({os.path.split(demzip)[-1]})", end="\r")
-		zf = zipfile.ZipFile(demzip, mode="r")
-		for zip_info in zf.infolist():
-			if zip_info.is_dir():
-				continue
-			zip_info.filename = os.path.basename(zip_info.filename)
-			dem_tile_path = os.path.join(dem_data_folder, zip_info.filename)
-			if not os.path.exists(dem_tile_path) or os.path.getmtime(demzip) >= os.path.getmtime(dem_tile_path):
-				zf.extract(zip_info, dem_data_folder)
-				any_data_files_updated = True
-	padded_print(f"Extracting elevation data … {len(demzips)} of {len(demzips)}")
-	
-	return any_data_files_updated
-
-def process_dem_data(workspace: str, bboxes: typing.Iterable[Rectangle]):
+	return dempkgs
+
+def download_dem_package(workspace: str, dempkg: dict):
+	return fetch_file(dempkg["link"], os.path.join(workspace, "data", "dem", dempkg["name"]))
+
+# Extract the elevation tiles of a package covering the bboxes, None to extract all of them
+def extract_dem_package(workspace: str, demzip: str, bboxes: typing.Optional[typing.Iterable[Rectangle]]=None):
+	dem_data_folder = os.path.join(workspace, "data", "dem")
+	select = None
+	if bboxes is not None:
+		bboxes = list(bboxes)
+		def select(name):
+			tile_bbox = get_hgt_tile_bbox(name)
+			return tile_bbox is not None and any(bboxes_intersect(tile_bbox, bbox) for bbox in bboxes)
+	try:
+		return archive.extract_archive(demzip, dem_data_folder, select=select, flatten=True)
+	except archive.ExtractError as e:
+		raise TaskError(str(e))
+
+def get_dem_tile_files(workspace: str, tiles: typing.Iterable[int], suffix: str=".arr.gz") -> list[str]:
+	return [os.path.join(workspace, "work", "dem", fg_tile_path_from_index(tile) + suffix) for tile in tiles]
+
+# Group the FG tiles of the bboxes by the elevation tiles covering them, so each group is chopped by one gdalchop run
+# reading only the elevation tiles it needs. Tiles requested by more than one bbox are only chopped once.
+# @return	list of (elevation tile names, FG tile indices) tuples
+def plan_dem_batches(bboxes: typing.Iterable[Rectangle]) -> list[tuple[tuple[str, ...], list[int]]]:
+	batches = {}
+	for tile in get_bbox_tiles(bboxes):
+		batches.setdefault(tuple(get_hgt_tile_names(fg_tile_bbox(*fg_tile_coords(tile)))), []).append(tile)
+	return sorted(batches.items())
+
+# Name of the gdalchop / terrafit tasks and log files of a batch returned by plan_dem_batches
+def get_dem_batch_name(hgtnames: typing.Iterable[str]) -> str:
+	return "+".join(os.path.splitext(hgtname)[0] for hgtname in hgtnames)
+
+def get_gdalchop_command(workspace: str, tiles: typing.Iterable[int], hgtfiles: typing.Iterable[str]=()) -> str:
+	hgtfiles_string = "".join(" " + quote(hgtfile) for hgtfile in hgtfiles)
+	return f"gdalchop {quote(os.path.join(workspace, 'work', 'dem'))}{hgtfiles_string} -- {' '.join(map(str, tiles))}"
+
+def chop_dem_data(workspace: str, hgtnames: typing.Iterable[str], tiles: typing.Iterable[int]):
 	dem_data_folder = os.path.join(workspace, "data", "dem")
-	dem_work_folder = os.path.join(workspace, 'work', 'dem')
-	os.makedirs(dem_work_folder, exist_ok=True)
-	hgtfiles = sorted(find_input_files(dem_data_folder, suffix=".hgt"), reverse=True)
-	any_files_updated = False
-	timestamp_file = os.path.join(dem_data_folder, "gdalchop")
-	ts = read_timestamp(timestamp_file)
-	for i, bbox in enumerate(bboxes):
-		padded_print(f"Chopping elevation data … {i + 1} of {len(bboxes)} ((n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})", end="\r")
-		tile_paths = list(map(lambda s: s + ".arr.gz", get_fg_tile_paths(bbox)))
-		if get_newest_mtime(hgtfiles) < ts and all(os.path.exists(p) for p in tile_paths) and get_newest_mtime(tile_paths) <= ts:
+	os.makedirs(os.path.join(workspace, "work", "dem"), exist_ok=True)
+	# elevation tiles are looked up when the task runs since the packages are only extracted by earlier tasks
+	available = {}
+	for hgtfile in sorted(find_input_files(dem_data_folder, suffix=".hgt")):
+		available.setdefault(os.path.basename(hgtfile).upper(), hgtfile)
+	hgtfiles = [available[hgtname.upper()] for hgtname in hgtnames if hgtname.upper() in available]
+	if not hgtfiles:
+		# no elevation data, for example over the ocean - tg-construct uses an elevation of 0 there
+		get_logger().info(f"No elevation data for {get_dem_batch_name(hgtnames)}, not chopping {len(tiles)} tiles")
+		return
+	run_tool(get_gdalchop_command(workspace, tiles, hgtfiles), os.path.join(workspace, "log", "dem", "gdalchop_" + get_dem_batch_name(hgtnames)))
+
+# @param arrfiles	the .arr.gz files to fit, None to fit all of them
+def get_terrafit_command(workspace: str, arrfiles: typing.Optional[typing.Iterable[str]]=None) -> str:
+	if arrfiles is None:
+		arrfiles = [os.path.join(workspace, "work", "dem")]
+	return "terrafit -m 1000 -x 20000 -e 5 " + " ".join(map(quote, arrfiles))
+
+# Run terrafit on the .arr.gz files that were chopped since their .fit.gz files were written
+def fit_dem_data(workspace: str, arrfiles: typing.Iterable[str], log_path: str):
+	changed = []
+	for arrfile in arrfiles:
+		if not os.path.isfile(arrfile):
 			continue
-		
-		any_files_updated = True
-		hgtfiles_string = " ".join(map(quote, hgtfiles))
-		cmd = f"gdalchop {quote(dem_work_folder)} {hgtfiles_string} -- {' '.join(map(str, get_fg_tile_indices(bbox)))}"
-		get_logger().debug(f"Running command: {cmd}")
-		p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-		if p.returncode != 0:
-			log_path = os.path.join(workspace, "log", "dem", f"N{bbox.top}E{bbox.left}S{bbox.bottom}W{bbox.right}.log")
-			os.makedirs(os.path.join(workspace, "log", "dem"), exist_ok=True)
-			with open(log_path, "wb") as log_file:
-				log_file.write(p.stdout)
-			get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {log_path} for details.")
-			sys.exit(1)
-	padded_print(f"Chopping elevation data … {i + 1} of {len(bboxes)} ((n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})")
-	write_timestamp(timestamp_file)
-	
-	num_arrfiles = len(find_input_files(dem_work_folder, suffix=".arr.gz"))
-	cmd = f"terrafit -m 1000 -x 20000 -e 5 {quote(dem_work_folder)}"
-	get_logger().debug(f"Running command: {cmd}")
-	p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True, text=True, bufsize=1)
-	i = 1
-	cur_path = ""
-	for line in p.stdout:
-		line = line.strip().split()
-		if len(line) >= 3 and line[2] in ("Skipping", "Working"):
-			i += 1
-			if line[2] == "Working":
-				cur_path = line[6][:-2]
-				any_files_updated = True
+		fitfile = arrfile[:-len(".arr.gz")] + ".fit.gz"
+		if not os.path.isfile(fitfile) or os.path.getmtime(fitfile) < os.path.getmtime(arrfile):
+			changed.append(arrfile)
+	if changed:
+		run_tool(get_terrafit_command(workspace, changed), log_path)
+
+def find_genapts() -> str:
+	for genapts in ("genapts", "genapts850"):
+		if shutil.which(genapts):
+			return genapts
+	get_logger().fatal("No genapts executable found, cannot build airports - exiting !")
+	sys.exit(1)
+
+def get_genapts_command(workspace: str, aptdat_file: str, genapts: str) -> str:
+	return f"{quote(genapts)} --input={quote(aptdat_file)} --work={quote(os.path.join(workspace, 'work'))} --dem-path=dem --max-slope=1"
+
+def get_osm_extract_file(workspace: str, bbox: Rectangle, region: str) -> str:
+	return os.path.join(workspace, "data", "osm", f"{os.path.basename(region)}-{get_bbox_name(bbox)}.osm.pbf")
+
+def get_osm_bbox_file(workspace: str, bbox: Rectangle) -> str:
+	return os.path.join(workspace, "data", "osm", f"{get_bbox_name(bbox)}.osm.pbf")
+
+def get_landmass_file(workspace: str, bbox: Rectangle=None) -> str:
+	if bbox is None:
+		return os.path.join(workspace, "data", "osm", "land_polygons.shp")
+	return os.path.join(workspace, "data", "osm", f"landmass-{get_bbox_name(bbox)}.shp")
+
+# Snap a bbox outwards to the grid the OSM extracts are cut on, so nearby bboxes share their extracts
+def snap_bbox(bbox: Rectangle, grid: float=OSM_EXTRACT_GRID) -> Rectangle:
+	return make_rectangle(math.floor(bbox.left / grid) * grid, math.floor(bbox.bottom / grid) * grid,
+		math.ceil(bbox.right / grid) * grid, math.ceil(bbox.top / grid) * grid)
+
+# Areas to cut OSM extracts for - the bboxes snapped to the extract grid, with overlapping bboxes merged, as every
+# extract is decoded into the same material folders and overlaps would end up there twice, and adjacent bboxes
+# merged as long as the rectangle around them isn't larger than the bboxes themselves
+# @return	list of disjoint Rectangle objects
+def plan_osm_extracts(bboxes: typing.Iterable[Rectangle]) -> list[Rectangle]:
+	area = lambda bbox: (bbox.right - bbox.left) * (bbox.top - bbox.bottom)
+	extracts = [snap_bbox(bbox) for bbox in bboxes]
+	merged = True
+	while merged:
+		merged = False
+		for i in range(len(extracts)):
+			for j in range(i + 1, len(extracts)):
+				a, b = extracts[i], extracts[j]
+				union = make_rectangle(min(a.left, b.left), min(a.bottom, b.bottom), max(a.right, b.right), max(a.top, b.top))
+				overlap = a.left < b.right and b.left < a.right and a.bottom < b.top and b.bottom < a.top
+				if overlap or area(union) <= area(a) + area(b) + 1e-9:
+					extracts[i] = union
+					del extracts[j]
+					merged = True
+					break
+			if merged:
+				break
+	return sorted(extracts, key=lambda bbox: (bbox.bottom, bbox.left))
+
+# Index of the extracts cut from a region file, recording the version of the region file they were cut from
+# and their bboxes, so later builds can reuse them or cut from them instead of reading the whole region again
+def get_osm_extract_index_path(workspace: str, region: str) -> str:
+	return os.path.join(workspace, "data", "osm", f".{os.path.basename(region)}.extracts.json")
+
+# Command cutting one bbox from a .osm.pbf file - the region file unless source is given
+def get_osmium_extract_command(workspace: str, bbox: Rectangle, region: str, output: typing.Optional[str]=None, source: typing.Optional[str]=None) -> str:
+	return "osmium extract -b " + ",".join(map(str, (bbox.left, bbox.bottom, bbox.right, bbox.top))) + \
+		f" -O -o {quote(output or get_osm_extract_file(workspace, bbox, region))} {quote(source or get_osm_region_file(workspace, region))}"
+
+# Command cutting all extracts listed in an osmium extract config file from the region file in a single read
+def get_osmium_extract_config_command(workspace: str, region: str, config_path: str) -> str:
+	return f"osmium extract --config {quote(config_path)} --overwrite {quote(get_osm_region_file(workspace, region))}"
+
+# Cut extracts from a region file. Extracts cut from the same version of the region file earlier are kept, and
+# extracts inside one of them are cut from that smaller file. All others are cut in one pass over the region file.
+# @param extracts	list of (bbox, output path) tuples
+def extract_osm_region(workspace: str, region: str, extracts: typing.Iterable[typing.Tuple[Rectangle, str]]):
+	region_file = get_osm_region_file(workspace, region)
+	log_path = os.path.join(workspace, "log", "osm", f"osmium_extract_{os.path.basename(region)}")
+	st = os.stat(region_file)
+	version = [st.st_size, st.st_mtime_ns]
+	index_path = get_osm_extract_index_path(workspace, region)
+	try:
+		with open(index_path, "r") as f:
+			index = json.load(f)
+	except (OSError, ValueError):
+		index = {}
+	# output path => bbox as list, of the extracts of the current region file that still exist
+	index = dict((path, entry["bbox"]) for path, entry in index.items() if entry.get("version") == version and os.path.isfile(path))
+	
+	extracts = [(bbox, path) for bbox, path in extracts if index.get(path) != [bbox.left, bbox.bottom, bbox.right, bbox.top]]
+	outputs = set(path for bbox, path in extracts)
+	sources = sorted((os.path.getsize(path), path, entry) for path, entry in index.items() if path not in outputs)
+	from_region = []
+	for bbox, path in extracts:
+		for size, source, (left, bottom, right, top) in sources:
+			if left <= bbox.left and bottom <= bbox.bottom and right >= bbox.right and top >= bbox.top:
+				run_tool(get_osmium_extract_command(workspace, bbox, region, path, source), log_path)
+				break
 		else:
-			p.poll()
-		padded_print(f"Fitting elevation data … {i + 1} of {num_arrfiles} ({os.path.split(cur_path)[-1]})", end="\r")
-		if p.returncode != None and p.returncode != 0:
-			log_path = os.path.join(workspace, "log", "dem", os.path.split(arrfile)[-1])
-			os.makedirs(os.path.join(workspace, "log", "dem"))
-			with open(log_path, "wb") as log_file:
-				log_file.write(p.stdout)
-			get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {log_path} for details.")
-			sys.exit(1)
-	padded_print(f"Fitting elevation data … {num_arrfiles} of {num_arrfiles}")
-	
-	return any_files_updated
+			from_region.append((bbox, path))
+	
+	if from_region:
+		config_path = os.path.join(workspace, "data", "osm", f".{os.path.basename(region)}.extract-config.json")
+		config = {
+			"directory": os.path.join(workspace, "data", "osm"),
+			"extracts": [{"output": os.path.basename(path), "output_format": "pbf", "bbox": [bbox.left, bbox.bottom, bbox.right, bbox.top]}
+				for bbox, path in from_region]
+		}
+		write_atomic(config_path, json.dumps(config, indent="\t"))
+		run_tool(get_osmium_extract_config_command(workspace, region, config_path), log_path)
+	
+	for bbox, path in extracts:
+		index[path] = [bbox.left, bbox.bottom, bbox.right, bbox.top]
+	write_atomic(index_path, json.dumps(dict((path, {"version": version, "bbox": bbox}) for path, bbox in index.items())))
 
-def process_airports(workspace, aptdat_files):
-	apt_data_folder = os.path.join(workspace, "data", "apt")
-	work_folder = os.path.join(workspace, "work")
-	dem_work_folder = os.path.join(workspace, "work", "dem")
-	airportobj_folder = os.path.join(work_folder, "AirportObj")
-	airportarea_folder = os.path.join(work_folder, "AirportArea")
-	os.makedirs(apt_data_folder, exist_ok=True)
-	
-	any_files_updated = False
-	
-	genapts_possibilities = ["genapts", "genapts850"]
-	genapts = None
-	for genapts_possibility in genapts_possibilities:
-		if shutil.which(genapts_possibility):
-			genapts = genapts_possibility
-			break
-	
-	if not genapts:
-		get_logger().fatal("No genapts executable found, cannot build airports - exiting !")
-		sys.exit(1)
-	
-	timestamp_file = os.path.join(apt_data_folder, "genapts")
-	ts = read_timestamp(timestamp_file)
-	for i, aptdat_file in enumerate(aptdat_files):
-		padded_print(f"Processing apt.dat files … {i + 1} of {len(aptdat_files)} ({os.path.basename(aptdat_file)})", end="\r")
-		if ts > os.path.getmtime(aptdat_file) and os.path.exists(airportarea_folder) and os.path.exists(airportobj_folder) \
-			and get_newest_mtime((airportarea_folder, airportobj_folder)) < ts:
-			continue
-		
-		any_files_updated = True
-		
-		cmd = f"{quote(genapts)} --input={quote(aptdat_file)} --work={quote(work_folder)} --dem-path=dem --max-slope=1"
-		get_logger().debug(f"Running command: {cmd}")
-		p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-		if p.returncode != 0:
-			log_path = os.path.join(workspace, "log", "apt", os.path.split(aptdat_file)[-1])
-			os.makedirs(os.path.join(workspace, "log", "apt"), exist_ok=True)
-			with open(log_path, "wb") as log_file:
-				log_file.write(p.stdout)
-			get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {log_path} for details.")
-			sys.exit(1)
-	padded_print(f"Processing apt.dat files … {len(aptdat_files)} of {len(aptdat_files)} ({os.path.basename(aptdat_file)})")
-	write_timestamp(aptdat_file)
-	
-	return any_files_updated
+def get_osmium_merge_command(workspace: str, bbox: Rectangle, regions: typing.Iterable[str]) -> str:
+	data_files = [quote(get_osm_extract_file(workspace, bbox, region)) for region in regions]
+	return "osmium merge " + " ".join(data_files) + " --overwrite -o " + quote(get_osm_bbox_file(workspace, bbox))
 
-def ogr_decode(workspace, bbox, cmd, material, work_dir, data_file):
-	timestamp_file = os.path.join(os.path.dirname(data_file), "ogr-decode_" + os.path.basename(data_file) + "_" + material)
-	ts = read_timestamp(timestamp_file)
-	if os.path.exists(work_dir) and ts > os.path.getmtime(data_file):
-		return False
-	
+# Clip the land polygons to a bbox - -spat makes ogr2ogr skip the polygons outside of it before clipping
+def get_ogr2ogr_command(workspace: str, bbox: Rectangle) -> str:
+	return f"ogr2ogr -spat {bbox.left} {bbox.bottom} {bbox.right} {bbox.top} -clipsrc spat_extent -overwrite " + \
+		f"{quote(get_landmass_file(workspace, bbox))} {quote(get_landmass_file(workspace))}"
+
+def get_ogr_decode_env() -> dict:
 	env = os.environ.copy()
 	if not "OSM_CONFIG_FILE" in env:
-		env["OSM_CONFIG_FILE"] = importlib_resources_files("fgtools.scenery").joinpath("osmconf.ini")
-	get_logger().debug(f"Running command: {cmd}")
-	p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True, env=env)
-	if p.returncode != 0:
-		log_path = os.path.join(workspace, "log", "osm", os.path.split(timestamp_file)[-1])
-		os.makedirs(os.path.join(workspace, "log", "osm"), exist_ok=True)
-		with open(log_path, "wb") as log_file:
-			log_file.write(p.stdout)
-		get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {log_path} for details.")
-		sys.exit(1)
-	
-	write_timestamp(timestamp_file)
-	return True
+		env["OSM_CONFIG_FILE"] = str(importlib_resources_files("fgtools.scenery").joinpath("osmconf.ini"))
+	return env
 
-def ogr_decode_polygon(workspace, bbox, mapping):
-	osm_data_folder = os.path.join(workspace, "data", "osm")
-	data_file = os.path.join(osm_data_folder, f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")
-	work_dir = os.path.join(workspace, "work", mapping.material)
-	cmd = f"ogr-decode --area-type {quote(mapping.material)} --where {quote(mapping.selector)} {quote(work_dir)} {quote(data_file)} multipolygons"
-	return ogr_decode(workspace, bbox, cmd, mapping.material, work_dir, data_file)
+# ogr-decode command decoding the features selected by a material mapping, or the landmass polygons if mapping is None
+def get_ogr_decode_command(workspace: str, bbox: Rectangle, mapping: typing.Optional[OsmSelector]=None) -> str:
+	if mapping is None:
+		return f"ogr-decode --area-type Default {quote(os.path.join(workspace, 'work', 'Default'))} {quote(get_landmass_file(workspace, bbox))}"
+	
+	work_dir = quote(os.path.join(workspace, "work", mapping.material))
+	data_file = quote(get_osm_bbox_file(workspace, bbox))
+	if isinstance(mapping, OsmSelectorLine):
+		options = f"--line-width {quote(mapping.line_width)} --line-width-column width "
+	elif isinstance(mapping, OsmSelectorPoint):
+		options = f"--point-width {quote(mapping.point_width)} "
+	else:
+		options = ""
+	return f"ogr-decode {options}--area-type {quote(mapping.material)} --where {quote(mapping.selector)} {work_dir} {data_file} {mapping.LAYER}"
 
-def ogr_decode_line(workspace, bbox, mapping):
-	osm_data_folder = os.path.join(workspace, "data", "osm")
-	data_file = os.path.join(osm_data_folder, f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")
-	work_dir = os.path.join(workspace, "work", mapping.material)
-	cmd = f"ogr-decode --line-width {quote(mapping.line_width)} --line-width-column width --area-type {quote(mapping.material)} --where {quote(mapping.selector)} {quote(work_dir)} {quote(data_file)} lines"
-	return ogr_decode(workspace, bbox, cmd, mapping.material, work_dir, data_file)
+# Merge the mappings decoding into the same material from the same layer with the same width into one mapping
+# whose selector matches any of theirs, so each .osm.pbf is read once per material and layer instead of once per mapping
+# @return	list of OsmSelector objects, in the order of the first mapping of each group
+def group_material_mappings(mappings: typing.Iterable[OsmSelector]) -> list[OsmSelector]:
+	groups = {}
+	for mapping in mappings:
+		groups.setdefault((mapping.__class__, mapping.material, mapping.get_width()), []).append(mapping)
+	
+	grouped = []
+	for members in groups.values():
+		selectors = list(dict.fromkeys(member.selector for member in members))
+		mapping = copy.copy(members[0])
+		if len(selectors) > 1:
+			mapping.selector = " or ".join(f"({selector})" for selector in selectors)
+		grouped.append(mapping)
+	return grouped
 
-def ogr_decode_point(workspace, bbox, mapping):
-	osm_data_folder = os.path.join(workspace, "data", "osm")
-	data_file = os.path.join(osm_data_folder, f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")
-	work_dir = os.path.join(workspace, "work", mapping.material)
-	cmd = f"ogr-decode --point-width {quote(mapping.line_width)} --area-type {quote(mapping.material)} --where {quote(mapping.selector)} {quote(work_dir)} {quote(data_file)} points"
-	return ogr_decode(workspace, bbox, cmd, mapping.material, work_dir, data_file)
+# Name of the ogr-decode task / log file of a material mapping
+def get_ogr_decode_name(mapping: OsmSelector) -> str:
+	name = f"{mapping.material} {mapping.LAYER}"
+	if mapping.get_width() is not None:
+		name += f" {mapping.get_width()}"
+	return name
+
+# Work folders tg-construct reads, one per material plus elevation and airport data
+def get_terrain_work_dirs(workspace: str) -> list[str]:
+	work_dir = os.path.join(workspace, "work")
+	names = sorted({mapping.material for mapping in OSM_MATERIAL_MAPPINGS}) + ["dem", "AirportArea", "AirportObj", "Default"]
+	return [os.path.join(work_dir, name) for name in names]
+
+# @param num_threads	number of threads tg-construct uses, None to leave the option out
+def get_tg_construct_command(workspace: str, tiles: typing.Iterable[int], output_path: str, num_threads: typing.Optional[int]=0) -> str:
+	work_dir = os.path.join(workspace, "work")
+	output_path = os.path.join(output_path, "Terrain")
+	cmd = "tg-construct "
+	if num_threads is not None:
+		cmd += f"--threads={num_threads or (os.cpu_count() - 1) or 1} "
+	return cmd + f"--output-dir={quote(output_path)} --work-dir={quote(work_dir)} " + \
+		f"--priorities={quote(importlib_resources_files('fgtools.scenery').joinpath('tg_priorities.txt'))} " + \
+		"--tile-id=" + " --tile-id=".join(map(str, tiles)) + " " + \
+		" ".join(quote(os.path.basename(path)) for path in get_terrain_work_dirs(workspace))
+
+# Estimated cost of constructing each tile - the size of the data chopped into the tile folders of the work
+# directories, which grows with the number of polygons tg-construct has to clip and triangulate, plus a constant
+# for the work every tile needs
+# @return	dict mapping tile indices to costs
+def estimate_tile_costs(workspace: str, tiles: typing.Iterable[int]) -> dict:
+	# tile folder => dict mapping tile indices to the size of their files
+	folder_sizes = {}
+	costs = {}
+	for tile in tiles:
+		folder = os.path.dirname(fg_tile_path_from_index(tile))
+		if folder not in folder_sizes:
+			sizes = folder_sizes[folder] = {}
+			for work_dir in get_terrain_work_dirs(workspace):
+				try:
+					entries = list(os.scandir(os.path.join(work_dir, folder)))
+				except OSError:
+					continue
+				for entry in entries:
+					if entry.is_file():
+						index = entry.name.split(".", 1)[0]
+						sizes[index] = sizes.get(index, 0) + entry.stat().st_size
+		costs[tile] = TILE_BASE_COST + folder_sizes[folder].get(str(tile), 0)
+	return costs
 
-def process_landuse_data(workspace: str, bboxes: typing.Iterable[Rectangle], regions: typing.Iterable[str]):
+# Split tiles into at most num_batches batches of about the same estimated cost. The rows of tiles within each
+# 1x1 degree cell are assigned whole, most expensive first, to the batch with the lowest cost so far, so
+# neighbouring tiles mostly end up in the same tg-construct run.
+# @param costs	dict mapping tile indices to estimated costs, as returned by estimate_tile_costs
+# @return	list of lists of tile indices
+def partition_tiles(costs: dict, num_batches: int) -> list[list[int]]:
+	rows = {}
+	for tile in costs:
+		lon, lat = fg_tile_coords(tile)
+		rows.setdefault((math.floor(lon), lat), []).append(tile)
+	rows = sorted(rows.values(), key=lambda row: (-sum(costs[tile] for tile in row), min(row)))
+	
+	# heap of [cost, batch number, tiles]
+	batches = [[0, i, []] for i in range(max(1, min(num_batches, len(rows))))]
+	for row in rows:
+		batch = heapq.heappop(batches)
+		batch[0] += sum(costs[tile] for tile in row)
+		batch[2].extend(row)
+		heapq.heappush(batches, batch)
+	return [sorted(batch[2]) for batch in sorted(batches, key=lambda batch: batch[1]) if batch[2]]
+
+# Construct the terrain of the tiles with several tg-construct processes at once, each building one batch of
+# tiles with its share of the threads. A failed batch is retried on its own, while the other batches keep running.
+# @param jobs	number of tg-construct processes running at the same time
+# @param num_threads	total number of threads of all processes, 0 for the number of CPUs - 1
+# @param retries	number of times a failed batch is run again
+def construct_terrain(workspace: str, output_path: str, tiles: typing.Iterable[int], num_threads: int=0, jobs: int=2,
+					retries: int=1):
+	costs = estimate_tile_costs(workspace, sorted(set(tiles)))
+	if not costs:
+		return
+	batches = partition_tiles(costs, jobs)
+	threads = max(1, (num_threads or (os.cpu_count() or 2) - 1) // len(batches))
+	lock = threading.Lock()
+	
+	def construct(i, batch):
+		log_path = os.path.join(workspace, "log", "terrain", f"tg-construct_{i + 1}_of_{len(batches)}")
+		cmd = get_tg_construct_command(workspace, batch, output_path, threads)
+		for attempt in range(retries + 1):
+			if run_command(cmd, log_path) == 0:
+				return True
+			with lock:
+				if attempt < retries:
+					progress.message(f"tg-construct batch {i + 1} of {len(batches)} failed, retrying ({attempt + 1} of {retries}) - see {log_path}.log")
+				else:
+					progress.message(f"tg-construct batch {i + 1} of {len(batches)} failed - see {log_path}.log")
+		return False
+	
+	with concurrent.futures.ThreadPoolExecutor(len(batches)) as executor:
+		results = list(executor.map(telemetry.wrap(construct, "tg-construct batch"), range(len(batches)), batches))
+	failed = [batch for batch, succeeded in zip(batches, results) if not succeeded]
+	if failed:
+		raise TaskError(f"tg-construct failed for {len(failed)} of {len(batches)} batches, {sum(map(len, failed))} tiles")
+
+# Build the graph of all tasks needed to generate the terrain for the bboxes.
+# Each download, extraction and tool invocation is one task, with the files it reads and writes declared so
+# that independent work - for example decoding the OSM data of one bbox while gdalchop runs for another - overlaps.
+# Tool invocations carry their command line as signature, so the build cache skips them when neither the command
+# nor the inputs changed. Downloads and extractions always run, they check the remote file / the archive index themselves.
+# @param dempkgs	elevation data packages to download, as returned by search_dem_packages, None to skip downloading
+# @param construct_jobs	number of tg-construct processes running at the same time, see construct_terrain
+# @return	TaskGraph
+def build_tasks(workspace: str, output_path: str, bboxes: typing.Iterable[Rectangle], regions: typing.Iterable[str],
+				aptdat_files: typing.Iterable[str], dempkgs: typing.Optional[dict]=None, num_threads: int=0,
+				download_osm: bool=True, construct_jobs: int=2, construct_retries: int=1) -> TaskGraph:
 	osm_data_folder = os.path.join(workspace, "data", "osm")
-	landmass_file = os.path.join(osm_data_folder, "land_polygons.shp")
+	dem_data_folder = os.path.join(workspace, "data", "dem")
+	work_folder = os.path.join(workspace, "work")
+	dem_work_folder = os.path.join(work_folder, "dem")
+	osm_log_folder = os.path.join(workspace, "log", "osm")
+	regions = sorted(regions)
 	
-	any_files_updated = False
-	for i, bbox in enumerate(bboxes):
-		any_data_files_updated = False
+	tasks = TaskGraph()
+	if download_osm:
 		for region in regions:
-			padded_print(f"Extracting needed OSM data … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right}) from {region}", end="\r")
-			
-			data_file = os.path.join(osm_data_folder, os.path.basename(region)) + ".osm.pbf"
-			if not os.path.exists(data_file) or read_timestamp(data_file) > os.path.getmtime(data_file):
-				continue
-			
-			any_data_files_updated = True
-			run_command(
-				"osmium extract " +
-					" -b " + ",".join(map(str, (bbox.left, bbox.bottom, bbox.right, bbox.top))) + 
-					" -O -o " + quote(os.path.join(osm_data_folder, f"{os.path.basename(region)}-N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")) +
-					f" {quote(data_file)}",
-				os.path.join(workspace, "log", "osm", f"osmconvert_{os.path.basename(region)}_N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")
-			)
-			
-			write_timestamp(data_file)
-		
-		if any_data_files_updated:
-			padded_print(f"Merging extracted OSM data … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})", end="\r")
-			data_files = [
-				quote(os.path.join(
-					osm_data_folder,
-					f"{os.path.basename(region)}-N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf"
-				))
-				for region in regions
-			]
-			run_command(
-				"osmium merge " + " ".join(data_files) + " --overwrite -o " +
-					quote(os.path.join(osm_data_folder, f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")),
-				os.path.join(workspace, "log", "osm", f"osmconvert_N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.osm.pbf")
-			)
-		
-		landmass_region_file = os.path.join(osm_data_folder, f"landmass-N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.shp")
-		if not os.path.exists(landmass_region_file) or \
-			read_timestamp(landmass_region_file) < max(os.path.getmtime(landmass_file), os.path.getmtime(landmass_region_file)):
-			padded_print(f"Extracting needed OSM data … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right}) from landmass polygons", end="\r")
-			run_command(
-				f"ogr2ogr -clipsrc {bbox.left} {bbox.bottom} {bbox.right} {bbox.top} {quote(landmass_region_file)} {quote(landmass_file)}",
-				os.path.join(workspace, "log", "osm", f"ogr2ogr_landmass_N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.shp")
-			)
-			write_timestamp(landmass_region_file)
-			any_files_updated = True
-	
-	padded_print(f"Extracting needed OSM data … {len(bboxes)} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})")
-	
-	for i, bbox in enumerate(bboxes):
-		for j, mapping in enumerate(OSM_MATERIAL_MAPPINGS):
-			padded_print(f"Decoding OSM data … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right}), landuse class {j} of {len(OSM_MATERIAL_MAPPINGS)} ({mapping.material})", end="\r")
-			if isinstance(mapping, OsmSelectorPolygon):
-				any_files_updated |= ogr_decode_polygon(workspace, bbox, mapping)
-			elif isinstance(mapping, OsmSelectorLine):
-				any_files_updated |= ogr_decode_line(workspace, bbox, mapping)
-			elif isinstance(mapping, OsmSelectorPoint):
-				any_files_updated |= ogr_decode_point(workspace, bbox, mapping)
-		padded_print(f"Decoding OSM data … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right}), landmass", end="\r")
-		
-		data_file = os.path.join(osm_data_folder, f"landmass-N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}.shp")
-		work_dir = os.path.join(workspace, "work", "Default")
-		cmd = f"ogr-decode --area-type Default {quote(work_dir)} {quote(data_file)}"
-		any_files_updated |= ogr_decode(workspace, bbox, cmd, "Default", work_dir, data_file)
+			tasks.add(f"download {region}", download_osm_region, workspace, region,
+				tool="download", outputs=[get_osm_region_file(workspace, region)])
+		tasks.add("download land polygons", download_land_polygons, workspace,
+			tool="download", outputs=[os.path.join(osm_data_folder, "land-polygons.zip")])
+		tasks.add("extract land polygons", extract_land_polygons, workspace,
+			tool="unzip", inputs=[os.path.join(osm_data_folder, "land-polygons.zip")],
+			outputs=[os.path.join(osm_data_folder, "land_polygons." + ext) for ext in ("shp", "shx", "dbf", "prj", "cpg")])
+	
+	for dempkg in (dempkgs or {}).values():
+		demzip = os.path.join(dem_data_folder, dempkg["name"])
+		tasks.add(f"download {dempkg['name']}", download_dem_package, workspace, dempkg,
+			tool="download", outputs=[demzip])
+		# the packages hold different tiles, so only their indices are declared as outputs and they are extracted in parallel
+		tasks.add(f"extract {dempkg['name']}", extract_dem_package, workspace, demzip, bboxes,
+			tool="unzip", inputs=[demzip], outputs=[archive.get_index_path(demzip, dem_data_folder)])
+	
+	extract_tasks = [f"extract {dempkg['name']}" for dempkg in (dempkgs or {}).values()]
+	for hgtnames, tiles in plan_dem_batches(bboxes):
+		batch_name = get_dem_batch_name(hgtnames)
+		hgtfiles = [os.path.join(dem_data_folder, hgtname) for hgtname in hgtnames]
+		arrfiles = get_dem_tile_files(workspace, tiles)
+		tasks.add(f"gdalchop {batch_name}", chop_dem_data, workspace, hgtnames, tiles,
+			tool="gdalchop", inputs=hgtfiles, outputs=arrfiles, deps=extract_tasks,
+			signature=get_gdalchop_command(workspace, tiles, hgtfiles))
+		tasks.add(f"terrafit {batch_name}", fit_dem_data, workspace, arrfiles, os.path.join(workspace, "log", "dem", "terrafit_" + batch_name),
+			tool="terrafit", inputs=arrfiles, outputs=get_dem_tile_files(workspace, tiles, ".fit.gz"),
+			signature=get_terrafit_command(workspace, arrfiles))
+	
+	genapts = find_genapts()
+	for aptdat_file in aptdat_files:
+		cmd = get_genapts_command(workspace, aptdat_file, genapts)
+		tasks.add(f"genapts {aptdat_file}", run_tool, cmd, os.path.join(workspace, "log", "apt", os.path.basename(aptdat_file)),
+			tool="genapts", inputs=[aptdat_file, dem_work_folder],
+			outputs=[os.path.join(work_folder, "AirportObj"), os.path.join(work_folder, "AirportArea")], signature=cmd)
+	
+	ogr_decode_env = get_ogr_decode_env()
+	mappings = group_material_mappings(OSM_MATERIAL_MAPPINGS)
+	# the OSM data is cut, merged and decoded per extract, each covering one or more bboxes
+	osm_extracts = plan_osm_extracts(bboxes)
+	for region in regions:
+		# with a single region its extracts are what the decodes read, else they are merged first
+		extracts = [(bbox, get_osm_extract_file(workspace, bbox, region) if len(regions) > 1 else get_osm_bbox_file(workspace, bbox))
+			for bbox in osm_extracts]
+		tasks.add(f"osmium extract {os.path.basename(region)}", extract_osm_region, workspace, region, extracts,
+			tool="osmium", inputs=[get_osm_region_file(workspace, region)], outputs=[path for bbox, path in extracts],
+			signature=f"osmium extract {quote(get_osm_region_file(workspace, region))} " + " ".join(
+				f"{get_bbox_name(bbox)}={os.path.basename(path)}" for bbox, path in extracts))
+	for bbox in osm_extracts:
+		name = get_bbox_name(bbox)
+		if len(regions) > 1:
+			cmd = get_osmium_merge_command(workspace, bbox, regions)
+			tasks.add(f"osmium merge {name}", run_tool, cmd, os.path.join(osm_log_folder, f"osmium_merge_{name}"),
+				tool="osmium", inputs=[get_osm_extract_file(workspace, bbox, region) for region in regions],
+				outputs=[get_osm_bbox_file(workspace, bbox)], signature=cmd)
+		cmd = get_ogr2ogr_command(workspace, bbox)
+		tasks.add(f"ogr2ogr {name}", run_tool, cmd, os.path.join(osm_log_folder, f"ogr2ogr_landmass_{name}"),
+			tool="ogr2ogr", inputs=[get_landmass_file(workspace)], outputs=[get_landmass_file(workspace, bbox)], signature=cmd)
 		
-	padded_print(f"Decoding OSM data … {len(bboxes)} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})")
-	return any_files_updated
+		# decodes into different materials run in parallel, the ones writing the same material folder one after another
+		for mapping in mappings:
+			cmd = get_ogr_decode_command(workspace, bbox, mapping)
+			decode_name = get_ogr_decode_name(mapping)
+			tasks.add(f"ogr-decode {name} {decode_name}", run_tool, cmd,
+				os.path.join(osm_log_folder, mapping.material, f"ogr-decode_{name}_{decode_name.replace(' ', '_')}"), env=ogr_decode_env,
+				tool="ogr-decode", inputs=[get_osm_bbox_file(workspace, bbox)], outputs=[os.path.join(work_folder, mapping.material)],
+				signature=cmd)
+		cmd = get_ogr_decode_command(workspace, bbox)
+		tasks.add(f"ogr-decode {name} landmass", run_tool, cmd, os.path.join(osm_log_folder, "Default", f"ogr-decode_{name}_landmass"),
+			env=ogr_decode_env, tool="ogr-decode", inputs=[get_landmass_file(workspace, bbox)],
+			outputs=[os.path.join(work_folder, "Default")], signature=cmd)
+	
+	tiles = get_bbox_tiles(bboxes)
+	# one task, since the batches are only balanced once the costs of the tiles are known
+	tasks.add("tg-construct", construct_terrain, workspace, output_path, tiles, num_threads, construct_jobs, construct_retries,
+		tool="tg-construct", inputs=get_terrain_work_dirs(workspace),
+		outputs=[os.path.join(output_path, "Terrain", fg_tile_path_from_index(tile) + ".btg.gz") for tile in tiles],
+		# neither the number of threads nor the partitioning change the result
+		signature=get_tg_construct_command(workspace, tiles, output_path, None))
+	
+	return tasks
 
-def generate_terrain(workspace: str, bboxes: typing.Iterable[Rectangle], output_path: str, num_threads: int=0):
-	work_dir = os.path.join(workspace, "work")
-	output_path = os.path.join(output_path, "Terrain")
-	num_threads = num_threads or (os.cpu_count() - 1) or 1
-	for i, bbox in enumerate(bboxes):
-			#f"--min-lon={bbox.left} --min-lat={bbox.bottom} --max-lon={bbox.right} --max-lat={bbox.top} " + \
-		cmd = f"tg-construct --threads={num_threads} --output-dir={quote(output_path)} --work-dir={quote(work_dir)} " + \
-			f"--priorities={quote(importlib_resources_files('fgtools.scenery').joinpath('tg_priorities.txt'))} " + \
-			"--tile-id=" + " --tile-id=".join(map(str, get_fg_tile_indices(bbox))) + " " + \
-			" ".join(sorted({quote(mapping.material) for mapping in OSM_MATERIAL_MAPPINGS}) + ["dem", "AirportArea", "AirportObj", "Default"])
-		get_logger().debug(f"Running command: {cmd}")
-		p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True, text=True, bufsize=1)
-		j = 0
-		num_tiles = 0
-		for line in p.stdout:
-			get_logger().debug("tg-construct printed: " + str(line.strip()))
-			line = line.strip().split()
-			status_text = ""
-			if len(line) >= 3 and line[2].isnumeric():
-				if line[4] == "Construct":
-					j = int(line[8])
-					num_tiles = int(line[10])
-				else:
-					status_text = " ".join(line[4:])
-			p.poll()
-			
-			if len(line) >=  3:
-				padded_print(f"Generating terrain … {i + 1} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right}) - working on tile {j} of {num_tiles} - {status_text or 'Construct'} for {line[2]}", end="\r")
-			
-			if p.returncode != None and p.returncode != 0:
-				log_path = os.path.join(workspace, "log", "terrain", f"N{bbox.top}W{bbox.left}S{bbox.bottom}E{bbox.right}")
-				os.makedirs(os.path.join(workspace, "log", "terrain"), exist_ok=True)
-				with open(log_path, "w") as log_file:
-					log_file.write(p.stdout.read())
-				get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {log_path} for details.")
-				sys.exit(1)
-	
-	padded_print(f"Generating terrain … {len(bboxes)} of {len(bboxes)} (n={bbox.top} e={bbox.left} s={bbox.bottom} w={bbox.right})")
+# Parse a --limit value of the form TOOL=N
+def parse_tool_limit(value):
+	tool, sep, limit = value.partition("=")
+	if not sep or not limit.isdigit() or int(limit) < 1:
+		raise argparse.ArgumentTypeError(f"invalid tool limit '{value}', must be TOOL=N with N >= 1")
+	return tool, int(limit)
 
 def main():
 	argp = argparse.ArgumentParser(description="Automate the process of generating FightGear WS2.0 terrain, including fetching the landcover and elevation data")
@@ -619,14 +803,55 @@ def main():
 		default=0,
 		type=int
 	)
+	argp.add_argument(
+		"-j", "--jobs",
+		help="Maximum number of build tasks (downloads, tool invocations) running at the same time (default: number of CPU cores)",
+		default=os.cpu_count() or 1,
+		type=int
+	)
+	argp.add_argument(
+		"--limit",
+		help="Maximum number of instances of a tool running at the same time, in the form TOOL=N, for example ogr-decode=8. " +
+			"Can be passed more than once. Defaults: " + ", ".join(f"{tool}={limit}" for tool, limit in DEFAULT_TOOL_LIMITS.items()),
+		action="append",
+		default=[],
+		type=parse_tool_limit
+	)
+	argp.add_argument(
+		"--retries",
+		help="Number of times a failed tg-construct batch is run again (default: 1)",
+		default=1,
+		type=int
+	)
+	argp.add_argument(
+		"--max-workspace-size",
+		help="Evict the least recently used intermediate files and work folders from the workspace after the build until it is no larger than this, " +
+			"for example 50G. Evicted files are only produced again once a build needs them",
+		type=parse_size
+	)
+	argp.add_argument(
+		"--report",
+		help="Path of the JSON report of the time, CPU time, memory and I/O of every build task and command (default: log/build-report.json in the workspace)"
+	)
+	argp.add_argument(
+		"--trace",
+		help="Also write the build tasks and commands to this file in the trace event format, for chrome://tracing, Perfetto or speedscope"
+	)
+	argp.add_argument(
+		"--explain",
+		help="Print why each build task that wasn't up to date had to run",
+		action="store_true"
+	)
 	argp.add_argument(
 		"--loglevel",
 		help="Set logging level",
 		default="warning",
 		choices=["debug", "info", "warn", "error", "fatal"]
 	)
+	progress.add_argument(argp)
 	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	osm_config_file = os.environ.get("OSM_CONFIG_FILE")
 	if osm_config_file and not os.path.isfile(osm_config_file):
@@ -639,26 +864,53 @@ def main():
 		loglevel = logging.WARNING
 	get_logger().setLevel(loglevel)
 	
-	aptdat_files = find_input_files(args.input, suffix=".dat")
-	apt_reader = aptdat.ReaderWriterAptDat()
-	apt_reader.read_multiple(aptdat_files)
-	airports = apt_reader.get_airports()
-	apt_tiles = get_airport_tiles(airports)
-	
-	osm_regions = find_osm_regions(apt_tiles)
-	
-	osm_data_updated = False
-	dem_data_updated = False
+	with telemetry.Recorder() as recorder:
+		succeeded, failed = build(args)
+	
+	print(recorder.format_summary())
+	report_path = args.report or os.path.join(args.workspace, "log", "build-report.json")
+	recorder.write_report(report_path)
+	print(f"Build report written to {report_path}")
+	if args.trace:
+		recorder.write_trace(args.trace)
+	if not succeeded:
+		get_logger().fatal(f"{len(failed)} build tasks failed: {', '.join(failed)}")
+		sys.exit(1)
+
+# Plan and run the build for the parsed command line arguments, the planning steps are recorded as telemetry spans
+# @return	tuple (whether all build tasks succeeded, names of the failed tasks)
+def build(args):
+	with telemetry.span("read airports"):
+		aptdat_files = find_input_files(args.input, suffix=".dat")
+		apt_reader = aptdat.ReaderWriterAptDat()
+		apt_reader.read_multiple(aptdat_files)
+		airports = apt_reader.get_airports()
+		apt_tiles = get_airport_tiles(airports)
+	
+	with telemetry.span("find regions"):
+		osm_regions = find_osm_regions(apt_tiles)
+	
+	dempkgs = None
 	if not args.skip_data_downloads:
-		osm_data_updated = download_osm_data(osm_regions, args.workspace)
-		dem_data_updated = download_dem_data(apt_tiles, args.workspace)
-	
-	dem_data_processed = process_dem_data(args.workspace, apt_tiles)
-	airports_processed = process_airports(args.workspace, aptdat_files)
-	landuse_data_processed = process_landuse_data(args.workspace, apt_tiles, osm_regions)
-	
-	#if dem_data_processed or airports_processed or landuse_data_processed:
-	generate_terrain(args.workspace, apt_tiles, args.output, args.threads)
+		with telemetry.span("search elevation data"):
+			dempkgs = search_dem_packages(apt_tiles)
+	
+	limits = dict(DEFAULT_TOOL_LIMITS)
+	limits.update(args.limit)
+	with telemetry.span("plan tasks"):
+		tasks = build_tasks(args.workspace, args.output, apt_tiles, osm_regions, aptdat_files, dempkgs, args.threads,
+							download_osm=not args.skip_data_downloads, construct_jobs=limits["tg-construct"], construct_retries=args.retries)
+	with BuildCache(os.path.join(args.workspace, "build.sqlite")) as cache:
+		succeeded = tasks.run(args.jobs, limits, "Building terrain", cache=cache, explain=args.explain)
+		if args.max_workspace_size is not None:
+			with telemetry.span("collect garbage"):
+				evicted, size = collect_garbage(args.workspace, cache, args.max_workspace_size)
+			if evicted:
+				print(f"Evicted {len(evicted)} files from the workspace, freeing {format_size(sum(freed for path, freed in evicted))}")
+			if size > args.max_workspace_size:
+				get_logger().warning(f"Workspace is {format_size(size)}, still larger than {format_size(args.max_workspace_size)} - " +
+					"the rest are inputs, logs and files that can't be restored")
+	return succeeded, [task.name for task in tasks if task.state == FAILED]
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+
+import argparse
+import os
+import sys
+
+from fgtools import stg_index
+from fgtools.utils import constants
+from fgtools.utils import progress
+
+def main():
+	argp = argparse.ArgumentParser(description="Build an index of the objects in a tree of STG files and query it by region or model path")
+
+	argp.add_argument(
+		"-x", "--index",
+		help="Path to the index database, default is stg-index.sqlite in the cache directory",
+	)
+
+	argp.add_argument(
+		"-i", "--input",
+		help="STG files / directories containing such files to add to the index, or to update the index for. More than one file / directory can be passed",
+		nargs="+",
+		default=[]
+	)
+
+	argp.add_argument(
+		"-j", "--jobs",
+		help="Number of processes to parse STG files with, default is the number of CPUs",
+		type=int,
+		default=os.cpu_count() or 1
+	)
+
+	argp.add_argument(
+		"-b", "--bbox",
+		help="Print all objects within this bounding box",
+		nargs=4,
+		type=float,
+		metavar=("LEFT", "BOTTOM", "RIGHT", "TOP")
+	)
+
+	argp.add_argument(
+		"-r", "--radius",
+		help="Print all objects within RADIUS meters of this point, nearest first",
+		nargs=3,
+		type=float,
+		metavar=("LON", "LAT", "RADIUS")
+	)
+
+	argp.add_argument(
+		"-m", "--model",
+		help="Only print objects whose model path matches this pattern, * and ? can be used as wildcards",
+	)
+
+	argp.add_argument(
+		"-t", "--type",
+		help="Only print objects of these types, for example OBJECT_SHARED",
+		nargs="+"
+	)
+
+	progress.add_argument(argp)
+	
+	args = argp.parse_args()
+	progress.apply_args(args)
+
+	with stg_index.STGIndex(args.index or os.path.join(constants.CACHEDIR, "stg-index.sqlite")) as index:
+		if args.input:
+			updated, removed, unchanged = index.update(args.input, jobs=args.jobs)
+			print(f"Indexed {updated} STG files, removed {removed}, {unchanged} unchanged - {len(index)} objects in index")
+
+		if args.bbox:
+			results = index.query_bbox(*args.bbox, verbs=args.type, model=args.model)
+		elif args.radius:
+			results = index.query_radius(*args.radius, verbs=args.type, model=args.model)
+		elif args.model or args.type:
+			results = index.query_model(args.model or "*", verbs=args.type)
+		else:
+			return 0
+
+		for path, line, object in results:
+			print(f"{path}:{line}: {object.format()}")
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
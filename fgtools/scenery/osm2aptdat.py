@@ -4,21 +4,27 @@
 import os
 import sys
 import argparse
-import requests
 import csv
 import re
 import logging
 import math
 
-from OSMPythonTools import overpass
-
 from fgtools.geo import coord, rectangle
 from fgtools.utils import files
 from fgtools import aptdat
 from fgtools.utils import constants
 from fgtools.utils import unit_convert
+from fgtools.utils import progress
+
+_osmapi = None
 
-osmapi = overpass.Overpass()
+# OSMPythonTools takes long to import and sets up its cache on import, so that only happens once it is needed
+def get_osmapi():
+	global _osmapi
+	if _osmapi is None:
+		from OSMPythonTools import overpass
+		_osmapi = overpass.Overpass()
+	return _osmapi
 
 def parse_runway_id(id):
 	which, heading = "", 0
@@ -33,28 +39,32 @@ def parse_runway_id(id):
 		heading = 0
 	return heading * 10, which
 
+# Surface of a runway / helipad from the surface tag of OurAirports / OSM
+# @return	aptdat.SurfaceCode, None if the surface is unknown
 def parse_surface_type(surface):
 	if re.search("pem|mac|sealed|bit|asp(h)?(alt)?|tarmac", surface) or surface in ("b"):
-		surface = "Asphalt"
+		return aptdat.SurfaceCode.Asphalt
 	elif re.search("wood|cement|bri(ck)?|hard|paved|pad|psp|met|c[o0]n(c)?", surface):
-		surface = "Concrete"
+		return aptdat.SurfaceCode.Concrete
 	elif re.search("rock|gvl|grvl|gravel|pi(ç|c)", surface):
-		surface = "Gravel"
+		return aptdat.SurfaceCode.Gravel
 	elif re.search("tr(ea)?t(e)?d|san(d)?|ter|none|cor|so(ft|d|il)|earth|cop|com|per|ground|silt|cla(y)?|dirt|turf", surface):
-		surface = "Dirt"
+		return aptdat.SurfaceCode.Dirt
 	elif re.search("gr(a*)?s|gre", surface) or surface in ("g"):
-		surface = "Grass"
+		return aptdat.SurfaceCode.Grass
 	elif re.search("wat(er)?", surface):
-		surface = "Water"
+		return aptdat.SurfaceCode.Water
 	elif re.search("sno|ice", surface):
-		surface = "SnowIce"
-	else:
-		surface = "Unknown"
-	return surface
+		return aptdat.SurfaceCode.SnowIce
+	return None
+
+# Surfaces of runways / helipads that get lights and markings
+PAVED_SURFACES = (aptdat.SurfaceCode.Asphalt, aptdat.SurfaceCode.Concrete)
 
 def _get_ourairports_csv(what):
 	path = os.path.join(constants.CACHEDIR, what + ".csv")
 	if not os.path.isfile(path):
+		import requests
 		with open(path, "w") as f:
 			f.write(requests.get(f"https://davidmegginson.github.io/ourairports-data/{what}.csv").content.decode())
 	f = open(path, "r", newline="")
@@ -89,6 +99,9 @@ def get_ourairports_airports(bbox=None, icaos=[]):
 	return airports
 
 def get_osm_elements_near_airport(airport, what, query, element_type, radius=10000, max_retries=10):
+	from OSMPythonTools import overpass
+	
+	osmapi = get_osmapi()
 	left = coord.Coord(airport.lon, 0).apply_angle_distance_m(-90, radius).lon
 	right = coord.Coord(airport.lon, 0).apply_angle_distance_m(90, radius).lon
 	upper = coord.Coord(0, airport.lat).apply_angle_distance_m(0, radius).lat
@@ -120,11 +133,11 @@ def get_osm_elements_near_airport(airport, what, query, element_type, radius=100
 				raise e
 		retries += 1
 	if result == -1:
-		print(f"API query for OSM {what} data for airport {airport.icao} timed out {retries} times - won't retry", end=" " * 100 + "\n")
+		progress.message(f"API query for OSM {what} data for airport {airport.icao} timed out {retries} times - won't retry")
 		result = []
 	if result == None:
 		result = []
-		print(f"No OSM {what} data found for airport {airport.icao}", end=" " * 100 + "\n")
+		progress.message(f"No OSM {what} data found for airport {airport.icao}")
 	return result
 	
 def add_osm_runways(airport):
@@ -133,7 +146,7 @@ def add_osm_runways(airport):
 	for way in result:
 		first, last = way.nodes()[0], way.nodes()[-1]
 		if first.id() == last.id():
-			print("Got a runway mapped as area from OSM - not supported yet", end=" " * 100 + "\n")
+			progress.message("Got a runway mapped as area from OSM - not supported yet")
 			continue
 		first = coord.Coord(first.lon(), first.lat())
 		last = coord.Coord(last.lon(), last.lat())
@@ -170,7 +183,7 @@ def add_osm_runways(airport):
 						if len(osmways_filtered) == 3:
 							break
 		if len(osmways_filtered) == 0:
-			print("No OSM data found for runway", runway["le_ident"], "at airport", airport["airport"].icao, end=" " * 100 + "\n")
+			progress.message(f"No OSM data found for runway {runway['le_ident']} at airport {airport['airport'].icao}")
 		elif len(osmways_filtered) == 1: # just one matching runway - nothing left to do
 			runway["osmway"] = osmways_filtered[0]
 		elif len(osmways_filtered) == 2: # two parallel runways - sort from left to right and pick the right one
@@ -211,7 +224,7 @@ def add_osm_runways(airport):
 				runway["he_longitude_deg"] = runway["osmway"]["last"].lon
 				runway["he_latitude_deg"] = runway["osmway"]["last"].lat
 			else:
-				print("No threshold information found for runway", runway["le_ident"], "at", airport["airport"].icao, "- removing !",  end=" " * 100 + "\n")
+				progress.message(f"No threshold information found for runway {runway['le_ident']} at {airport['airport'].icao} - removing !")
 				airport["runways"][i] = None
 	airport["runways"] = list(filter(None, airport["runways"]))
 
@@ -273,7 +286,7 @@ def add_osm_helipads(airport):
 		else:
 			without_lon_lat[i] = None
 	if None in without_lon_lat:
-		print(f"No position information found for {without_lon_lat.count(None)} helipad(s) at {airport['airport'].icao} - removing", end=" " * 100 + "\n")
+		progress.message(f"No position information found for {without_lon_lat.count(None)} helipad(s) at {airport['airport'].icao} - removing")
 	without_lon_lat = list(filter(None, without_lon_lat))
 	
 	airport["helipads"] = with_lon_lat + without_lon_lat
@@ -285,11 +298,9 @@ def add_osm_helipads(airport):
 
 def add_ourairports_runways(airports):
 	csv = _get_ourairports_csv("runways")
-	i = 0
-	total = len(airports)
-	for airport in airports:
-		print(f"Extracting runways from OurAirports data … {i / total * 100:.1f}% ({i} of {total} airports done)", end="\r")
-		i += 1
+	report = progress.Progress("Extracting runways from OurAirports data", len(airports), " airports")
+	for i, airport in enumerate(airports, 1):
+		report.update()
 		runways = []
 		helipads = []
 		for line in csv:
@@ -306,33 +317,32 @@ def add_ourairports_runways(airports):
 		add_osm_runways(airport)
 		add_osm_helipads(airport)
 		if len(airport["runways"]) == 0 and len(airport["helipads"]) == 0:
-			print(f"Removing airport {airport['airport'].icao} since it has no runways / helipads !", end=" " * 100 + "\n")
+			report.message(f"Removing airport {airport['airport'].icao} since it has no runways / helipads !")
+			report.count("removed")
 			airports[i - 1] = None
 			continue
 		
 		for runway in airport["runways"]:
 			surface = parse_surface_type(runway["surface"].lower())
-			if surface == "Unknown":
+			if surface is None:
 				if "osmway" in runway:
 					if "surface" in runway["osmway"]["way"].tags():
 						surface = parse_surface_type(runway["osmway"]["way"].tags()["surface"])
 			
-			if surface == "Unknown":
+			if surface is None:
 				if (int(runway["length_ft"] or 0) > 1500 and int(runway["width_ft"] or 0) > 30) or int(runway["lighted"]):
-					surface = "Asphalt"
+					surface = aptdat.SurfaceCode.Asphalt
 				else:
-					surface = "Dirt"
-				print("Unknown surface type:", runway["surface"], "for runway", runway["le_ident"], "at airport", airport["airport"].icao, "- falling back to", surface, end=" " * 100 + "\n")
+					surface = aptdat.SurfaceCode.Dirt
+				report.message(f"Unknown surface type: {runway['surface']} for runway {runway['le_ident']} at airport {airport['airport'].icao} - falling back to {surface}")
 			runway["surface"] = surface
-	print(f"Extracting runways from OurAirports data … {i / total * 100:.1f}% ({i} of {total} airports done)", end="\r\n")
+	report.close()
 	
 	airports = list(filter(None, airports))
 	
-	i = 0
-	total = len(airports)
+	report = progress.Progress("Creating runways", len(airports), " airports")
 	for airport in airports:
-		print(f"Creating runways … {i / total * 100}% ({i} of {total} airports done)", end="\r")
-		i += 1
+		report.update()
 		for runway in airport["runways"]:
 			width = runway["width_ft"]
 			if width != "":
@@ -340,21 +350,21 @@ def add_ourairports_runways(airports):
 			elif "osmway" in runway and "width" in runway["osmway"]["way"].tags():
 				width = round(float(runway["osmway"]["way"].tags()["width"]), 2)
 			else:
-				print(f"No width found for runway {runway['le_ident']} at airport {airport['airport'].icao} - guessing from length", end=" " * 100 + "\n")
+				report.message(f"No width found for runway {runway['le_ident']} at airport {airport['airport'].icao} - guessing from length")
 				width = math.sqrt(int(runway["length_ft"] or 0))
-			if runway["surface"] == "water":
+			if runway["surface"] == aptdat.SurfaceCode.Water:
 				runway = aptdat.WaterRunway(unit_convert.ft2m(width),
 							runway["le_ident"], float(runway["le_longitude_deg"]), float(runway["le_latitude_deg"]),
 							runway["he_ident"], float(runway["he_longitude_deg"]), float(runway["he_latitude_deg"]),
 							perimeter_buoys=True)
 			else:
 				center_lights = edge_lights = bool(runway["lighted"])
-				if center_lights and surface not in ("Asphalt", "Concrete"):
+				if center_lights and runway["surface"] not in PAVED_SURFACES:
 					center_lights = edge_lights = False
 				distance_signs = int(runway["length_ft"] or 0) > 4000
-				tdz_lights = runway["surface"] in ("Asphalt", "Concrete")
+				tdz_lights = runway["surface"] in PAVED_SURFACES
 				markings = aptdat.RunwayMarkingCode.Visual
-				if runway["surface"] not in ("Asphalt", "Concrete"):
+				if runway["surface"] not in PAVED_SURFACES:
 					markings = aptdat.RunwayMarkingCode.NoMarkings
 				elif 4000 < int(runway["length_ft"] or 0) < 6000:
 					markings = aptdat.RunwayMarkingCode.NonPrecision
@@ -364,7 +374,7 @@ def add_ourairports_runways(airports):
 				if markings == aptdat.RunwayMarkingCode.NonPrecision:
 					reil_type = aptdat.REILCode.UnidirREIL
 				
-				runway = aptdat.LandRunway(unit_convert.ft2m(width), getattr(aptdat.SurfaceCode, runway["surface"]),
+				runway = aptdat.LandRunway(unit_convert.ft2m(width), runway["surface"],
 							runway["le_ident"], float(runway["le_longitude_deg"]), float(runway["le_latitude_deg"]),
 							runway["he_ident"], float(runway["he_longitude_deg"]), float(runway["he_latitude_deg"]),
 							center_lights=center_lights, edge_lights=edge_lights, distance_signs=distance_signs,
@@ -373,12 +383,11 @@ def add_ourairports_runways(airports):
 							displ_thresh2=float(runway["he_displaced_threshold_ft"] or 0), tdz_lights2=tdz_lights,
 							markings2=markings, reil_type2=reil_type)
 			airport["airport"].add_runway(runway)
-	print(f"Creating runways … {i / total * 100}% ({i} of {total} airports done)")
+	report.close()
 	
-	i = 0
-	for airport in airports:
-		print("Creating helipads … {i / total * 100}% ({i} of {total} airports done)", end="\r")
-		i += 1
+	report = progress.Progress("Creating helipads", len(airports), " airports")
+	for i, airport in enumerate(airports, 1):
+		report.update()
 		for helipad in airport["helipads"]:
 			if helipad["width_ft"]:
 				width = round(float(helipad["width_ft"]), 2)
@@ -386,37 +395,37 @@ def add_ourairports_runways(airports):
 				width = radius * 2
 			else:
 				width = 50
-				print((f"Unable to get width for for helipad {helipad['le_ident']} at airport {airport['airport'].icao}" +
-						f" - setting to {width} ft"), end=" " * 100 + "\n")
+				report.message((f"Unable to get width for for helipad {helipad['le_ident']} at airport {airport['airport'].icao}" +
+						f" - setting to {width} ft"))
 			if helipad["length_ft"]:
 				length = round(float(helipad["length_ft"]), 2)
 			elif "radius" in helipad["osmhelipad"]:
 				length = radius * 2
 			else:
 				length = 50
-				print((f"Unable to get length for for helipad {helipad['le_ident']} at airport {airport['airport'].icao}" +
-						f" - setting to {length} ft"), end=" " * 100 + "\n")
+				report.message((f"Unable to get length for for helipad {helipad['le_ident']} at airport {airport['airport'].icao}" +
+						f" - setting to {length} ft"))
 						
 			lighted = bool(int(helipad["lighted"]))
 			surface = parse_surface_type(helipad["surface"])
-			if surface == "Unknown" and "surface" in helipad["osmhelipad"]:
+			if surface is None and "surface" in helipad["osmhelipad"]:
 				surface = parse_surface_type(helipad["osmhelipad"]["surface"])
-				if surface == "Unknown":
-					if lighted:
-						surface = "Asphalt"
-					else:
-						surface = "Grass"
-					
-					print((f"Unknown surface type {helipad['surface']} for helipad {helipad['le_ident']} at" + 
-							f" airport {airport['airport'].icao} - setting to {surface}"), end=" " * 100 + "\n")
+			if surface is None:
+				if lighted:
+					surface = aptdat.SurfaceCode.Asphalt
+				else:
+					surface = aptdat.SurfaceCode.Grass
+				
+				report.message((f"Unknown surface type {helipad['surface']} for helipad {helipad['le_ident']} at" + 
+						f" airport {airport['airport'].icao} - setting to {surface}"))
 			
-			if surface not in ("Concrete", "Asphalt"):
+			if surface not in PAVED_SURFACES:
 				lighted = False
-			print(helipad)
 			helipad = aptdat.Helipad(helipad["id"], float(helipad["le_longitude_deg"]), float(helipad["le_latitude_deg"]), 0,
 									unit_convert.ft2m(length), unit_convert.ft2m(width), surface, edge_lights=lighted)
 			airport["airport"].add_helipad(helipad)
 		airports[i - 1] = airport["airport"]
+	report.close()
 	return airports
 
 def query_airports_by_icaos(icaos):
@@ -442,10 +451,15 @@ def check_aptdat_written_by_this(path):
 				return True
 	return False
 
-def write_aptdat_files(output, airports, merge=False):
+# Write the airports to output, replacing what is there - or with update=True, merging them into the existing output,
+# only rewriting airports whose content changed and keeping all other airports
+def write_aptdat_files(output, airports, merge=False, update=False):
 	writer = aptdat.ReaderWriterAptDat(file_header="Generated from OSM and OurAirports data by fgtools.osm2aptdat.py")
 	writer.add_airports(airports)
-	writer.write(output, merge=merge, overwrite_func=check_aptdat_written_by_this)
+	if update:
+		writer.update(output, merge=merge, overwrite_func=check_aptdat_written_by_this)
+	else:
+		writer.write(output, merge=merge, overwrite_func=check_aptdat_written_by_this)
 
 def main():
 	logging.getLogger("OSMPythonTools").setLevel(logging.FATAL)
@@ -473,20 +487,29 @@ def main():
 		action="store_true"
 	)
 	
+	argp.add_argument(
+		"-u", "--update",
+		help="Update the existing output instead of replacing it - only airports whose content changed are rewritten, all other airports already in the output are kept",
+		action="store_true"
+	)
+	
 	argp.add_argument(
 		"-o", "--output",
 		help="directory to put apt.dat files into",
 		required=True
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	if args.icao:
 		airports = query_airports_by_icaos(args.icao)
 	else:
 		airports = query_airports_by_bbox(left=args.bbox[0], lower=args.bbox[1], right=args.bbox[2], upper=args.bbox[3])
 	
-	write_aptdat_files(args.output, airports, merge=args.merge)
+	write_aptdat_files(args.output, airports, merge=args.merge, update=args.update)
 
 if __name__ == '__main__':
 	main()
@@ -11,6 +11,8 @@ import base64
 import requests
 import appdirs
 
+from fgtools.utils import progress
+
 def get_airports_list():
 	os.makedirs(appdirs.user_cache_dir("fgtools"), exist_ok=True)
 	airports_json_path = os.path.join(appdirs.user_cache_dir("fgtools"), "airports.json")
@@ -26,57 +28,54 @@ def get_airports_list():
 
 def filter_airports_list(airports_count, airports_list, icaos, bbox):
 	airports_list_filtered = []
-	i = 0
-	for airport in airports_list:
-		print(f"Filtering airports … {i / airports_count * 100:.1f}% ({i} of {airports_count})\r", end="")
-		i += 1
+	for airport in progress.track(airports_list, "Filtering airports", airports_count):
 		airport_metadata = airport.get("metadata", {}) or {}
 		if icaos and any(icao in (airport.get("AirportCode", None), airport_metadata.get("icao_code", None)) for icao in icaos):
 			airports_list_filtered.append(airport)
 		elif bbox:
 			if bbox[1] < airport["Latitude"] < bbox[3] and bbox[0] < airport["Longitude"] < bbox[2]:
 				airports_list_filtered.append(airport)
-	print("Filtering airports … done                                                                                                                                  ")
 	
 	return airports_list_filtered
 
 def write_aptdat_files(airports_list, output, txt_output, overwrite):
-	airports_count = len(airports_list)
-	i = 0
-	for airport in airports_list:
-		print(f"Downloading and writing airports … {i / airports_count * 100:.1f}% ({i} of {airports_count})\r", end="")
-		i += 1
-		airport_metadata = airport.get("metadata", {}) or {}
-		icao_code = airport_metadata.get("icao_code", None) or airport["AirportCode"]
-		if os.path.isfile(os.path.join(output, icao_code + ".dat")) and not overwrite:
-			continue
+	with progress.Progress("Downloading and writing airports", len(airports_list)) as report:
+		for airport in airports_list:
+			report.update()
+			write_aptdat_file(airport, output, txt_output, overwrite, report)
+
+def write_aptdat_file(airport, output, txt_output, overwrite, report):
+	airport_metadata = airport.get("metadata", {}) or {}
+	icao_code = airport_metadata.get("icao_code", None) or airport["AirportCode"]
+	if os.path.isfile(os.path.join(output, icao_code + ".dat")) and not overwrite:
+		report.count("skipped")
+		return
+	
+	scenery_id = airport.get("RecommendedSceneryId", None)
+	if not scenery_id:
+		report.message(f"Airport {icao_code} has no scenery - skipping")
+		report.count("without scenery")
+		return
 		
-		scenery_id = airport.get("RecommendedSceneryId", None)
-		if not scenery_id:
-			print("Airport", icao_code, "has no scenery - skipping                                                                                                             ")
-			continue
+	scenery_json = requests.get("https://gateway.x-plane.com/apiv1/scenery/" + str(scenery_id)).json()
+	scenery_blob = io.BytesIO(base64.b64decode(scenery_json["scenery"]["masterZipBlob"]))
+	with zipfile.ZipFile(scenery_blob, "r") as scenery_zip:
+		try:
+			scenery_dat = scenery_zip.open(icao_code + ".dat")
+		except KeyError:
+			pass
+		else:
+			with open(os.path.join(output, icao_code + ".dat"), "wb") as aptdat:
+				aptdat.write(scenery_dat.read())
 		
-		scenery_json = requests.get("https://gateway.x-plane.com/apiv1/scenery/" + str(scenery_id)).json()
-		scenery_blob = io.BytesIO(base64.b64decode(scenery_json["scenery"]["masterZipBlob"]))
-		with zipfile.ZipFile(scenery_blob, "r") as scenery_zip:
+		if txt_output and os.path.isdir(txt_output):
 			try:
-				scenery_dat = scenery_zip.open(icao_code + ".dat")
+				scenery_txt = scenery_zip.open(icao_code + ".txt")
 			except KeyError:
 				pass
 			else:
-				with open(os.path.join(output, icao_code + ".dat"), "wb") as aptdat:
-					aptdat.write(scenery_dat.read())
-			
-			if txt_output and os.path.isdir(txt_output):
-				try:
-					scenery_txt = scenery_zip.open(icao_code + ".txt")
-				except KeyError:
-					pass
-				else:
-					with open(os.path.join(txt_output, icao_code + ".txt"), "wb") as apttxt:
-						apttxt.write(scenery_txt.read())
-		
-	print("Downloading and writing airports … done                                                                                                     ")
+				with open(os.path.join(txt_output, icao_code + ".txt"), "wb") as apttxt:
+					apttxt.write(scenery_txt.read())
 
 def main():
 	argp = argparse.ArgumentParser(description="Pulls apt.dat files from the XPlane Gateway selected either by a bounding box or ICAO codes")
@@ -118,7 +117,10 @@ def main():
 		action="store_true"
 	)
 	
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	if not args.icao and not args.bbox:
 		argp.error("At least one of -i/--icao and -b/--bbox must be given !")
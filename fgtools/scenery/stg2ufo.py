@@ -3,143 +3,133 @@
 
 import argparse
 import os
+import sys
 
-class SkipReason:
-	NotFound = 0
-	DirEmpty = 1
-	NoSTG = 2
+from fgtools import stg
+from fgtools import stg_index
+from fgtools import geo
 
-def read_stg_file(path):
-	result = []
-	offset = 0
-	skipnext = False
-	with open(path, "r") as fp:
-		content = fp.readlines()
-		for number, line in enumerate(content):
-			line = line.strip()
-			if line.startswith("#"): # is a comment
-				if line.startswith("# offset"):
-					offset = line.split(" ")[-1]
-					result.append(line)
-				elif line.startswith("# skipnext"):
-					skipnext = True
-			elif line.strip() == "": # empty line
-				continue
-			else: # is an object
-				etype, *data = list(map(lambda s: s.strip(), line.split(" ")))
-				if etype in ["OBJECT_SHARED", "OBJECT_STATIC"]:
-					if len(data) == 5:
-						objectfile, longitude, latitude, elevation, heading, pitch, roll = *data, 0, 0
-					elif len(data) == 7:
-						objectfile, longitude, latitude, elevation, heading, pitch, roll = data
-					else:
-						print(f"Warning: file {path}, line {number} is malformed - not converting entry")
-						result.append(line)
-						continue
-					
-					result.append({
-						"etype": etype,
-						"objectfile": objectfile,
-						"longitude": longitude,
-						"latitude": latitude,
-						"elevation": float(elevation),
-						"offset": float(offset),
-						"heading": heading,
-						"pitch": pitch,
-						"roll": roll,
-						"skip": skipnext
-					})
-					offset = 0
-					skipnext = False
-				else:
-					print(f"Warning: skipping line {number} in {path} because type {etype} is not supported")
-	return result
+SUPPORTED_VERBS = ("OBJECT_SHARED", "OBJECT_STATIC")
 
 def read_stg_files(paths):
-	stg_dict = dict.fromkeys(paths, {"infiles": [], "contents": []})
+	stg_files = []
 	for path in paths:
 		if not os.path.exists(path):
 			print(f"Warning: Input file / directory {path} does not exist, skipping")
-			stg_dict[path] = SkipReason.NotFound
-		elif os.path.isdir(path):
-			for file in os.listdir(path):
-				if os.splitext(path)[1] == ".stg":
-					realpath = os.path.join(path, file)
-					content = read_stg_file(realpath)
-					stg_dict[path]["infiles"].append(file)
-					stg_dict[path]["contents"].append(content)
+			continue
+		found = False
+		for stgfile in stg.read_stg_files(path, stg.DIRECTIVES_NEXT_OBJECT):
+			found = True
+			for number, line, reason in stgfile.problems:
+				print(f"Warning: skipping line {number} in {stgfile.path}: {reason}")
+			for object in stgfile.get_objects():
+				if object.verb not in SUPPORTED_VERBS:
+					print(f"Warning: skipping object {object.path} in {stgfile.path} because type {object.verb} is not supported")
+			stg_files.append(stgfile)
+		if not found:
+			print(f"Warning: No STG file found in input {path}, skipping")
+	return stg_files
+
+def is_in_region(object, bbox=None, radius=None):
+	if bbox:
+		left, bottom, right, top = bbox
+		return left <= object.lon <= right and bottom <= object.lat <= top
+	elif radius:
+		lon, lat, radius = radius
+		return geo.great_circle_distance_m(lon, lat, object.lon, object.lat) <= radius
+	return True
+
+# Write the supported objects of stg_files as UFO XML, return the exit status - 1 when there was nothing to write
+def write_xml_files(stg_files, outfiles):
+	if not any(True for stgfile in stg_files for object in stgfile.get_objects(SUPPORTED_VERBS)):
+		print("No objects to convert - not writing anything !")
+		return 1
+	
+	# STG files going into the same output file are written into it together
+	stg_files_by_outfile = {}
+	for i, stgfile in enumerate(stg_files):
+		if len(outfiles) == 1:
+			if outfiles[0] == "__INPUT__":
+				outfile = stgfile.path
 			else:
-				print(f"Warning: No STG file found in input directory {path}, skipping")
-				stg_dict[path] = SkipReason.DirEmpty
+				outfile = outfiles[0]
 		else:
-			if os.path.splitext(path)[1] == ".stg":
-				content = read_stg_file(path)
-				stg_dict[path]["infiles"].append(path)
-				stg_dict[path]["contents"].append(content)
+			if i < len(outfiles):
+				outfile = outfiles[i]
 			else:
-				print(f"Warning: Input file {path} is not an STG file, skipping")
-				stg_dict[path] = SkipReason.NoSTG
-	return stg_dict
-
-def write_xml_files(output_stg, outfiles):
-	for i, path in enumerate(output_stg):
-		if type(path) != str: # SkipReason
-			continue
-		for infile, content in zip(output_stg[path]["infiles"], output_stg[path]["contents"]):
-			if len(outfiles) == 1:
-				if outfiles[0] == "__INPUT__":
-					outfile = infile
-				else:
-					outfile = outfiles[0]
-			else:
-				if i < len(outfiles):
-					outfile = outfiles[i]
-				else:
-					outfile = outfiles[-1]
+				outfile = outfiles[-1]
+		stg_files_by_outfile.setdefault(outfile, []).append(stgfile)
+	
+	for outfile, stg_files in stg_files_by_outfile.items():
+		with open(outfile, "w") as outfp:
+			outfp.write("<?xml version=\"1.0\"?>\n")
+			outfp.write("<PropertyList>\n")
+			outfp.write("	<models>\n")
 			
-			with open(outfile, "w") as outfp:
-				outfp.write("<?xml version=\"1.0\"?>\n")
-				outfp.write("<PropertyList>\n")
-				outfp.write("	<models>\n")
+			for stgfile, object in ((stgfile, object) for stgfile in stg_files for object in stgfile.get_objects(SUPPORTED_VERBS)):
+				path = os.path.dirname(stgfile.path)
+				pitch = object.pitch or 0
+				roll = object.roll or 0
+				outfp.write("		<model>\n")
+				outfp.write(f"			<legend>{object.path.split('/')[-1]}</legend>\n")
+				outfp.write(f"			<pitch-deg>{pitch}</pitch-deg>\n")
+				outfp.write(f"			<roll-deg>{roll}</roll-deg>\n")
+				outfp.write(f"			<heading-deg>{object.hdg}</heading-deg>\n")
+				outfp.write(f"			<latitude-deg>{object.lat}</latitude-deg>\n")
+				outfp.write(f"			<longitude-deg>{object.lon}</longitude-deg>\n")
+				outfp.write(f"			<elevation-ft>{object.elev * 3.2808399}</elevation-ft>\n")
+				outfp.write(f"			<elevation-m>{object.elev}</elevation-m>\n")
+				outfp.write(f"			<stg-heading-deg>{object.hdg + 180}</stg-heading-deg>\n")
+				outfp.write(f"			<stg-path>{os.path.abspath(stgfile.path)}</stg-path>\n")
+				
+				objectpath = object.path
+				if object.verb == "OBJECT_STATIC":
+					objectpath = path + "/" + objectpath
+				outfp.write(f"			<path>{objectpath}</path>\n")
 				
-				for object in content:
-					outfp.write("		<model>\n")
-					outfp.write(f"			<legend>{object['objectfile'].split('/')[-1]}</legend>\n")
-					outfp.write(f"			<pitch-deg>{object['pitch']}</pitch-deg>\n")
-					outfp.write(f"			<roll-deg>{object['pitch']}</roll-deg>\n")
-					outfp.write(f"			<heading-deg>{object['heading']}</heading-deg>\n")
-					outfp.write(f"			<latitude-deg>{object['latitude']}</latitude-deg>\n")
-					outfp.write(f"			<longitude-deg>{object['longitude']}</longitude-deg>\n")
-					outfp.write(f"			<elevation-ft>{float(object['elevation']) * 3.2808399}</elevation-ft>\n")
-					outfp.write(f"			<elevation-m>{object['elevation']}</elevation-m>\n")
-					outfp.write(f"			<stg-heading-deg>{float(object['heading']) + 180}</stg-heading-deg>\n")
-					outfp.write(f"			<stg-path>{os.path.abspath(path)}</stg-path>\n")
-					
-					objectpath = object["objectfile"]
-					if object["etype"] == "OBJECT_STATIC":
-						objectpath = path + "/" + objectpath
-					outfp.write(f"			<path>{objectpath}</path>\n")
-					
-					line = f"{object['etype']} {object['objectfile']} {object['longitude']} {object['latitude']} {object['elevation'] + object['offset']} {object['heading']} {object['pitch']} {object['roll']}"
-					outfp.write(f"			<object-line>{line}</object-line>\n")
-					outfp.write("		</model>\n")
-					
-				outfp.write("	</models>\n")
-				outfp.write("</PropertyList>\n")
+				line = f"{object.verb} {object.path} {object.lon} {object.lat} {object.elev + object.offset} {object.hdg} {pitch} {roll}"
+				outfp.write(f"			<object-line>{line}</object-line>\n")
+				outfp.write("		</model>\n")
+				
+			outfp.write("	</models>\n")
+			outfp.write("</PropertyList>\n")
+	return 0
 
 def main():
 	argp = argparse.ArgumentParser(description="Perform various STG file operations such as recalculating the elevation of models")
 	
 	argp.add_argument(
 		"-i", "--input",
-		help="Input STG file. Mandatory, more than one file / directory can be passed",
+		help="Input STG file / directory containing such files, more than one file / directory can be passed. Mandatory unless --index is given",
 		nargs="+",
-		required=True
+		default=[]
+	)
+	
+	argp.add_argument(
+		"-x", "--index",
+		help="STG index database (see index-stg) to take the objects from instead of parsing the input files. " +
+			"If input files / directories are given too, the index is updated for them first."
+	)
+	
+	argp.add_argument(
+		"-b", "--bbox",
+		help="Only export objects within this bounding box",
+		nargs=4,
+		type=float,
+		metavar=("LEFT", "BOTTOM", "RIGHT", "TOP")
+	)
+	
+	argp.add_argument(
+		"-r", "--radius",
+		help="Only export objects within RADIUS meters of this point",
+		nargs=3,
+		type=float,
+		metavar=("LON", "LAT", "RADIUS")
 	)
 	
 	argp.add_argument(
 		"-o", "--output",
-		help="Output STG file. Default is to overwrite the input file(s).",
+		help="Output STG file. Default is to overwrite the input file(s), required with --index, --bbox or --radius.",
 		nargs="+",
 		default=["__INPUT__"]
 	)
@@ -148,8 +138,31 @@ def main():
 	infiles = args.input
 	outfiles = args.output
 	
-	input_stg = read_stg_files(infiles)
+	if "__INPUT__" in outfiles and (args.index or args.bbox or args.radius):
+		# the input files would be overwritten with the UFO XML of just the selected objects
+		argp.error("--output is required with --index, --bbox or --radius")
+	
+	if args.index:
+		with stg_index.STGIndex(args.index) as index:
+			if infiles:
+				index.update(infiles)
+			if args.bbox:
+				results = index.query_bbox(*args.bbox, verbs=SUPPORTED_VERBS)
+			elif args.radius:
+				results = index.query_radius(*args.radius, verbs=SUPPORTED_VERBS)
+			else:
+				results = index.query_model("*", verbs=SUPPORTED_VERBS)
+		input_stg = stg_index.group_results(results)
+	elif infiles:
+		input_stg = read_stg_files(infiles)
+		if args.bbox or args.radius:
+			for stgfile in input_stg:
+				stgfile.entries = [object for object in stgfile.get_objects(SUPPORTED_VERBS) if is_in_region(object, args.bbox, args.radius)]
+	else:
+		argp.error("either --input or --index must be given")
+	
 	exitstatus = write_xml_files(input_stg, outfiles)
+	return exitstatus
 
 if __name__ == "__main__":
-	main()
+	sys.exit(main())
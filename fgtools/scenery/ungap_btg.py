@@ -7,14 +7,15 @@ import argparse
 import typing
 
 from fgtools import btg, math
-from fgtools.utils import padded_print, constants
+from fgtools.utils import constants
+from fgtools.utils import progress
 from fgtools.utils.interpolator import Interpolator
 from fgtools.geo import get_fg_tile_coords, get_fg_tile_span, get_fg_tile_index, get_fg_tile_path, get_fg_tile_bbox, Coord, FG_TILE_HEIGHT
 
 VERTEX_DISTANCE_MAX_DEG = 0.000001
 
 def create_border_data(tile_index: int, btg_file: str):
-	print("\nCreating border data")
+	progress.message(f"Creating border data for tile {tile_index}")
 	tile_rect = get_fg_tile_bbox(tile_index)
 	border_data = {edge: list() for edge in "nesw"}
 	if not os.path.isfile(btg_file):
@@ -81,8 +82,8 @@ def get_border_data(tile_index: int, terrain_dir: str, border_dir: str):
 		write_border_data(border_file, border_data)
 	return border_data
 
-def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: str, border_dir: str):
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Calculating neighbor tile indices", end="\r")
+def process_btg_file(report: progress.Progress, tile_path: str, terrain_dir: str, border_dir: str):
+	report.update(0, status=f"{tile_path} - calculating neighbor tile indices")
 	tile_index = int(os.path.split(tile_path)[-1].split(".")[0])
 	tile_coord = Coord(get_fg_tile_coords(tile_index))
 	tile_rect = get_fg_tile_bbox(tile_index)
@@ -100,7 +101,7 @@ def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: st
 
 	sibling_borders = {}
 	for i, side in enumerate(sibling_indices):
-		padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Getting border data for neighbor BTG files ({i} of {len(sibling_indices)})", end="\r")
+		report.update(0, status=f"{tile_path} - getting border data for neighbor BTG files ({i} of {len(sibling_indices)})")
 		border_data = get_border_data(sibling_indices[side], terrain_dir, border_dir)
 		if not border_data:
 			sibling_borders[side] = None
@@ -113,12 +114,11 @@ def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: st
 		elif side == "w":
 			border_data = border_data["e"]
 		sibling_borders[side] = border_data
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Getting border data for neighbor BTG files ({len(sibling_indices)} of {len(sibling_indices)})", end="\r")
 	del sibling_indices
 	
 	sibling_border_interpolators = {}
 	for i, side in enumerate(sibling_borders):
-		padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Creating interpolation tables for border data ({i} of {len(sibling_borders)})", end="\r")
+		report.update(0, status=f"{tile_path} - creating interpolation tables for border data ({i} of {len(sibling_borders)})")
 		if not sibling_borders[side]:
 			sibling_border_interpolators[side] = None
 		sibling_border_interpolator = Interpolator()
@@ -130,18 +130,16 @@ def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: st
 		for coord in sibling_borders[side]:
 			sibling_border_interpolator.add_value(getattr(coord, attrib), coord.alt)
 		sibling_border_interpolators[side] = sibling_border_interpolator
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Creating interpolation tables for border data ({len(sibling_borders)} of {len(sibling_borders)})", end="\r")
 	
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Reading BTG file", end="\r")
+	report.update(0, status=f"{tile_path} - reading BTG file")
 	btg_object = btg.ReaderWriterBTG()
 	btg_object.read(tile_path)
 	
 	tri_indices_to_process = []
 	total_tris = sum(map(lambda obj: len(obj.elements), btg_object.triangle_faces))
-	processed_tris = 0
+	report.update(0, status=f"{tile_path} - finding triangles that need fixing ({total_tris} triangles)")
 	for i, obj in enumerate(btg_object.triangle_faces):
 		for j, tri in enumerate(obj.elements):
-			padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Finding triangles that need fixing ({processed_tris} of {total_tris})", end="\r")
 			for vi in tri.vertex_indices:
 				v = btg_object.vertex_list.elements[0].items[vi]
 				if min(
@@ -149,11 +147,9 @@ def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: st
 					math.dist(v.coord.lat, tile_rect.bottom), math.dist(v.coord.lat, tile_rect.top),
 				) < VERTEX_DISTANCE_MAX_DEG:
 					tri_indices_to_process.append((i, j))
-			processed_tris += 1
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Finding triangles that need fixing ({total_tris} of {total_tris})", end="\r")
 	
-	for i, (obj_index, tri_index) in enumerate(tri_indices_to_process):
-		padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Fixing triangles ({i} of {len(tri_indices_to_process)})", end="\r")
+	report.update(0, status=f"{tile_path} - fixing {len(tri_indices_to_process)} triangles")
+	for obj_index, tri_index in tri_indices_to_process:
 		tri = btg_object.triangle_faces[obj_index].elements[tri_index]
 		for vi in tri.vertex_indices:
 			v = btg_object.vertex_list.elements[0].items[vi]
@@ -169,11 +165,11 @@ def process_btg_file(nth_input: int, total: int, tile_path: str, terrain_dir: st
 			elif math.dist(v.coord.lat, tile_rect.top) < VERTEX_DISTANCE_MAX_DEG:
 				if sibling_border_interpolators["n"]:
 					v.coord.alt = sibling_border_interpolators["n"].interpolate(v.coord.lon)
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Fixing triangles ({len(tri_indices_to_process)} of {len(tri_indices_to_process)})", end="\r")
 	
-	padded_print(f"Processing BTG file {nth_input + 1} of {total} ({tile_path}) - Writing processed BTG file")
+	report.update(0, status=f"{tile_path} - writing processed BTG file")
 	center = Coord.from_cartesian(btg_object.bs.elements[0].x, btg_object.bs.elements[0].y, btg_object.bs.elements[0].z)
 	btg_object.write(tile_path)
+	report.update()
 
 def map_border_data_dir(value):
 	if value in ("terrain-dir", "direct"):
@@ -210,15 +206,18 @@ def main():
 			"	To use a non-existing directory make sure the path contains a slash, else it might not be recognised as a path !",
 		type=map_border_data_dir
 	)
+	progress.add_argument(argp)
+	
 	args = argp.parse_args()
+	progress.apply_args(args)
 	
 	if not os.path.isdir(args.terrain_dir):
 		print("Terrain directory {args.terrain_dir} does not exist / is not a directory !")
 		sys.exit(1)
 	
-	for i, path in enumerate(args.input):
-		process_btg_file(i, len(args.input), path, args.terrain_dir, args.border_dir)
-	print()
+	with progress.Progress("Processing BTG files", len(args.input)) as report:
+		for path in args.input:
+			process_btg_file(report, path, args.terrain_dir, args.border_dir)
 
 if __name__ == '__main__':
 	main()
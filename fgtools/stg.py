@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+
+from fgtools.utils import files
+
+# Kinds of STG entries, determined by the number and meaning of the tokens following the verb
+# model: <path> <lon> <lat> <elev> <hdg> [<pitch> <roll>]
+KIND_MODEL = 0
+# sign: <sign> <lon> <lat> <elev> <hdg> [<size>]
+KIND_SIGN = 1
+# list: <path> <material> <lon> <lat> <elev>
+KIND_LIST = 2
+# feature: <path> <material>
+KIND_FEATURE = 3
+# terrain: <path>
+KIND_TERRAIN = 4
+
+VERB_KINDS = {
+	"OBJECT_SHARED": KIND_MODEL,
+	"OBJECT_SHARED_AGL": KIND_MODEL,
+	"OBJECT_STATIC": KIND_MODEL,
+	"OBJECT_STATIC_AGL": KIND_MODEL,
+	"BUILDING_ROUGH": KIND_MODEL,
+	"BUILDING_DETAILED": KIND_MODEL,
+	"OBJECT_ROAD_ROUGH": KIND_MODEL,
+	"OBJECT_ROAD_DETAILED": KIND_MODEL,
+	"OBJECT_RAILWAY_ROUGH": KIND_MODEL,
+	"OBJECT_RAILWAY_DETAILED": KIND_MODEL,
+	"OBJECT_BUILDING_MESH_ROUGH": KIND_MODEL,
+	"OBJECT_BUILDING_MESH_DETAILED": KIND_MODEL,
+	"OBJECT_SIGN": KIND_SIGN,
+	"OBJECT_SIGN_AGL": KIND_SIGN,
+	"BUILDING_LIST": KIND_LIST,
+	"TREE_LIST": KIND_LIST,
+	"LINEAR_FEATURE_LIST": KIND_FEATURE,
+	"AREA_FEATURE_LIST": KIND_FEATURE,
+	"OBJECT": KIND_TERRAIN,
+	"OBJECT_BASE": KIND_TERRAIN,
+}
+
+# Verbs whose entries carry a position and an elevation
+POSITIONED_VERBS = frozenset(verb for verb, kind in VERB_KINDS.items() if kind in (KIND_MODEL, KIND_SIGN, KIND_LIST))
+
+# Number of tokens following the verb accepted for each kind
+_KIND_LENGTHS = {
+	KIND_MODEL: (5, 7),
+	KIND_SIGN: (5, 6),
+	KIND_LIST: (5,),
+	KIND_FEATURE: (2,),
+	KIND_TERRAIN: (1,),
+}
+
+# How long "# offset <m>" and "# skipnext" directives apply:
+# edit-stg semantics - to all following objects until the next plain comment
+DIRECTIVES_UNTIL_COMMENT = "until-comment"
+# stg2ufo semantics - to the next object only, plain comments in between don't reset them
+DIRECTIVES_NEXT_OBJECT = "next-object"
+
+# Shortest representation that reads back as the same float, without a trailing .0 so
+# integral values are written as integers - only used for objects that were created or modified,
+# untouched objects are written back with their original line
+def format_number(value):
+	s = repr(float(value))
+	if s.endswith(".0"):
+		s = s[:-2]
+	return s
+
+class STGObject:
+	__slots__ = ("verb", "path", "material", "lon", "lat", "elev", "hdg", "pitch", "roll", "size", "offset", "skip", "line", "fields")
+
+	def __init__(self, verb, path, lon=None, lat=None, elev=None, hdg=None, pitch=None, roll=None, material=None, size=None,
+				offset=0.0, skip=False):
+		self.verb = verb
+		self.path = path
+		self.material = material
+		self.lon = lon
+		self.lat = lat
+		self.elev = elev
+		self.hdg = hdg
+		self.pitch = pitch
+		self.roll = roll
+		self.size = size
+		# value of a preceding "# offset" directive, to be added to the elevation when it is recalculated
+		self.offset = offset
+		# whether a preceding "# skipnext" directive asks for the elevation to be left alone
+		self.skip = skip
+		# original line and the values parsed from it, the line is written back as long as the values are unchanged
+		self.line = None
+		self.fields = None
+
+	def __repr__(self):
+		return f"STGObject({self.format()!r})"
+
+	def get_kind(self):
+		return VERB_KINDS[self.verb]
+
+	def is_positioned(self):
+		return self.verb in POSITIONED_VERBS
+
+	def is_agl(self):
+		return self.verb.endswith("_AGL")
+
+	def get_fields(self):
+		return (self.verb, self.path, self.material, self.lon, self.lat, self.elev, self.hdg, self.pitch, self.roll, self.size)
+
+	# Remember line as the original text of this object, returned by format() until the object is modified
+	def set_line(self, line):
+		self.line = line
+		self.fields = self.get_fields()
+
+	def is_modified(self):
+		return self.line is None or self.get_fields() != self.fields
+
+	def format(self):
+		if not self.is_modified():
+			return self.line
+		kind = VERB_KINDS[self.verb]
+		if kind == KIND_MODEL:
+			line = f"{self.verb} {self.path} {format_number(self.lon)} {format_number(self.lat)} {format_number(self.elev)} {format_number(self.hdg)}"
+			if self.pitch is not None or self.roll is not None:
+				line += f" {format_number(self.pitch or 0)} {format_number(self.roll or 0)}"
+		elif kind == KIND_SIGN:
+			line = f"{self.verb} {self.path} {format_number(self.lon)} {format_number(self.lat)} {format_number(self.elev)} {format_number(self.hdg)}"
+			if self.size is not None:
+				line += f" {self.size}"
+		elif kind == KIND_LIST:
+			line = f"{self.verb} {self.path} {self.material} {format_number(self.lon)} {format_number(self.lat)} {format_number(self.elev)}"
+		elif kind == KIND_FEATURE:
+			line = f"{self.verb} {self.path} {self.material}"
+		else:
+			line = f"{self.verb} {self.path}"
+		return line
+
+# Parse the tokens of one object line, return None if the number of tokens doesn't match the verb
+def parse_object(verb, data, offset=0.0, skip=False):
+	kind = VERB_KINDS[verb]
+	if len(data) not in _KIND_LENGTHS[kind]:
+		return None
+	if kind == KIND_MODEL:
+		if len(data) == 7:
+			return STGObject(verb, data[0], float(data[1]), float(data[2]), float(data[3]), float(data[4]),
+						float(data[5]), float(data[6]), offset=offset, skip=skip)
+		return STGObject(verb, data[0], float(data[1]), float(data[2]), float(data[3]), float(data[4]), offset=offset, skip=skip)
+	elif kind == KIND_SIGN:
+		return STGObject(verb, data[0], float(data[1]), float(data[2]), float(data[3]), float(data[4]),
+					size=data[5] if len(data) == 6 else None, offset=offset, skip=skip)
+	elif kind == KIND_LIST:
+		return STGObject(verb, data[0], float(data[2]), float(data[3]), float(data[4]), material=data[1], offset=offset, skip=skip)
+	elif kind == KIND_FEATURE:
+		return STGObject(verb, data[0], material=data[1], offset=offset, skip=skip)
+	else:
+		return STGObject(verb, data[0], offset=offset, skip=skip)
+
+class STGFile:
+	def __init__(self, path=None):
+		self.path = path
+		# STGObject instances for object lines, plain strings for everything else (comments, blank lines,
+		# lines that couldn't be parsed) so the file can be written back unchanged
+		self.entries = []
+		# (line number, line, reason) for every line that couldn't be parsed
+		self.problems = []
+
+	def __iter__(self):
+		return self.get_objects()
+
+	def get_objects(self, verbs=None):
+		for entry in self.entries:
+			if entry.__class__ is STGObject and (verbs is None or entry.verb in verbs):
+				yield entry
+
+	def add_object(self, object):
+		self.entries.append(object)
+
+	def read(self, path=None, directives=DIRECTIVES_UNTIL_COMMENT):
+		self.path = path or self.path
+		with open(self.path, "r") as f:
+			self.parse(f.read(), directives)
+		return self
+
+	# @param directives DIRECTIVES_UNTIL_COMMENT or DIRECTIVES_NEXT_OBJECT
+	def parse(self, text, directives=DIRECTIVES_UNTIL_COMMENT):
+		if directives not in (DIRECTIVES_UNTIL_COMMENT, DIRECTIVES_NEXT_OBJECT):
+			raise ValueError(f"unknown directive semantics {directives!r}")
+		until_comment = directives == DIRECTIVES_UNTIL_COMMENT
+		entries = self.entries
+		offset = 0.0
+		skipnext = False
+		for number, line in enumerate(text.splitlines(), 1):
+			tokens = line.split()
+			if not tokens:
+				entries.append(line)
+				continue
+
+			verb = tokens[0]
+			if verb[0] == "#":
+				if len(tokens) > 1 and verb == "#" and tokens[1] == "offset":
+					try:
+						offset = float(tokens[-1])
+					except ValueError:
+						self.problems.append((number, line, "malformed offset directive"))
+				elif len(tokens) > 1 and verb == "#" and tokens[1] == "skipnext":
+					skipnext = True
+				elif until_comment:
+					offset = 0.0
+					skipnext = False
+				entries.append(line)
+				continue
+
+			if verb not in VERB_KINDS:
+				self.problems.append((number, line, f"unknown type {verb}"))
+				entries.append(line)
+				continue
+
+			try:
+				object = parse_object(verb, tokens[1:], offset, skipnext)
+			except ValueError:
+				object = None
+			if object is None:
+				self.problems.append((number, line, "malformed line"))
+				entries.append(line)
+			else:
+				object.set_line(line)
+				entries.append(object)
+				if not until_comment:
+					offset = 0.0
+					skipnext = False
+		return self
+
+	def format(self):
+		return "".join((entry.format() if entry.__class__ is STGObject else entry) + "\n" for entry in self.entries)
+
+	# Write the file, by default atomically so an interrupted run never leaves a half-written STG file behind
+	def write(self, path=None, atomic=True):
+		if atomic:
+			files.write_atomic(path or self.path, self.format())
+		else:
+			with open(path or self.path, "w") as f:
+				f.write(self.format())
+
+def read_stg_file(path, directives=DIRECTIVES_UNTIL_COMMENT):
+	return STGFile(path).read(directives=directives)
+
+# Yield the paths of all STG files in / below the given files / directories
+def iter_stg_files(paths):
+	if isinstance(paths, str):
+		paths = [paths]
+
+	for path in paths:
+		if os.path.isdir(path):
+			stack = [path]
+			while stack:
+				with os.scandir(stack.pop()) as it:
+					for entry in it:
+						if entry.is_dir():
+							stack.append(entry.path)
+						elif entry.name.endswith(".stg"):
+							yield entry.path
+		elif path.endswith(".stg") and os.path.isfile(path):
+			yield path
+
+def read_stg_files(paths, directives=DIRECTIVES_UNTIL_COMMENT):
+	for path in iter_stg_files(paths):
+		yield read_stg_file(path, directives)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import math
+import functools
+import sqlite3
+import concurrent.futures
+
+import numpy
+
+from fgtools import stg
+from fgtools import geo
+from fgtools.utils.progress import Progress
+
+# Number of STG files written to the database per transaction
+COMMIT_INTERVAL = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS models (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS objects (
+	id INTEGER PRIMARY KEY,
+	file INTEGER NOT NULL,
+	line INTEGER NOT NULL,
+	verb TEXT NOT NULL,
+	model INTEGER NOT NULL,
+	material TEXT,
+	tile INTEGER,
+	lon REAL,
+	lat REAL,
+	elev REAL,
+	hdg REAL,
+	pitch REAL,
+	roll REAL,
+	size TEXT,
+	offset REAL,
+	skip INTEGER
+);
+CREATE INDEX IF NOT EXISTS objects_file ON objects (file);
+CREATE INDEX IF NOT EXISTS objects_model ON objects (model);
+CREATE INDEX IF NOT EXISTS objects_tile ON objects (tile);
+CREATE VIRTUAL TABLE IF NOT EXISTS objects_rtree USING rtree(id, min_lon, max_lon, min_lat, max_lat);
+"""
+
+_SELECT = """SELECT files.path, objects.line, objects.verb, models.path, objects.material, objects.lon, objects.lat, objects.elev,
+	objects.hdg, objects.pitch, objects.roll, objects.size, objects.offset, objects.skip
+	FROM objects JOIN files ON files.id = objects.file JOIN models ON models.id = objects.model"""
+
+def _row_to_result(row):
+	path, line, verb, model, material, lon, lat, elev, hdg, pitch, roll, size, offset, skip = row
+	return path, line, stg.STGObject(verb, model, lon, lat, elev, hdg, pitch, roll, material=material, size=size,
+								offset=offset or 0.0, skip=bool(skip))
+
+# SQLite index of the objects of all STG files in a scenery tree, answering bounding box, radius and model path
+# queries through an R-tree on the object positions without reparsing any STG file
+class STGIndex:
+	VERSION = 2
+
+	def __init__(self, path):
+		self.path = path
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		self.connection = sqlite3.connect(path)
+		self.connection.execute("PRAGMA journal_mode = WAL")
+		self.connection.execute("PRAGMA synchronous = NORMAL")
+		version = None
+		if self.connection.execute("SELECT name FROM sqlite_master WHERE name = 'meta'").fetchone():
+			version = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+		if version is not None and int(version[0]) != self.VERSION:
+			self.connection.close()
+			os.remove(path)
+			self.connection = sqlite3.connect(path)
+		self.connection.executescript(_SCHEMA)
+		self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.VERSION),))
+		self.connection.commit()
+		self._models = dict((path, id) for id, path in self.connection.execute("SELECT id, path FROM models"))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self.connection.close()
+
+	def __len__(self):
+		return self.connection.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+	def _get_model_id(self, path):
+		id = self._models.get(path)
+		if id is None:
+			id = self.connection.execute("INSERT INTO models (path) VALUES (?)", (path,)).lastrowid
+			self._models[path] = id
+		return id
+
+	def _remove_file(self, file_id):
+		self.connection.execute("DELETE FROM objects_rtree WHERE id IN (SELECT id FROM objects WHERE file = ?)", (file_id,))
+		self.connection.execute("DELETE FROM objects WHERE file = ?", (file_id,))
+
+	def _add_file(self, stgfile, stat):
+		cursor = self.connection.cursor()
+		row = cursor.execute("SELECT id FROM files WHERE path = ?", (stgfile.path,)).fetchone()
+		if row:
+			file_id = row[0]
+			self._remove_file(file_id)
+			cursor.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (stat.st_mtime_ns, stat.st_size, file_id))
+		else:
+			file_id = cursor.execute("INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+								(stgfile.path, stat.st_mtime_ns, stat.st_size)).lastrowid
+
+		objects = [(line, entry) for line, entry in enumerate(stgfile.entries, 1) if entry.__class__ is stg.STGObject]
+		if not objects:
+			return
+		positioned = [entry.lon is not None for line, entry in objects]
+		lons = numpy.array([entry.lon if entry.lon is not None else 0 for line, entry in objects], dtype=numpy.float64)
+		lats = numpy.array([entry.lat if entry.lat is not None else 0 for line, entry in objects], dtype=numpy.float64)
+		tiles = geo.get_fg_tile_indices_array(lons, lats).tolist()
+
+		start = (cursor.execute("SELECT MAX(id) FROM objects").fetchone()[0] or 0) + 1
+		cursor.executemany("INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+			(start + i, file_id, line, o.verb, self._get_model_id(o.path), o.material, tiles[i] if positioned[i] else None,
+				o.lon, o.lat, o.elev, o.hdg, o.pitch, o.roll, o.size, o.offset, int(o.skip))
+			for i, (line, o) in enumerate(objects)
+		])
+		cursor.executemany("INSERT INTO objects_rtree VALUES (?, ?, ?, ?, ?)", [
+			(start + i, o.lon, o.lon, o.lat, o.lat) for i, (line, o) in enumerate(objects) if positioned[i]
+		])
+
+	# Bring the index up to date with the STG files in / below paths - new and changed files are (re)parsed,
+	# files that disappeared from below paths are dropped
+	# @return	tuple (number of files (re)indexed, number of files removed, number of files unchanged)
+	def update(self, paths, jobs=1, remove=True):
+		if isinstance(paths, str):
+			paths = [paths]
+		paths = [os.path.abspath(path) for path in paths]
+
+		known = dict((path, (id, mtime_ns, size)) for id, path, mtime_ns, size in
+						self.connection.execute("SELECT id, path, mtime_ns, size FROM files"))
+		seen = set()
+		pending = []
+		for path in stg.iter_stg_files(paths):
+			seen.add(path)
+			st = os.stat(path)
+			entry = known.get(path)
+			if entry is None or entry[1:] != (st.st_mtime_ns, st.st_size):
+				pending.append((path, st))
+
+		removed = 0
+		if remove:
+			roots = tuple(path if path.endswith(".stg") else os.path.join(path, "") for path in paths)
+			for path, (id, _, _) in known.items():
+				if path not in seen and (path in roots or path.startswith(roots)):
+					self._remove_file(id)
+					self.connection.execute("DELETE FROM files WHERE id = ?", (id,))
+					removed += 1
+
+		# the stored offsets and skip flags are consumed by stg2ufo, so parse with its directive semantics
+		read_stg_file = functools.partial(stg.read_stg_file, directives=stg.DIRECTIVES_NEXT_OBJECT)
+		total = len(pending)
+		if jobs > 1 and total > jobs:
+			executor = concurrent.futures.ProcessPoolExecutor(jobs)
+			parsed = executor.map(read_stg_file, [p[0] for p in pending], chunksize=max(1, min(256, total // (jobs * 4))))
+		else:
+			executor = None
+			parsed = map(read_stg_file, [p[0] for p in pending])
+
+		done = 0
+		progress = Progress("Indexing STG files", total) if total else None
+		try:
+			for stgfile, (path, st) in zip(parsed, pending):
+				self._add_file(stgfile, st)
+				done += 1
+				if done % COMMIT_INTERVAL == 0:
+					self.connection.commit()
+				progress.update()
+		finally:
+			if executor:
+				executor.shutdown()
+			self.connection.commit()
+			if progress:
+				progress.close()
+
+		return done, removed, len(seen) - done
+
+	def _query(self, where, args, verbs=None, model=None):
+		query = _SELECT + " WHERE " + where
+		args = list(args)
+		if verbs:
+			query += " AND objects.verb IN (" + ", ".join("?" * len(verbs)) + ")"
+			args += list(verbs)
+		if model:
+			# model paths may contain * and ? wildcards
+			query += " AND models.path GLOB ?"
+			args.append(model)
+		return self.connection.execute(query, args)
+
+	# All objects within the rectangle, optionally only the ones with one of the given verbs / a model path matching a glob pattern
+	# @return	list of (STG file path, line number, STGObject) tuples
+	def query_bbox(self, left, bottom, right, top, verbs=None, model=None):
+		where = ("objects.id IN (SELECT id FROM objects_rtree WHERE max_lon >= ? AND min_lon <= ? AND max_lat >= ? AND min_lat <= ?)" +
+				" AND objects.lon BETWEEN ? AND ? AND objects.lat BETWEEN ? AND ?")
+		return list(map(_row_to_result, self._query(where, (left, right, bottom, top, left, right, bottom, top), verbs, model)))
+
+	# All objects within radius meters of the point, sorted by distance
+	# @return	list of (STG file path, line number, STGObject) tuples
+	def query_radius(self, lon, lat, radius, verbs=None, model=None):
+		dlat = math.degrees(radius / geo.EARTH_RADIUS)
+		if abs(lat) + dlat >= 90:
+			boxes = [(-180, max(-90, lat - dlat), 180, min(90, lat + dlat))]
+		else:
+			dlon = min(180, dlat / math.cos(math.radians(abs(lat) + dlat)))
+			left, right = lon - dlon, lon + dlon
+			boxes = [(max(-180, left), lat - dlat, min(180, right), lat + dlat)]
+			if left < -180:
+				boxes.append((left + 360, lat - dlat, 180, lat + dlat))
+			if right > 180:
+				boxes.append((-180, lat - dlat, right - 360, lat + dlat))
+
+		results = []
+		for box in boxes:
+			results += self.query_bbox(*box, verbs=verbs, model=model)
+		if not results:
+			return results
+		distances = geo.great_circle_distance_m(lon, lat, numpy.array([r[2].lon for r in results]), numpy.array([r[2].lat for r in results]))
+		order = numpy.argsort(distances, kind="stable")
+		return [results[i] for i in order if distances[i] <= radius]
+
+	# All objects whose model path matches a glob pattern
+	# @return	list of (STG file path, line number, STGObject) tuples
+	def query_model(self, model, verbs=None):
+		return list(map(_row_to_result, self._query("1", (), verbs, model)))
+
+	# All objects in one FlightGear tile
+	# @return	list of (STG file path, line number, STGObject) tuples
+	def query_tile(self, tile_index, verbs=None, model=None):
+		return list(map(_row_to_result, self._query("objects.tile = ?", (int(tile_index),), verbs, model)))
+
+# Group query results into STGFile objects, one per STG file, containing only the matching objects
+def group_results(results):
+	stg_files = {}
+	for path, line, object in results:
+		if path not in stg_files:
+			stg_files[path] = stg.STGFile(path)
+		stg_files[path].add_object(object)
+	return list(stg_files.values())
@@ -6,13 +6,7 @@ import os
 import sys
 import subprocess
 import time
-import requests
-import shutil
-
-import datetime
-from dateutil.parser import parse as parsedate
-
-import tqdm
+import warnings
 
 from fgtools import get_logger
 
@@ -68,32 +62,50 @@ def format_size(size, decimal_places=1):
 		size /= 1000
 	return f"{size:.{decimal_places}f} {unit}B"
 
-def download(url, path, progress=True, prolog="Downloading '{path}'", blocksize=1000, force=False, update=True):
-	with requests.get(url, stream=True) as remote:
-		if remote.status_code >= 400:
-			get_logger().error(f"Request to {url} failed with status code {remote.status_code}")
-			return False
-		
-		content_length = int(remote.headers["Content-Length"])
-		
-		if os.path.exists(path):
-			url_time = parsedate(remote.headers['last-modified']).replace(tzinfo=None)
-			file_time = datetime.datetime.fromtimestamp(os.path.getmtime(path)).replace(tzinfo=None)
-			
-			if (url_time <= file_time or not update) and content_length == os.stat(path).st_size and not force:
-				return True
-
-		with open(path, "wb") as local:
-			pbar = tqdm.tqdm(desc=prolog.format(path=path), total=content_length, unit="B", unit_scale=True)
-			for chunk in remote.iter_content(chunk_size=blocksize):
-				local.write(chunk)
-				pbar.update(len(chunk))
+# Parse a size like 500M or 1.5 GB into bytes, the counterpart of format_size
+def parse_size(text):
+	text = text.strip().upper().rstrip("B").strip()
+	factor = 1
+	for i, unit in enumerate(["K", "M", "G", "T", "P"]):
+		if text.endswith(unit):
+			factor = 1000 ** (i + 1)
+			text = text[:-1].strip()
+			break
+	try:
+		size = float(text) * factor
+	except ValueError:
+		raise ValueError(f"invalid size {text!r}")
+	if size < 0:
+		raise ValueError(f"invalid size {text!r}, must not be negative")
+	return int(size)
+
+# Download url to path unless the remote file didn't change since the last download, see fgtools.utils.downloader
+# @return	True on success, False if the download failed
+def download(url, path, progress=True, prolog="Downloading '{path}'", blocksize=None, force=False, update=True, checksum=None):
+	# imported here since requests takes long to import
+	from fgtools.utils import downloader
+	from fgtools.utils.progress import Progress, MODE_NONE
+	
+	if not update and os.path.exists(path) and not force:
+		return True
+	
+	try:
+		with Progress(prolog.format(path=path).rstrip(" -"), unit="B", mode=None if progress else MODE_NONE, scale=True) as report:
+			downloader.download_file(url, path, checksum=checksum, force=force, chunk_size=blocksize or downloader.CHUNK_SIZE, report=report)
+	except downloader.DownloadError as e:
+		get_logger().error(str(e))
+		return False
 	return True
 
+# Deprecated, report progress through fgtools.utils.progress.Progress instead
 def padded_print(s, pad_str=" ", end=None):
+	warnings.warn("padded_print is deprecated, use fgtools.utils.progress.Progress", DeprecationWarning, stacklevel=2)
+	import shutil
 	print(s + pad_str * (shutil.get_terminal_size()[0] - len(s)), end=end)
 
+# Deprecated, fgtools.utils.buildcache.BuildCache tracks whether outputs are up to date
 def read_timestamp(path):
+	warnings.warn("read_timestamp is deprecated, use fgtools.utils.buildcache.BuildCache", DeprecationWarning, stacklevel=2)
 	timestamp_path = path + ".timestamp"
 	if not os.path.exists(timestamp_path):
 		return -1
@@ -104,23 +116,27 @@ def read_timestamp(path):
 		except ValueError:
 			return -1
 
+# Deprecated, fgtools.utils.buildcache.BuildCache tracks whether outputs are up to date
 def write_timestamp(path):
+	warnings.warn("write_timestamp is deprecated, use fgtools.utils.buildcache.BuildCache", DeprecationWarning, stacklevel=2)
 	os.makedirs(os.path.dirname(path), exist_ok=True)
 	timestamp_path = path + ".timestamp"
 	with open(timestamp_path, "w") as timestamp_file:
 		timestamp_file.write(str(time.time()))
 
-def run_command(cmd, error_log_path=None):
+def run_command(cmd, error_log_path=None, env=None):
 	error_log_path = (error_log_path or cmd.replace("/", "_")) + ".log"
 	get_logger().debug(f"Running command: {cmd}")
-	p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-	if p.returncode != 0:
+	# recorded by the active telemetry recorder, if there is one
+	from fgtools.utils import telemetry
+	returncode, output = telemetry.run_process(cmd, shell=True, env=env)
+	if returncode != 0:
 		os.makedirs(os.path.dirname(error_log_path) or ".", exist_ok=True)
 		with open(error_log_path, "wb") as log_file:
 			log_file.write(cmd.encode("utf-8") + b"\n\n")
-			log_file.write(p.stdout)
-		get_logger().fatal(f"\nCommand '{cmd}' exited with return code {p.returncode} - see {error_log_path} for details.")
-	return p.returncode
+			log_file.write(output)
+		get_logger().fatal(f"\nCommand '{cmd}' exited with return code {returncode} - see {error_log_path} for details.")
+	return returncode
 
 def quote(s, quote="\"", n=1):
 	return (quote * n) + str(s) + (quote * n)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import json
+import zipfile
+import threading
+import concurrent.futures
+
+from fgtools.utils.files import write_atomic
+from fgtools.utils import telemetry
+
+# Bytes copied at once when extracting a member
+BUFFER_SIZE = 4 * 1024 * 1024
+# Number of members extracted at the same time - decompression releases the GIL, so threads scale
+JOBS = 4
+
+class ExtractError(Exception):
+	pass
+
+# Path of the index recording the members of an archive and which of them were extracted into folder
+def get_index_path(archive, folder):
+	return os.path.join(folder, "." + os.path.basename(archive) + ".index.json")
+
+def read_index(archive, folder):
+	try:
+		with open(get_index_path(archive, folder), "r") as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+def write_index(archive, folder, index):
+	write_atomic(get_index_path(archive, folder), json.dumps(index))
+
+# Path a member is extracted to relative to the output folder, None for directories and members that would end up
+# outside of the output folder
+# @param flatten	extract all members directly into the output folder, dropping the directories in the archive
+def get_member_path(name, flatten=False):
+	if name.endswith("/"):
+		return None
+	if flatten:
+		return os.path.basename(name) or None
+	parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+	if not parts or ".." in parts:
+		return None
+	return os.path.join(*parts)
+
+def _list_members(archive):
+	with zipfile.ZipFile(archive, mode="r") as zf:
+		return dict((info.filename, [info.CRC, info.file_size]) for info in zf.infolist() if not info.is_dir())
+
+def _extract_member(archive, name, path, handles, opened, buffer_size):
+	zf = getattr(handles, "zf", None)
+	if zf is None:
+		# every thread reads through its own file handle
+		zf = handles.zf = zipfile.ZipFile(archive, mode="r")
+		opened.append(zf)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	part_path = path + ".part"
+	try:
+		# the CRC is checked by zipfile while reading
+		with zf.open(name, "r") as src, open(part_path, "wb") as dst:
+			while True:
+				block = src.read(buffer_size)
+				if not block:
+					break
+				dst.write(block)
+		os.replace(part_path, path)
+	except BaseException:
+		if os.path.exists(part_path):
+			os.remove(part_path)
+		raise
+
+# Extract the members of a zip archive that are missing or changed in folder. The members and their CRCs are kept
+# in an index next to the extracted files, so an archive that didn't change since the last call isn't even opened
+# as long as the extracted files are still there, and a new version of an archive only extracts the members whose
+# CRC changed.
+# @param select	function taking a member name and returning whether to extract it, None to extract all members
+# @param flatten	extract all members directly into folder, dropping the directories in the archive
+# @param jobs	number of members extracted at the same time
+# @param report	Progress to add the extracted bytes to, None for no progress output
+# @return	list of the paths that were extracted
+def extract_archive(archive, folder, select=None, flatten=False, jobs=JOBS, buffer_size=BUFFER_SIZE, report=None):
+	st = os.stat(archive)
+	index = read_index(archive, folder)
+	extracted = index.get("extracted", {})
+	members = None
+	if index.get("size") == st.st_size and index.get("mtime_ns") == st.st_mtime_ns:
+		members = index.get("members")
+
+	def get_pending(members):
+		pending = {}
+		for name, (crc, size) in members.items():
+			path = get_member_path(name, flatten)
+			if path is None or (select is not None and not select(name)):
+				continue
+			out_path = os.path.join(folder, path)
+			if extracted.get(path) != [crc, size] or not os.path.isfile(out_path) or os.path.getsize(out_path) != size:
+				pending[path] = name
+		return pending
+
+	if members is not None and not get_pending(members):
+		return []
+	
+	try:
+		members = _list_members(archive)
+	except (OSError, zipfile.BadZipFile) as e:
+		raise ExtractError(f"cannot read archive {archive}: {e}") from e
+	pending = get_pending(members)
+	index = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "members": members, "extracted": extracted}
+	if not pending:
+		write_index(archive, folder, index)
+		return []
+	
+	# the largest members first, so they don't end up running alone at the end
+	order = sorted(pending, key=lambda path: -members[pending[path]][1])
+	if report is not None:
+		report.total = (report.total or 0) + sum(members[name][1] for name in pending.values())
+	handles = threading.local()
+	opened = []
+	lock = threading.Lock()
+	errors = []
+	try:
+		extract_member = telemetry.wrap(_extract_member, f"extract members of {os.path.basename(archive)}")
+		with concurrent.futures.ThreadPoolExecutor(max(1, min(jobs, len(order)))) as executor:
+			futures = dict((executor.submit(extract_member, archive, pending[path], os.path.join(folder, path), handles, opened, buffer_size), path)
+				for path in order)
+			for future in concurrent.futures.as_completed(futures):
+				path = futures[future]
+				name = pending[path]
+				try:
+					future.result()
+				except (OSError, zipfile.BadZipFile) as e:
+					errors.append(f"{name}: {e}")
+					extracted.pop(path, None)
+					continue
+				extracted[path] = members[name]
+				if report is not None:
+					with lock:
+						report.update(members[name][1])
+	finally:
+		for zf in opened:
+			zf.close()
+		# record the members extracted so far even if some failed, they don't have to be extracted again
+		write_index(archive, folder, index)
+	if errors:
+		raise ExtractError(f"extracting {archive} failed for {len(errors)} members - " + "; ".join(errors))
+	return [os.path.join(folder, path) for path in order]
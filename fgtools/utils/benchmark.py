@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import argparse
+import sys
+import timeit
+
+# Call sites of plum dispatched functions / constructors on hot paths and their dispatch-free replacements
+# @return	list of (name, overloaded callable, dispatch-free callable) tuples, both callables taking no arguments
+def get_dispatch_call_sites():
+	from fgtools import geo
+	from fgtools import btg
+	from fgtools import aptdat
+
+	return [
+		("geo.Coord(lon, lat, alt)", lambda: geo.Coord(8.5, 47.4, 400.0), lambda: geo.make_coord(8.5, 47.4, 400.0)),
+		("geo.Rectangle(l, b, r, t)", lambda: geo.Rectangle(8.5, 47.4, 8.75, 47.5), lambda: geo.make_rectangle(8.5, 47.4, 8.75, 47.5)),
+		("geo.get_fg_tile_span", lambda: geo.get_fg_tile_span(47.4), lambda: geo.fg_tile_span(47.4)),
+		("geo.get_fg_tile_index", lambda: geo.get_fg_tile_index(8.5, 47.4), lambda: geo.fg_tile_index(8.5, 47.4)),
+		("geo.get_fg_tile_path(lon, lat)", lambda: geo.get_fg_tile_path(8.5, 47.4), lambda: geo.fg_tile_path(8.5, 47.4)),
+		("geo.get_fg_tile_path(index)", lambda: geo.get_fg_tile_path(3088961), lambda: geo.fg_tile_path_from_index(3088961)),
+		("geo.get_fg_tile_bbox(index)", lambda: geo.get_fg_tile_bbox(3088961), lambda: geo.fg_tile_bbox(*geo.fg_tile_coords(3088961))),
+		("btg.BTGListElementVertexItem()", btg.BTGListElementVertexItem, btg._ELEMENT_FACTORIES[btg.BTGListElementVertexItem]),
+		("btg.BTGListElementNormalItem()", btg.BTGListElementNormalItem, btg._ELEMENT_FACTORIES[btg.BTGListElementNormalItem]),
+		("btg.BTGGeometryElementTriangleFace()", btg.BTGGeometryElementTriangleFace, btg._ELEMENT_FACTORIES[btg.BTGGeometryElementTriangleFace]),
+		("btg.BTGListElement(item_class)", lambda: btg.BTGListElement(btg.BTGListElementVertexItem),
+			lambda: btg._ELEMENT_FACTORIES[btg.BTGListElement](btg.BTGListElementVertexItem)),
+		("aptdat.Airport()", aptdat.Airport, aptdat.new_airport),
+		("aptdat.LandRunway()", aptdat.LandRunway, lambda: aptdat.LandRunway.__new__(aptdat.LandRunway)),
+	]
+
+# Time one call of func in microseconds, the fastest of repeat runs
+def time_call_us(func, repeat=5):
+	timer = timeit.Timer(func)
+	number, _ = timer.autorange()
+	return min(timer.repeat(repeat, number)) / number * 1e6
+
+def check_dispatch(repeat):
+	print(f"{'Call site':<40}{'Overloaded':>14}{'Dispatch-free':>16}{'Speedup':>10}")
+	for name, overloaded, direct in get_dispatch_call_sites():
+		overloaded_us = time_call_us(overloaded, repeat)
+		direct_us = time_call_us(direct, repeat)
+		print(f"{name:<40}{overloaded_us:>11.2f} us{direct_us:>13.2f} us{overloaded_us / direct_us:>9.1f}x")
+	return 0
+
+# Wall time of running a graph of tasks shaped like the ogr-decode stage of genws20 - one task per bbox and material,
+# tasks writing the same material folder can't overlap - with growing numbers of jobs. The tasks sleep instead of
+# running ogr-decode, which leaves only the scheduling overhead and the limits set by the shared outputs.
+def check_scheduler(bboxes, materials, duration, max_jobs):
+	import os
+	import time
+	import tempfile
+	from fgtools.utils import progress
+	from fgtools.utils.tasks import TaskGraph
+
+	workspace = tempfile.gettempdir()
+	print(f"{bboxes} bboxes x {materials} materials, {duration * 1000:.0f} ms per task")
+	print(f"{'Jobs':>6}{'Time':>10}{'Speedup':>10}{'Efficiency':>12}")
+	serial = None
+	jobs = 1
+	while jobs <= max_jobs:
+		tasks = TaskGraph()
+		for bbox in range(bboxes):
+			for material in range(materials):
+				tasks.add(f"decode {bbox} {material}", time.sleep, duration,
+						tool="ogr-decode", outputs=[os.path.join(workspace, "work", f"material-{material}")])
+		start = time.perf_counter()
+		tasks.run(jobs, {"ogr-decode": jobs}, mode=progress.MODE_NONE)
+		elapsed = time.perf_counter() - start
+		serial = serial or elapsed
+		print(f"{jobs:>6}{elapsed:>8.2f} s{serial / elapsed:>9.1f}x{serial / elapsed / jobs * 100:>11.0f}%")
+		jobs *= 2
+	return 0
+
+# Wall time of extracting a generated zip archive shaped like an elevation data package - one member per tile -
+# member by member with zipfile.extract, with extract_archive and growing numbers of jobs, and again with
+# extract_archive once everything is extracted
+def check_extract(members, size, max_jobs):
+	import os
+	import time
+	import shutil
+	import zipfile
+	import tempfile
+	from fgtools.utils import archive
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		zip_path = os.path.join(tmpdir, "dem.zip")
+		# half random, half zeros, so the members compress about as well as elevation data
+		with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+			for i in range(members):
+				zf.writestr(f"M32/N{i // 10:02d}E{i % 10:03d}.hgt", os.urandom(size // 2) + bytes(size - size // 2))
+		print(f"{members} members of {size / 1e6:.1f} MB")
+		print(f"{'Method':<28}{'Time':>10}{'Speedup':>10}")
+
+		out = os.path.join(tmpdir, "out")
+		start = time.perf_counter()
+		with zipfile.ZipFile(zip_path, "r") as zf:
+			for info in zf.infolist():
+				zf.extract(info, out)
+		serial = time.perf_counter() - start
+		print(f"{'zipfile.extract':<28}{serial:>8.2f} s{1:>9.1f}x")
+
+		jobs = 1
+		while jobs <= max_jobs:
+			shutil.rmtree(out)
+			start = time.perf_counter()
+			archive.extract_archive(zip_path, out, jobs=jobs)
+			elapsed = time.perf_counter() - start
+			print(f"{f'extract_archive -j {jobs}':<28}{elapsed:>8.2f} s{serial / elapsed:>9.1f}x")
+			jobs *= 2
+
+		start = time.perf_counter()
+		archive.extract_archive(zip_path, out)
+		elapsed = time.perf_counter() - start
+		print(f"{'extract_archive, unchanged':<28}{elapsed:>8.2f} s{serial / elapsed:>9.0f}x")
+	return 0
+
+def main():
+	argp = argparse.ArgumentParser(description="Benchmarks for fgtools")
+	subparsers = argp.add_subparsers(dest="benchmark", required=True)
+
+	dispatchp = subparsers.add_parser("dispatch", help="Compare the plum dispatched hot path calls with their dispatch-free replacements")
+	dispatchp.add_argument(
+		"-r", "--repeat",
+		help="Number of times to time each call site, the fastest run counts",
+		type=int,
+		default=5
+	)
+
+	schedulerp = subparsers.add_parser("scheduler", help="Measure how the build task scheduler scales with the number of jobs")
+	schedulerp.add_argument("-b", "--bboxes", help="Number of bboxes", type=int, default=4)
+	schedulerp.add_argument("-m", "--materials", help="Number of materials per bbox", type=int, default=32)
+	schedulerp.add_argument("-d", "--duration", help="Duration of each task in seconds", type=float, default=0.05)
+	schedulerp.add_argument("-j", "--jobs", help="Maximum number of jobs, doubled from 1 up to this", type=int, default=16)
+
+	extractp = subparsers.add_parser("extract", help="Compare zip extraction member by member with the parallel, incremental extraction")
+	extractp.add_argument("-n", "--members", help="Number of members in the archive", type=int, default=64)
+	extractp.add_argument("-s", "--size", help="Size of each member in bytes", type=int, default=2884802)
+	extractp.add_argument("-j", "--jobs", help="Maximum number of jobs, doubled from 1 up to this", type=int, default=8)
+
+	args = argp.parse_args()
+
+	if args.benchmark == "dispatch":
+		return check_dispatch(args.repeat)
+	elif args.benchmark == "scheduler":
+		return check_scheduler(args.bboxes, args.materials, args.duration, args.jobs)
+	elif args.benchmark == "extract":
+		return check_extract(args.members, args.size, args.jobs)
+
+if __name__ == "__main__":
+	sys.exit(main())
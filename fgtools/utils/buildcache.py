@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import json
+import time
+import hashlib
+import shutil
+import sqlite3
+import threading
+
+from fgtools.utils.files import get_tree_size
+
+# Bytes read at once when hashing files
+HASH_BLOCKSIZE = 1024 * 1024
+
+# Recorded instead of a hash for output directories, which are often shared between tasks and only checked for existence
+DIRECTORY = "directory"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT);
+CREATE TABLE IF NOT EXISTS tasks (name TEXT PRIMARY KEY, signature TEXT, inputs TEXT, outputs TEXT, time REAL);
+CREATE TABLE IF NOT EXISTS artefacts (path TEXT PRIMARY KEY, task TEXT, stage TEXT, restorable INTEGER, pinned INTEGER, used REAL);
+CREATE TABLE IF NOT EXISTS evicted (path TEXT PRIMARY KEY, hash TEXT, size INTEGER, time REAL, directory INTEGER);
+"""
+
+# Build database recording, per task, its signature (usually the tool command line) and the content hashes of
+# the files it read and wrote on its last successful run. A task only has to run again when one of them changed.
+# File hashes are cached together with size and modification time so unchanged files are never read twice.
+# It also tracks the task producing each file and when each file was last used, so files can be evicted from
+# the workspace - evicted files and output directories keep their hash and count as unchanged until a task that has
+# to run needs them.
+class BuildCache:
+	VERSION = 2
+
+	def __init__(self, path):
+		self.path = path
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		# tasks are checked and recorded from the worker threads of the task graph
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode = WAL")
+		self.connection.execute("PRAGMA synchronous = NORMAL")
+		version = None
+		if self.connection.execute("SELECT name FROM sqlite_master WHERE name = 'meta'").fetchone():
+			version = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+		if version is not None and int(version[0]) != self.VERSION:
+			self.connection.close()
+			os.remove(path)
+			self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.executescript(_SCHEMA)
+		self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.VERSION),))
+		self.connection.commit()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self.connection.close()
+
+	# Content hash of a file, only read again when its size or modification time changed
+	def hash_file(self, path):
+		st = os.stat(path)
+		with self.lock:
+			row = self.connection.execute("SELECT size, mtime_ns, hash FROM files WHERE path = ?", (path,)).fetchone()
+		if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+			return row[2]
+
+		digest = hashlib.sha256()
+		with open(path, "rb") as f:
+			while True:
+				block = f.read(HASH_BLOCKSIZE)
+				if not block:
+					break
+				digest.update(block)
+		digest = digest.hexdigest()
+		with self.lock:
+			self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, digest))
+			self.connection.commit()
+		return digest
+
+	# Content hash of a file, or of all files below a directory together with their relative paths. Evicted files
+	# count with the hash they had when they were evicted.
+	# @return	hash string, None if the path doesn't exist
+	def hash_path(self, path):
+		if os.path.isfile(path):
+			return self.hash_file(path)
+		if not os.path.isdir(path):
+			return self.get_evicted_hash(path)
+		hashes = dict(self.get_evicted(path))
+		for root, dirs, files in os.walk(path):
+			for name in files:
+				file_path = os.path.join(root, name)
+				hashes[file_path] = self.hash_file(file_path)
+		digest = hashlib.sha256()
+		# in the order of os.walk with sorted names - the files of a directory first, then its subdirectories
+		key = lambda relpath: [(1, part) for part in relpath.split(os.sep)[:-1]] + [(0, relpath.split(os.sep)[-1])]
+		for relpath in sorted((os.path.relpath(file_path, path) for file_path in hashes), key=key):
+			digest.update(relpath.encode("utf-8") + b"\0" + hashes[os.path.join(path, relpath)].encode("ascii") + b"\0")
+		return digest.hexdigest()
+
+	def _hash_output(self, path):
+		if os.path.isdir(path) or self.is_evicted_directory(path):
+			return DIRECTORY
+		return self.hash_path(path)
+
+	def _get_record(self, name):
+		with self.lock:
+			row = self.connection.execute("SELECT signature, inputs, outputs FROM tasks WHERE name = ?", (name,)).fetchone()
+		if not row:
+			return None
+		return row[0], json.loads(row[1]), json.loads(row[2])
+
+	# Check whether a task has to run
+	# @return	None if the task is up to date, else a text explaining why it has to run
+	def check(self, task):
+		record = self._get_record(task.name)
+		if record is None:
+			return "no record of a successful run"
+		signature, inputs, outputs = record
+		if signature != task.signature:
+			return "command changed"
+		if sorted(inputs) != sorted(task.inputs):
+			return "inputs changed"
+		if sorted(outputs) != sorted(task.outputs):
+			return "outputs changed"
+		for path in task.inputs:
+			digest = self.hash_path(path)
+			if digest != inputs[path]:
+				return f"input {path} " + ("appeared" if inputs[path] is None else "disappeared" if digest is None else "changed")
+		# outputs the task didn't produce on its last run, like the files of ocean tiles, are fine as long as they stay missing
+		for path in task.outputs:
+			digest = self._hash_output(path)
+			if digest != outputs[path]:
+				return f"output {path} " + ("appeared" if outputs[path] is None else "is missing" if digest is None else "was modified")
+		return None
+
+	# Record a successful run of a task. Input hashes are taken after the run, so tasks updating their own inputs
+	# (like terrafit writing into the folder it reads) don't count as changed next time.
+	def record(self, task):
+		inputs = dict((path, self.hash_path(path)) for path in task.inputs)
+		outputs = dict((path, self._hash_output(path)) for path in task.outputs)
+		with self.lock:
+			self.connection.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?)",
+								(task.name, task.signature, json.dumps(inputs), json.dumps(outputs), time.time()))
+			# outputs written again aren't evicted anymore
+			self.connection.executemany("DELETE FROM evicted WHERE path = ?", [(path,) for path in task.outputs if os.path.exists(path)])
+			self.connection.commit()
+
+	def forget(self, task):
+		with self.lock:
+			self.connection.execute("DELETE FROM tasks WHERE name = ?", (task.name,))
+			self.connection.commit()
+
+	# Record that a task ran or was up to date - which task produces its outputs and when its inputs and outputs were
+	# last used. Outputs of cached tasks and of tasks without inputs, like downloads, can be restored by running the
+	# task again and are evictable. Inputs of tasks that always run, like extractions, are pinned and never evicted.
+	def track(self, task):
+		now = time.time()
+		restorable = task.signature is not None or not task.inputs
+		with self.lock:
+			for path in task.outputs:
+				self.connection.execute("INSERT OR REPLACE INTO artefacts VALUES (?, ?, ?, ?, COALESCE((SELECT pinned FROM artefacts WHERE path = ?), 0), ?)",
+									(path, task.name, task.tool, int(restorable), path, now))
+			for path in task.inputs:
+				self.connection.execute("INSERT OR IGNORE INTO artefacts VALUES (?, NULL, NULL, 0, 0, ?)", (path, now))
+				self.connection.execute("UPDATE artefacts SET used = ?, pinned = pinned OR ? WHERE path = ?", (now, int(task.signature is None), path))
+			self.connection.commit()
+
+	# Files and directories that can be evicted - existing, restorable and unpinned outputs of tasks
+	# @param folder	only return paths below this folder, like the workspace - the results of a build are never evicted
+	# @return	list of (path, time of last use) tuples, least recently used first
+	def get_evictable(self, folder):
+		prefix = os.path.join(os.path.abspath(folder), "")
+		with self.lock:
+			rows = self.connection.execute("SELECT path, used FROM artefacts WHERE task IS NOT NULL AND restorable AND NOT pinned " +
+										"AND path >= ? AND path < ? ORDER BY used", (prefix, prefix + "\U0010ffff")).fetchall()
+		return [(path, used) for path, used in rows if os.path.exists(path)]
+
+	# Delete a file or an output directory from the workspace, remembering its hash so tasks reading or writing it
+	# stay up to date. Directories, like the material folders written by many ogr-decode tasks, are restored by running
+	# all tasks writing them.
+	# @param extra_paths	files belonging to path that are deleted along with it, like the .dbf of a .shp
+	# @return	number of bytes freed
+	def evict(self, path, extra_paths=()):
+		directory = os.path.isdir(path)
+		digest = self.hash_path(path)
+		size = 0
+		if directory:
+			size = get_tree_size(path)
+			shutil.rmtree(path)
+		else:
+			for file_path in [path] + [extra_path for extra_path in extra_paths if os.path.isfile(extra_path)]:
+				size += os.path.getsize(file_path)
+				os.remove(file_path)
+		with self.lock:
+			self.connection.execute("INSERT OR REPLACE INTO evicted VALUES (?, ?, ?, ?, ?)", (path, digest, size, time.time(), int(directory)))
+			self.connection.commit()
+		return size
+
+	def get_evicted_hash(self, path):
+		with self.lock:
+			row = self.connection.execute("SELECT hash FROM evicted WHERE path = ?", (path,)).fetchone()
+		return row[0] if row else None
+
+	def is_evicted(self, path):
+		return not os.path.exists(path) and self.get_evicted_hash(path) is not None
+	
+	def is_evicted_directory(self, path):
+		if os.path.exists(path):
+			return False
+		with self.lock:
+			row = self.connection.execute("SELECT directory FROM evicted WHERE path = ?", (path,)).fetchone()
+		return bool(row and row[0])
+
+	# Evicted files that are path or below it and weren't written again since
+	# @return	list of (path, hash) tuples
+	def get_evicted(self, path):
+		prefix = os.path.join(path, "")
+		with self.lock:
+			rows = self.connection.execute("SELECT path, hash FROM evicted WHERE path = ? OR (path >= ? AND path < ?)",
+										(path, prefix, prefix + "\U0010ffff")).fetchall()
+		return [(file_path, digest) for file_path, digest in rows if not os.path.exists(file_path)]
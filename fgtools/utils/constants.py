@@ -2,12 +2,22 @@
 #-*- coding:utf-8 -*-
 
 import os
-from appdirs import user_cache_dir
-from importlib.metadata import version
 
 HOME = os.environ.get("HOME", os.path.expanduser("~"))
-CACHEDIR = os.environ.get("FGTOOLS_CACHEDIR", user_cache_dir("fgtools", "TheEagle"))
-os.makedirs(CACHEDIR, exist_ok=True)
-__versionstr__ = version("fgtools")
-__version__ = __versionstr__.split(".")
 
+# CACHEDIR and the version are determined on first access - creating the cache directory and reading the
+# package metadata is only done by the tools that need them instead of on every import
+def __getattr__(name):
+	if name == "CACHEDIR":
+		from appdirs import user_cache_dir
+		value = os.environ.get("FGTOOLS_CACHEDIR") or user_cache_dir("fgtools", "TheEagle")
+		os.makedirs(value, exist_ok=True)
+	elif name == "__versionstr__":
+		from importlib.metadata import version
+		value = version("fgtools")
+	elif name == "__version__":
+		value = __getattr__("__versionstr__").split(".")
+	else:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	globals()[name] = value
+	return value
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import json
+import hashlib
+import threading
+import concurrent.futures
+
+from fgtools.utils.progress import Progress, MODE_NONE
+
+# Bytes read from the connection and written to disk at once
+CHUNK_SIZE = 1024 * 1024
+# Number of connections kept open per host
+POOL_SIZE = 16
+# Seconds to wait for the server to connect / send data
+TIMEOUT = (30, 300)
+# Number of times a failed request is retried, with exponential backoff
+RETRIES = 5
+
+# Results of download_file
+DOWNLOADED = "downloaded"
+RESUMED = "resumed"
+NOT_MODIFIED = "not modified"
+
+class DownloadError(Exception):
+	pass
+
+_session = None
+_session_lock = threading.Lock()
+# held while updating progress reports shared between download threads
+_report_lock = threading.Lock()
+
+# Session shared by all downloads, keeping connections to the servers open between requests
+def get_session():
+	global _session
+	with _session_lock:
+		if _session is None:
+			import requests
+			from requests.adapters import HTTPAdapter
+			from urllib3.util.retry import Retry
+
+			retry = Retry(total=RETRIES, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+			adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+			_session = requests.Session()
+			_session.mount("http://", adapter)
+			_session.mount("https://", adapter)
+		return _session
+
+# Path of the file recording the validators (ETag / Last-Modified) of a downloaded or partially downloaded file
+def get_state_path(path):
+	return path + ".download.json"
+
+def get_part_path(path):
+	return path + ".part"
+
+def read_state(path):
+	try:
+		with open(get_state_path(path), "r") as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+def write_state(path, state):
+	with open(get_state_path(path), "w") as f:
+		json.dump(state, f)
+
+# Split a checksum of the form ALGORITHM:HEXDIGEST, for example sha256:9f86d0…
+# @return	tuple (hashlib algorithm name, lowercase hex digest)
+def parse_checksum(checksum):
+	algorithm, sep, digest = checksum.partition(":")
+	if not sep or algorithm.lower() not in hashlib.algorithms_available:
+		raise ValueError(f"invalid checksum {checksum!r}, must be ALGORITHM:HEXDIGEST")
+	return algorithm.lower(), digest.strip().lower()
+
+# Fetch a checksum file like the .md5 files published next to the Geofabrik extracts
+# @return	checksum of the form ALGORITHM:HEXDIGEST, the algorithm is taken from the file extension
+def fetch_checksum(url, session=None):
+	session = session or get_session()
+	response = session.get(url, timeout=TIMEOUT)
+	if response.status_code >= 400:
+		raise DownloadError(f"Request to {url} failed with status code {response.status_code}")
+	algorithm = url.rsplit(".", 1)[-1].lower()
+	tokens = response.text.split()
+	if not tokens:
+		raise DownloadError(f"checksum file {url} is empty")
+	return f"{algorithm}:{tokens[0]}"
+
+def _hash_file(path, algorithm):
+	digest = hashlib.new(algorithm)
+	with open(path, "rb") as f:
+		while True:
+			block = f.read(CHUNK_SIZE)
+			if not block:
+				break
+			digest.update(block)
+	return digest
+
+def _get_validators(response):
+	return {"etag": response.headers.get("ETag"), "last-modified": response.headers.get("Last-Modified")}
+
+# Download url to path, unless the remote file didn't change since the last download. Partially downloaded files
+# are resumed with a range request. The data is written to path.part first and moved to path once complete.
+# @param checksum	expected checksum of the complete file, ALGORITHM:HEXDIGEST, or None to not verify it
+# @param force	download the whole file again even if it is up to date
+# @param report	Progress to add the downloaded bytes to, None for no progress output
+# @param lock	lock to hold while updating report, for reports shared between threads
+# @return	DOWNLOADED, RESUMED or NOT_MODIFIED
+def download_file(url, path, checksum=None, force=False, session=None, chunk_size=CHUNK_SIZE, report=None, lock=None):
+	import requests
+
+	try:
+		return _download_file(url, path, checksum, force, session or get_session(), chunk_size, report, lock)
+	except requests.RequestException as e:
+		# what was written so far stays in the part file and is resumed next time
+		raise DownloadError(f"downloading {url} failed: {e}") from e
+
+def _download_file(url, path, checksum, force, session, chunk_size, report, lock):
+	part_path = get_part_path(path)
+	state = read_state(path)
+	if state.get("url") != url:
+		state = {}
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+	# byte offsets and checksums refer to the file as stored on the server
+	headers = {"Accept-Encoding": "identity"}
+	offset = 0
+	complete = os.path.exists(path) and state.get("complete")
+	if complete and not force:
+		# only send the body if the remote file changed
+		if state.get("etag"):
+			headers["If-None-Match"] = state["etag"]
+		if state.get("last-modified"):
+			headers["If-Modified-Since"] = state["last-modified"]
+	elif os.path.exists(part_path) and not force and (state.get("etag") or state.get("last-modified")):
+		# resume, but only if the part is of the same version of the remote file - else the server sends the whole file
+		offset = os.path.getsize(part_path)
+		headers["Range"] = f"bytes={offset}-"
+		headers["If-Range"] = state.get("etag") or state["last-modified"]
+
+	with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+		if response.status_code == 304:
+			return NOT_MODIFIED
+		if response.status_code == 416 and offset:
+			# the part is already complete
+			pass
+		elif response.status_code >= 400:
+			raise DownloadError(f"Request to {url} failed with status code {response.status_code}")
+
+		validators = _get_validators(response)
+		length = response.headers.get("Content-Length")
+		length = int(length) if length is not None else None
+		if complete and not force and response.status_code == 200 and \
+			(validators["etag"] or validators["last-modified"]) and \
+			validators == dict((key, state.get(key)) for key in validators) and length == os.path.getsize(path):
+			# the server ignores conditional requests but the file is unchanged
+			return NOT_MODIFIED
+
+		if response.status_code == 206:
+			if not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+				os.remove(part_path)
+				raise DownloadError(f"server sent an unexpected range {response.headers.get('Content-Range')!r} for {url}")
+			mode = "ab"
+			result = RESUMED
+		elif response.status_code == 416:
+			mode = None
+			result = RESUMED
+		else:
+			mode = "wb"
+			offset = 0
+			result = DOWNLOADED
+			write_state(path, dict(validators, url=url, complete=False))
+
+		if report is not None and length is not None and mode is not None:
+			with lock or _report_lock:
+				report.total = (report.total or 0) + length + (offset if mode == "ab" else 0)
+				report.update(offset if mode == "ab" else 0)
+		if mode is not None:
+			with open(part_path, mode) as f:
+				for chunk in response.iter_content(chunk_size=chunk_size):
+					f.write(chunk)
+					if report is not None:
+						with lock or _report_lock:
+							report.update(len(chunk))
+
+	size = os.path.getsize(part_path)
+	if length is not None and mode is not None and size != offset + length:
+		raise DownloadError(f"download of {url} is incomplete, got {size - offset} of {length} bytes")
+	if checksum:
+		algorithm, expected = parse_checksum(checksum)
+		actual = _hash_file(part_path, algorithm).hexdigest()
+		if actual != expected:
+			# the part can't be resumed anymore
+			os.remove(part_path)
+			raise DownloadError(f"checksum mismatch for {url}: expected {algorithm}:{expected}, got {algorithm}:{actual}")
+
+	os.replace(part_path, path)
+	state = read_state(path)
+	state.update(url=url, complete=True, size=size)
+	write_state(path, state)
+	return result
+
+# Download many files at the same time, over a shared connection pool
+# @param downloads	iterable of (url, path) or (url, path, checksum) tuples
+# @param jobs	number of files downloaded at the same time
+# @param description	description of the progress report, None for no progress output
+# @return	dict mapping paths to the result of download_file or the DownloadError raised for them
+def download_files(downloads, jobs=4, force=False, description="Downloading", chunk_size=CHUNK_SIZE):
+	session = get_session()
+	lock = threading.Lock()
+	results = {}
+	with Progress(description or "", unit="B", scale=True, mode=None if description else MODE_NONE) as report:
+		with concurrent.futures.ThreadPoolExecutor(max(1, jobs)) as executor:
+			futures = {}
+			for download in downloads:
+				url, path = download[:2]
+				checksum = download[2] if len(download) > 2 else None
+				futures[executor.submit(download_file, url, path, checksum, force, session, chunk_size, report, lock)] = path
+			for future in concurrent.futures.as_completed(futures):
+				path = futures[future]
+				try:
+					results[path] = future.result()
+				except DownloadError as e:
+					results[path] = e
+					with lock:
+						report.message(str(e))
+						report.count("failed")
+	return results
@@ -2,13 +2,14 @@
 #-*- coding:utf-8 -*-
 
 import os
+import sys
 import logging
-import requests
-import datetime
-import dateutil.parser
+import tempfile
+import contextlib
+import warnings
 
 from fgtools.utils import isiterable, download
-from fgtools.utils.constants import CACHEDIR
+from fgtools.utils import constants
 
 def find_input_files(paths, prefix="", suffix=""):
 	if not isiterable(paths):
@@ -29,6 +30,44 @@ def find_input_files(paths, prefix="", suffix=""):
 	
 	return files
 
+# Open a temporary file in the directory of path for writing, which replaces path once the with block completes,
+# so readers and interrupted runs only ever see either the old or the complete new file. The temporary file is
+# removed if the with block fails.
+@contextlib.contextmanager
+def open_atomic(path, mode="w", buffering=-1):
+	directory, name = os.path.split(os.path.abspath(path))
+	fd, tmppath = tempfile.mkstemp(prefix="." + name + ".", suffix=".tmp", dir=directory)
+	try:
+		with os.fdopen(fd, mode, buffering=buffering) as f:
+			yield f
+		if os.path.exists(path):
+			os.chmod(tmppath, os.stat(path).st_mode & 0o7777)
+		else:
+			umask = os.umask(0)
+			os.umask(umask)
+			os.chmod(tmppath, 0o666 & ~umask)
+		os.replace(tmppath, path)
+	except BaseException:
+		if os.path.exists(tmppath):
+			os.remove(tmppath)
+		raise
+
+# Write data to path atomically, see open_atomic
+def write_atomic(path, data, mode="w"):
+	with open_atomic(path, mode) as f:
+		f.write(data)
+
+# Number of bytes of all files below path
+def get_tree_size(path):
+	size = 0
+	for root, dirs, files in os.walk(path):
+		for name in files:
+			try:
+				size += os.lstat(os.path.join(root, name)).st_size
+			except OSError:
+				pass
+	return size
+
 def write_xml_header(f):
 	f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
 
@@ -72,12 +111,14 @@ def check_exists(path, exit=True, type="file", create=True):
 			func(f"Path {path} does not exist - {action} !")
 			return 0
 
-def get_cached_file(url, path=None, progress=True, prolog="Downloading '{path}' - ", blocksize=1000):
-	path = path or os.path.join(CACHEDIR, url.replace("/", "_"))
+def get_cached_file(url, path=None, progress=True, prolog="Downloading '{path}' - ", blocksize=None):
+	path = path or os.path.join(constants.CACHEDIR, url.replace("/", "_"))
 	download(url, path, progress=progress, prolog=prolog, blocksize=blocksize)
 	return path
 
+# Deprecated, fgtools.utils.buildcache.BuildCache tracks whether outputs are up to date
 def get_newest_mtime(paths, prefix="", suffix=""):
+	warnings.warn("get_newest_mtime is deprecated, use fgtools.utils.buildcache.BuildCache", DeprecationWarning, stacklevel=2)
 	if not isiterable(paths):
 		if isinstance(paths, str):
 			paths = [paths]
@@ -88,4 +129,3 @@ def get_newest_mtime(paths, prefix="", suffix=""):
 	if not files:
 		return 99999999999999999999999999999999999999999999999999999999999
 	return max(map(os.path.getmtime, files))
-
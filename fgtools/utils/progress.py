@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import json
+import os
+import sys
+import time
+
+# Progress output modes
+# text: one line rewritten in place on a terminal, plain lines at a longer interval when output is redirected
+MODE_TEXT = "text"
+# json: one JSON object per line on stderr, for batch jobs and log collectors
+MODE_JSON = "json"
+# none: no progress output at all, messages are still printed
+MODE_NONE = "none"
+MODES = (MODE_TEXT, MODE_JSON, MODE_NONE)
+
+# Environment variable selecting the mode when the --progress option isn't given
+MODE_ENV = "FGTOOLS_PROGRESS"
+
+# Minimum number of seconds between two rendered updates, on a terminal and when output is redirected
+INTERVAL = 0.5
+REDIRECTED_INTERVAL = 30
+
+_mode = None
+# Progress objects that haven't been closed yet, the last one owns the progress line
+_active = []
+
+def get_mode():
+	if _mode:
+		return _mode
+	mode = os.environ.get(MODE_ENV, MODE_TEXT)
+	return mode if mode in MODES else MODE_TEXT
+
+def set_mode(mode):
+	global _mode
+	if mode is not None and mode not in MODES:
+		raise ValueError(f"unknown progress mode {mode!r}, must be one of {', '.join(MODES)}")
+	_mode = mode
+
+# Add the --progress option to a command line parser, pass the parsed arguments to apply_args afterwards
+def add_argument(argp):
+	argp.add_argument(
+		"--progress",
+		help=f"How to report progress - text rewrites one line on the terminal, json prints one JSON object per line to stderr, none prints nothing. Default is text, or the value of {MODE_ENV}",
+		choices=MODES
+	)
+
+def apply_args(args):
+	if getattr(args, "progress", None):
+		set_mode(args.progress)
+
+# Print a line of text, for example a warning, without garbling the progress line of the innermost running Progress
+def message(text):
+	if _active:
+		_active[-1].message(text)
+	else:
+		print(text)
+		sys.stdout.flush()
+
+def format_duration(seconds):
+	seconds = int(seconds)
+	if seconds >= 3600:
+		return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+	return f"{seconds // 60}:{seconds % 60:02d}"
+
+# Format a count, with an SI prefix if scale is set, for example 1.5 MB
+def format_count(value, unit="", scale=False):
+	if not scale:
+		return f"{value}{unit}"
+	for prefix in ["", "K", "M", "G", "T", "P"]:
+		if abs(value) < 1000 or prefix == "P":
+			break
+		value /= 1000
+	return f"{value:.1f} {prefix}{unit}" if prefix else f"{value:.0f} {unit}"
+
+def format_rate(rate, unit="", scale=False):
+	if scale:
+		return format_count(rate, unit, scale) + "/s"
+	if rate >= 100:
+		return f"{rate:.0f}{unit}/s"
+	return f"{rate:.1f}{unit}/s"
+
+# Progress of one step of a tool - counts done items and named counters (skipped, failed, …), and renders
+# percentage, throughput and ETA at most once per interval no matter how often it is updated
+class Progress:
+	def __init__(self, description, total=None, unit="", mode=None, interval=None, scale=False):
+		self.description = description
+		self.total = total
+		# appended to counts and rates, for example " airports" or "B"
+		self.unit = unit
+		# whether to render counts with SI prefixes, for byte counts
+		self.scale = scale
+		self.mode = mode or get_mode()
+		self.done = 0
+		self.counters = {}
+		self.status = ""
+		self.start = time.monotonic()
+		self.closed = False
+
+		if self.mode == MODE_TEXT:
+			self.stream = sys.stdout
+			self.tty = self.stream.isatty()
+		else:
+			self.stream = sys.stderr
+			self.tty = False
+		if interval is None:
+			interval = INTERVAL if self.tty or self.mode == MODE_JSON else REDIRECTED_INTERVAL
+		self.interval = interval
+		# on a terminal the line shows up right away, redirected output gets its first line after one interval
+		self._last_render = 0 if self.tty or self.mode == MODE_JSON else self.start
+		self._line_length = 0
+		_active.append(self)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	# Advance by n items, add the keyword arguments to the counters of the same name and replace the status text
+	def update(self, n=1, status=None, **counters):
+		self.done += n
+		for name, value in counters.items():
+			self.counters[name] = self.counters.get(name, 0) + value
+		if status is not None:
+			self.status = status
+		now = time.monotonic()
+		if now - self._last_render >= self.interval:
+			self._last_render = now
+			self._render("progress", now)
+
+	# Set the number of items done, for callbacks reporting absolute numbers
+	def set(self, done, status=None, **counters):
+		self.update(done - self.done, status, **counters)
+
+	def count(self, name, n=1):
+		self.counters[name] = self.counters.get(name, 0) + n
+
+	def elapsed(self, now=None):
+		return (now or time.monotonic()) - self.start
+
+	# Items per second since the start
+	def rate(self, now=None):
+		elapsed = self.elapsed(now)
+		return self.done / elapsed if elapsed > 0 else 0.0
+
+	# Estimated seconds until all items are done, None if unknown
+	def eta(self, now=None):
+		rate = self.rate(now)
+		if not self.total or rate <= 0:
+			return None
+		return max(0.0, (self.total - self.done) / rate)
+
+	# Print a line of text, for example a warning, without garbling the progress line
+	def message(self, text):
+		if self.mode == MODE_JSON:
+			self._emit({"event": "message", "task": self.description, "message": text, "time": time.time()})
+			return
+		if self._line_length:
+			self.stream.write("\r" + " " * self._line_length + "\r")
+			self._line_length = 0
+			# redraw the progress line with the next update
+			self._last_render = 0
+		self.stream.write(text + "\n")
+		self.stream.flush()
+
+	# Render the final state, called automatically when used as a context manager
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		if self in _active:
+			_active.remove(self)
+		self._render("done", time.monotonic())
+
+	def get_metrics(self, now=None):
+		now = now or time.monotonic()
+		eta = self.eta(now)
+		return {
+			"task": self.description,
+			"done": self.done,
+			"total": self.total,
+			"unit": self.unit.strip(),
+			"elapsed": round(self.elapsed(now), 3),
+			"rate": round(self.rate(now), 3),
+			"eta": round(eta, 3) if eta is not None else None,
+			"counters": dict(self.counters),
+			"status": self.status,
+		}
+
+	def format(self, now=None, final=False):
+		now = now or time.monotonic()
+		if self.total:
+			done = format_count(self.done, "", self.scale).strip() if self.scale else self.done
+			line = f"{self.description} … {self.done / self.total * 100:.1f}% ({done} of {format_count(self.total, self.unit, self.scale)}"
+		else:
+			line = f"{self.description} … {format_count(self.done, self.unit, self.scale)}"
+		if self.total:
+			line += "".join(f", {value} {name}" for name, value in self.counters.items()) + ")"
+		else:
+			line += "".join(f", {value} {name}" for name, value in self.counters.items())
+		if final:
+			line += f" in {format_duration(self.elapsed(now))}"
+		elif self.done:
+			line += f" - {format_rate(self.rate(now), self.unit, self.scale)}"
+			eta = self.eta(now)
+			if eta is not None:
+				line += f", ETA {format_duration(eta)}"
+		if self.status and not final:
+			line += f" - {self.status}"
+		return line
+
+	def _render(self, event, now):
+		if self.mode == MODE_NONE:
+			return
+		if self.mode == MODE_JSON:
+			metrics = self.get_metrics(now)
+			metrics["event"] = event
+			metrics["time"] = time.time()
+			self._emit(metrics)
+			return
+
+		line = self.format(now, final=event == "done")
+		if self.tty:
+			padding = " " * max(0, self._line_length - len(line))
+			self.stream.write("\r" + line + padding + ("\n" if event == "done" else ""))
+			self._line_length = 0 if event == "done" else len(line)
+		else:
+			self.stream.write(line + "\n")
+		self.stream.flush()
+
+	def _emit(self, record):
+		self.stream.write(json.dumps(record) + "\n")
+		self.stream.flush()
+
+# Iterate over iterable while reporting progress, one item per iteration
+def track(iterable, description, total=None, unit="", mode=None):
+	if total is None and hasattr(iterable, "__len__"):
+		total = len(iterable)
+	with Progress(description, total, unit, mode) as progress:
+		for item in iterable:
+			yield item
+			progress.update()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import bisect
+import threading
+import concurrent.futures
+
+from fgtools import get_logger
+from fgtools.utils.progress import Progress
+from fgtools.utils import telemetry
+
+# Task states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# not run because a task it depends on failed
+SKIPPED = "skipped"
+
+# Raised by a task function to report a failure without a traceback in the log
+class TaskError(Exception):
+	pass
+
+# One unit of work of a build - a function call together with the files / directories it reads and writes.
+# A task depends on the tasks named in deps and on every task producing one of its inputs, and never runs
+# at the same time as another task writing the same outputs.
+# The signature, usually the command line the task runs, is recorded in the build cache - tasks without
+# one always run.
+class Task:
+	def __init__(self, name, func, args=(), kwargs=None, tool=None, inputs=(), outputs=(), deps=(), signature=None):
+		self.name = name
+		self.func = func
+		self.args = tuple(args)
+		self.kwargs = kwargs or {}
+		# name of the external tool the task runs, used for per-tool concurrency limits
+		self.tool = tool
+		self.inputs = [os.path.abspath(path) for path in inputs]
+		self.outputs = [os.path.abspath(path) for path in outputs]
+		self.deps = [dep.name if isinstance(dep, Task) else dep for dep in deps]
+		self.signature = signature
+		self.state = PENDING
+		self.result = None
+		self.error = None
+		# why the task ran, None if it was found up to date in the build cache
+		self.reason = None
+
+	def __repr__(self):
+		return f"Task({self.name!r}, tool={self.tool!r}, state={self.state!r})"
+
+	def run(self):
+		return self.func(*self.args, **self.kwargs)
+
+	# Run the task unless the build cache says it is up to date
+	# @param restore	function called with the task before it runs, to restore its inputs evicted from the workspace
+	# @return	whether the task actually ran
+	def run_cached(self, cache, restore=None):
+		if cache is None:
+			self.reason = "not cached"
+		elif self.signature is None:
+			# tasks without inputs, like downloads, only run again for evicted outputs once another task needs them
+			if self.outputs and not self.inputs and all(cache.is_evicted(path) for path in self.outputs):
+				self.reason = None
+				cache.track(self)
+				return False
+			self.reason = "not cached"
+		else:
+			self.reason = cache.check(self)
+			if self.reason is None:
+				cache.track(self)
+				return False
+		if restore is not None:
+			restore(self)
+		try:
+			self.result = self.run()
+		except BaseException:
+			if cache is not None:
+				cache.forget(self)
+			raise
+		if cache is not None:
+			if self.signature is not None:
+				cache.record(self)
+			cache.track(self)
+		return True
+
+# Whether two paths are the same or one contains the other
+def paths_overlap(a, b):
+	if a == b:
+		return True
+	return a.startswith(os.path.join(b, "")) or b.startswith(os.path.join(a, ""))
+
+# Directed acyclic graph of tasks, run on a thread pool as soon as their dependencies are done.
+# Tasks are expected to spend their time in subprocesses or I/O, so threads give real parallelism.
+class TaskGraph:
+	def __init__(self):
+		self.tasks = {}
+		# held while running tasks again to restore evicted files, one lock per task and per evicted path
+		self._restore_locks = {}
+		self._restore_lock = threading.Lock()
+		# names of the tasks run again to restore evicted files during the current run
+		self._restored = set()
+
+	def __len__(self):
+		return len(self.tasks)
+
+	def __iter__(self):
+		return iter(self.tasks.values())
+
+	def __getitem__(self, name):
+		return self.tasks[name]
+
+	def __contains__(self, name):
+		return name in self.tasks
+
+	# Add a task calling func(*args, **kwargs), see Task for the other parameters
+	# @return	the new Task
+	def add(self, name, func, *args, tool=None, inputs=(), outputs=(), deps=(), signature=None, **kwargs):
+		if name in self.tasks:
+			raise ValueError(f"duplicate task name {name!r}")
+		task = Task(name, func, args, kwargs, tool=tool, inputs=inputs, outputs=outputs, deps=deps, signature=signature)
+		self.tasks[name] = task
+		return task
+
+	# Names of the tasks a task has to wait for - the explicit ones and the producers of its inputs
+	# @param producers	dict mapping output paths to the names of the tasks writing them, built by _get_producers
+	# @param outputs	sorted list of all output paths
+	def get_dependencies(self, task, producers=None, outputs=None):
+		if producers is None:
+			producers, outputs = self._get_producers()
+		deps = set(task.deps)
+		for input in task.inputs:
+			# outputs equal to the input or one of its parent directories
+			path = input
+			while True:
+				deps.update(producers.get(path, ()))
+				parent = os.path.dirname(path)
+				if parent == path:
+					break
+				path = parent
+			# outputs inside the input directory
+			prefix = os.path.join(input, "")
+			for i in range(bisect.bisect_left(outputs, prefix), len(outputs)):
+				if not outputs[i].startswith(prefix):
+					break
+				deps.update(producers[outputs[i]])
+		deps.discard(task.name)
+		return deps
+
+	def _get_producers(self):
+		producers = {}
+		for task in self.tasks.values():
+			for output in task.outputs:
+				producers.setdefault(output, []).append(task.name)
+		return producers, sorted(producers)
+
+	# Dependencies of every task, raises ValueError for unknown dependencies and cycles
+	# @return	dict mapping task names to sets of task names
+	def resolve(self):
+		producers, outputs = self._get_producers()
+		graph = dict((name, self.get_dependencies(task, producers, outputs)) for name, task in self.tasks.items())
+		for name, deps in graph.items():
+			unknown = deps - self.tasks.keys()
+			if unknown:
+				raise ValueError(f"task {name!r} depends on unknown tasks {', '.join(sorted(unknown))}")
+
+		# tasks producing each other's inputs would wait for each other forever
+		visiting, visited = set(), set()
+		def visit(name, path):
+			if name in visited:
+				return
+			if name in visiting:
+				raise ValueError("dependency cycle: " + " -> ".join(path[path.index(name):] + [name]))
+			visiting.add(name)
+			for dep in sorted(graph[name]):
+				visit(dep, path + [name])
+			visiting.discard(name)
+			visited.add(name)
+		for name in graph:
+			visit(name, [])
+		return graph
+
+	# Run the producers of the files evicted from the workspace that a task about to run reads, recursively
+	# restoring the evicted files they read first. Evicted directories are restored by running all tasks writing them,
+	# also before a task writing into one runs, since the files the other tasks wrote there would be missing otherwise.
+	def _restore_inputs(self, task, cache, producers):
+		paths = [(path, None) for input in task.inputs for path, _ in cache.get_evicted(input)]
+		paths += [(output, task.name) for output in task.outputs if cache.is_evicted_directory(output)]
+		for path, writer in paths:
+			names = [name for name in producers.get(path, ()) if name != writer]
+			if not names and writer is None:
+				raise TaskError(f"{path} was evicted from the workspace and no task of this build writes it")
+			# the tasks writing a directory are restored together, by one thread
+			with self._get_restore_lock(path):
+				for name in names:
+					with self._get_restore_lock(name):
+						# restoring a task restores the other tasks writing the same directories, which come back to it
+						if name in self._restored:
+							continue
+						self._restored.add(name)
+						producer = self.tasks[name]
+						try:
+							self._restore_inputs(producer, cache, producers)
+							with telemetry.span(f"restore {producer.name}", producer.tool or "other"):
+								producer.run()
+						except BaseException:
+							self._restored.discard(name)
+							raise
+						if producer.signature is not None:
+							cache.record(producer)
+						cache.track(producer)
+	
+	# Lock held while restoring a task or the evicted path of that name - reentrant, as restoring the tasks writing
+	# a directory restores their inputs, which can lead back to the same directory
+	def _get_restore_lock(self, key):
+		with self._restore_lock:
+			return self._restore_locks.setdefault(key, threading.RLock())
+	
+	# Run a task on a worker thread, recorded as a span of the stage named after its tool if telemetry is recorded
+	def _run_task(self, task, cache, producers):
+		with telemetry.span(task.name, task.tool or "other") as record:
+			restore = None
+			if cache is not None:
+				def restore(task):
+					# the task runs anyway, restoring the other tasks writing its directories must not run it as well
+					self._restored.add(task.name)
+					self._restore_inputs(task, cache, producers)
+			ran = task.run_cached(cache, restore)
+			if record is not None:
+				record["up to date"] = not ran
+			return ran
+	
+	# Length of the longest chain of tasks waiting for each task, tasks with long chains behind them are started first
+	def _get_depths(self, dependents):
+		depths = {}
+		def depth(name):
+			if name not in depths:
+				depths[name] = 1 + max((depth(dependent) for dependent in dependents[name]), default=0)
+			return depths[name]
+		for name in self.tasks:
+			depth(name)
+		return depths
+
+	# Run all pending tasks. Tasks whose dependencies failed are skipped, everything else keeps running.
+	# @param jobs	maximum number of tasks running at the same time
+	# @param limits	dict mapping tool names to the maximum number of tasks of that tool running at the same time
+	# @param description	description of the progress report
+	# @param cache	BuildCache deciding which tasks are up to date and can be skipped, None to run all tasks
+	# @param explain	print why each task that isn't up to date ran
+	# @param mode	progress mode, see fgtools.utils.progress
+	# @return	True if all tasks succeeded
+	def run(self, jobs=1, limits=None, description="Running tasks", cache=None, explain=False, mode=None):
+		limits = limits or {}
+		graph = self.resolve()
+		producers, _ = self._get_producers()
+		self._restored = set()
+		dependents = dict((name, set()) for name in graph)
+		for name, deps in graph.items():
+			for dep in deps:
+				dependents[dep].add(name)
+		depths = self._get_depths(dependents)
+		order = dict((name, i) for i, name in enumerate(self.tasks))
+
+		waiting = dict((name, set(dep for dep in deps if self.tasks[dep].state != DONE))
+					for name, deps in graph.items() if self.tasks[name].state == PENDING)
+		ready = [name for name, deps in waiting.items() if not deps]
+		running = {}
+		tool_counts = {}
+
+		def skip_dependents(name):
+			for dependent in dependents[name]:
+				task = self.tasks[dependent]
+				if task.state == PENDING:
+					task.state = SKIPPED
+					waiting.pop(dependent, None)
+					report.update(0, skipped=1)
+					skip_dependents(dependent)
+
+		def can_start(task):
+			if task.tool is not None and tool_counts.get(task.tool, 0) >= limits.get(task.tool, jobs):
+				return False
+			return not any(paths_overlap(output, other)
+						for other_task in running.values() for other in other_task.outputs for output in task.outputs)
+
+		report = Progress(description, len(waiting), " tasks", mode=mode)
+		executor = concurrent.futures.ThreadPoolExecutor(max(1, jobs))
+		try:
+			while ready or running:
+				ready.sort(key=lambda name: (-depths[name], order[name]))
+				for name in list(ready):
+					if len(running) >= jobs:
+						break
+					task = self.tasks[name]
+					if not can_start(task):
+						continue
+					ready.remove(name)
+					del waiting[name]
+					task.state = RUNNING
+					tool_counts[task.tool] = tool_counts.get(task.tool, 0) + 1
+					running[executor.submit(self._run_task, task, cache, producers)] = task
+				if not running:
+					# only reachable with a tool limit of 0
+					raise ValueError(f"cannot start any of the tasks {', '.join(ready)} within the tool limits")
+				report.update(0, status=", ".join(sorted(task.name for task in running.values())))
+
+				finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+				for future in finished:
+					task = running.pop(future)
+					tool_counts[task.tool] -= 1
+					try:
+						ran = future.result()
+					except BaseException as e:
+						if isinstance(e, KeyboardInterrupt):
+							raise
+						task.state = FAILED
+						task.error = e
+						if not isinstance(e, (TaskError, SystemExit)):
+							get_logger().exception(f"Task {task.name} failed", exc_info=e)
+						else:
+							report.message(f"Task {task.name} failed" + (f": {e}" if isinstance(e, TaskError) else ""))
+						report.update(0, failed=1)
+						skip_dependents(task.name)
+						continue
+					task.state = DONE
+					if ran:
+						report.update()
+						if explain:
+							report.message(f"{task.name}: {task.reason}")
+					else:
+						report.update(1, **{"up to date": 1})
+					for dependent in dependents[task.name]:
+						if dependent in waiting:
+							waiting[dependent].discard(task.name)
+							if not waiting[dependent] and dependent not in ready:
+								ready.append(dependent)
+		finally:
+			for future in running:
+				future.cancel()
+			executor.shutdown(wait=True)
+			report.close()
+
+		return all(task.state == DONE for task in self.tasks.values())
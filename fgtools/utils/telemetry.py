@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import subprocess
+
+from fgtools.utils.progress import format_count, format_duration
+
+# Record categories
+# a step of a tool running in this process, for example a build task or a planning step
+SPAN = "span"
+# an external command, recorded within the span that ran it
+COMMAND = "command"
+
+# Recorder that spans and commands are currently recorded to, None if nothing is recorded
+_recorder = None
+# innermost span of each thread, commands add their resource use to it
+_local = threading.local()
+
+def get_recorder():
+	return _recorder
+
+# Bytes read and written through system calls (rchar / wchar) by a process or thread, from its /proc/…/io file
+# @return	tuple (read, written), None where /proc isn't available
+def _read_proc_io(path):
+	try:
+		with open(path, "r") as f:
+			values = dict(line.split(":", 1) for line in f if ":" in line)
+		return int(values["rchar"]), int(values["wchar"])
+	except (OSError, KeyError, ValueError):
+		return None
+
+def _get_thread_io():
+	if not hasattr(threading, "get_native_id"):
+		return None
+	return _read_proc_io(f"/proc/self/task/{threading.get_native_id()}/io")
+
+def _get_exit_code(status):
+	if os.WIFSIGNALED(status):
+		return -os.WTERMSIG(status)
+	return os.WEXITSTATUS(status)
+
+# Record the wall time, CPU time and bytes read / written of the code inside the with block, together with
+# the resource use of all commands run_process runs inside it on the same thread
+# @param stage	name of the stage to group the span under in the summary, for example the tool of a build task
+# @return	context manager yielding the record dict, to add custom fields to, or None if nothing is recorded
+@contextlib.contextmanager
+def span(name, stage=None):
+	recorder = _recorder
+	if recorder is None:
+		yield None
+		return
+
+	parent = getattr(_local, "span", None)
+	record = {"name": name, "category": SPAN, "stage": stage or name, "parent": parent["name"] if parent else None,
+		"tid": threading.get_ident(), "cpu": 0.0, "max_rss": 0, "read": 0, "written": 0, "commands": 0}
+	# resource use of the commands run within the span, nested spans pass theirs on to their parent
+	record["_children"] = children = {"cpu": 0.0, "max_rss": 0, "read": 0, "written": 0, "commands": 0}
+	_local.span = record
+	io = _get_thread_io()
+	cpu = time.thread_time()
+	record["start"] = recorder.get_time()
+	try:
+		yield record
+	except BaseException as e:
+		record["error"] = f"{type(e).__name__}: {e}"
+		raise
+	finally:
+		record["end"] = recorder.get_time()
+		record["wall"] = record["end"] - record["start"]
+		del record["_children"]
+		record["cpu"] = time.thread_time() - cpu
+		end_io = _get_thread_io()
+		if io is not None and end_io is not None:
+			record["read"] = end_io[0] - io[0]
+			record["written"] = end_io[1] - io[1]
+		with recorder.lock:
+			_add_usage(record, children)
+			if parent is not None and "_children" in parent:
+				# spans nested on the same thread already count in the CPU time and bytes of their parent
+				_add_usage(parent["_children"], children if parent["tid"] == record["tid"] else record)
+		_local.span = parent
+		recorder.add(record)
+
+# Wrap func to run in a span nested in the span that is current when wrap is called, for work handed to other
+# threads, like thread pools within a build task
+def wrap(func, name=None):
+	if _recorder is None:
+		return func
+	parent = getattr(_local, "span", None)
+	def wrapper(*args, **kwargs):
+		previous = getattr(_local, "span", None)
+		_local.span = parent
+		try:
+			with span(name or func.__name__, parent["stage"] if parent else None):
+				return func(*args, **kwargs)
+		finally:
+			_local.span = previous
+	return wrapper
+
+def _add_usage(totals, usage):
+	totals["cpu"] += usage["cpu"]
+	totals["max_rss"] = max(totals["max_rss"], usage["max_rss"])
+	totals["read"] += usage["read"]
+	totals["written"] += usage["written"]
+	totals["commands"] += usage.get("commands", 1)
+
+# Run a command and wait for it like subprocess.run with stdout=PIPE and stderr=STDOUT, recording its wall time,
+# CPU time, peak memory and bytes read / written when a Recorder is active
+# @param name	name of the command in the recording, default is the name of the executable
+# @return	tuple (return code, output)
+def run_process(cmd, name=None, shell=False, env=None):
+	recorder = _recorder
+	if recorder is None or not hasattr(os, "wait4"):
+		p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=shell, env=env)
+		return p.returncode, p.stdout
+
+	if name is None:
+		name = os.path.basename((cmd.split() or [""])[0] if isinstance(cmd, str) else cmd[0]).strip("\"'")
+	start = recorder.get_time()
+	p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=shell, env=env)
+	try:
+		output = p.stdout.read()
+		p.stdout.close()
+		io = None
+		if hasattr(os, "waitid"):
+			# wait without reaping, the I/O counters of the process are gone once it is reaped
+			os.waitid(os.P_PID, p.pid, os.WEXITED | os.WNOWAIT)
+			io = _read_proc_io(f"/proc/{p.pid}/io")
+		_, status, usage = os.wait4(p.pid, 0)
+		p.returncode = _get_exit_code(status)
+	except BaseException:
+		p.kill()
+		p.wait()
+		raise
+
+	end = recorder.get_time()
+	parent = getattr(_local, "span", None)
+	record = {
+		"name": name, "category": COMMAND, "stage": parent["stage"] if parent else name, "parent": parent["name"] if parent else None,
+		"tid": threading.get_ident(), "start": start, "end": end, "wall": end - start,
+		"cpu": usage.ru_utime + usage.ru_stime,
+		# kilobytes on Linux, bytes on macOS
+		"max_rss": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+		"read": io[0] if io else usage.ru_inblock * 512,
+		"written": io[1] if io else usage.ru_oublock * 512,
+		"returncode": p.returncode,
+		"command": cmd if isinstance(cmd, str) else " ".join(cmd),
+	}
+	if parent is not None and "_children" in parent:
+		with recorder.lock:
+			_add_usage(parent["_children"], record)
+	recorder.add(record)
+	return p.returncode, output
+
+# Collects the records of spans and commands while active, as a context manager. Only one recorder is active at
+# a time, spans and commands outside of it aren't recorded.
+class Recorder:
+	def __init__(self):
+		self.records = []
+		self.lock = threading.Lock()
+		self.start = time.perf_counter()
+		self.start_time = time.time()
+		self.end = None
+		self._previous = None
+
+	def __enter__(self):
+		global _recorder
+		self._previous = _recorder
+		_recorder = self
+		return self
+
+	def __exit__(self, *args):
+		global _recorder
+		_recorder = self._previous
+		self.end = time.perf_counter()
+
+	# Seconds since the recorder was created
+	def get_time(self):
+		return time.perf_counter() - self.start
+
+	def add(self, record):
+		with self.lock:
+			self.records.append(record)
+
+	# Totals of the outermost spans of each stage - the time between the start of the first and the end of the last
+	# one, the sum of their wall times, CPU times (including their commands) and bytes, and their peak memory
+	# @return	dict mapping stage names to dicts, in the order the stages started
+	def get_stages(self):
+		stages = {}
+		with self.lock:
+			records = sorted(self.records, key=lambda record: record["start"])
+		for record in records:
+			if record["category"] != SPAN or record["parent"] is not None:
+				continue
+			stage = stages.setdefault(record["stage"], {"spans": 0, "commands": 0, "start": record["start"], "end": record["end"],
+				"wall": 0.0, "cpu": 0.0, "max_rss": 0, "read": 0, "written": 0, "errors": 0})
+			stage["spans"] += 1
+			stage["start"] = min(stage["start"], record["start"])
+			stage["end"] = max(stage["end"], record["end"])
+			for key in ("wall", "cpu", "read", "written", "commands"):
+				stage[key] += record[key]
+			stage["max_rss"] = max(stage["max_rss"], record["max_rss"])
+			stage["errors"] += 1 if "error" in record else 0
+		for stage in stages.values():
+			stage["elapsed"] = stage["end"] - stage["start"]
+		return stages
+
+	# Upper bound of the memory used by commands running at the same time - the largest sum of the peak memory
+	# of overlapping commands
+	def get_peak_rss(self):
+		events = []
+		with self.lock:
+			for record in self.records:
+				if record["category"] == COMMAND:
+					events.append((record["start"], 1, record["max_rss"]))
+					events.append((record["end"], 0, -record["max_rss"]))
+		peak = current = 0
+		# ends sort before starts at the same time
+		for _, _, rss in sorted(events):
+			current += rss
+			peak = max(peak, current)
+		return peak
+
+	def get_report(self):
+		end = self.end if self.end is not None else time.perf_counter()
+		with self.lock:
+			records = sorted(self.records, key=lambda record: record["start"])
+		return {
+			"start": self.start_time,
+			"wall": end - self.start,
+			"peak_rss": self.get_peak_rss(),
+			"stages": self.get_stages(),
+			"records": records,
+		}
+
+	def write_report(self, path):
+		from fgtools.utils.files import write_atomic
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		write_atomic(path, json.dumps(self.get_report(), indent="\t"))
+
+	# Write the records in the trace event format, which chrome://tracing, Perfetto and speedscope open as a timeline /
+	# flame graph - one row per thread, with the commands nested in the spans that ran them
+	def write_trace(self, path):
+		from fgtools.utils.files import write_atomic
+		pid = os.getpid()
+		events = []
+		with self.lock:
+			records = sorted(self.records, key=lambda record: record["start"])
+		for record in records:
+			args = dict((key, value) for key, value in record.items() if key not in ("name", "category", "tid", "start", "end", "wall"))
+			events.append({"name": record["name"], "cat": record["category"], "ph": "X", "pid": pid, "tid": record["tid"],
+				"ts": round(record["start"] * 1e6), "dur": round(record["wall"] * 1e6), "args": args})
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+	# Table of the stages with their totals, see get_stages
+	def format_summary(self):
+		stages = self.get_stages()
+		width = max([len("Stage")] + [len(name) for name in stages])
+		lines = [f"{'Stage':<{width}}{'Tasks':>7}{'Elapsed':>10}{'Busy':>10}{'CPU':>10}{'Max RSS':>10}{'Read':>10}{'Written':>10}"]
+		for name, stage in stages.items():
+			lines.append(f"{name:<{width}}{stage['spans']:>7}{format_duration(stage['elapsed']):>10}{format_duration(stage['wall']):>10}" +
+				f"{format_duration(stage['cpu']):>10}{format_count(stage['max_rss'], 'B', True):>10}" +
+				f"{format_count(stage['read'], 'B', True):>10}{format_count(stage['written'], 'B', True):>10}")
+		report = self.get_report()
+		lines.append(f"Total {format_duration(report['wall'])}, peak memory of concurrent commands at most {format_count(report['peak_rss'], 'B', True)}")
+		return "\n".join(lines)
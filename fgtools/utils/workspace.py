@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+
+from fgtools.utils.files import get_tree_size
+
+# Extensions of the files making up a shapefile together with its .shp file
+SHAPEFILE_EXTENSIONS = (".shx", ".dbf", ".prj", ".cpg", ".qix")
+
+# Files that are useless without path and are evicted along with it, like the parts of a shapefile
+def get_companion_files(path):
+	stem, ext = os.path.splitext(path)
+	if ext.lower() == ".shp":
+		return [stem + extension for extension in SHAPEFILE_EXTENSIONS]
+	return []
+
+# Evict the least recently used files and output directories the build cache knows how to restore from the
+# workspace until it is no larger than budget. Evicted files keep their hash in the build cache, so builds stay
+# incremental - a file is only written again, by running the tasks that produced it, once a task that has to run
+# anyway needs it.
+# @param budget	maximum size of the workspace in bytes
+# @param dry_run	only return the files that would be evicted
+# @return	tuple (list of (path, bytes freed) tuples of the evicted files / directories, size of the workspace afterwards)
+def collect_garbage(workspace, cache, budget, dry_run=False):
+	size = get_tree_size(workspace)
+	evicted = []
+	if size <= budget:
+		return evicted, size
+	for path, used in cache.get_evictable(workspace):
+		if size <= budget:
+			break
+		extra_paths = get_companion_files(path)
+		if dry_run:
+			freed = sum(get_tree_size(file_path) if os.path.isdir(file_path) else os.path.getsize(file_path)
+				for file_path in [path] + extra_paths if os.path.exists(file_path))
+		else:
+			freed = cache.evict(path, extra_paths)
+		evicted.append((path, freed))
+		size -= freed
+	return evicted, size
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import os
+import pickle
+
+from fgtools import aptdat
+from fgtools.utils import constants
+from fgtools.aptdat import SurfaceCode, RunwayMarkingCode
+from fgtools.scenery.osm2aptdat import parse_surface_type
+
+def test_code_hashes_and_compares_like_its_int():
+	asphalt = SurfaceCode.Asphalt
+	assert asphalt == 1 and hash(asphalt) == hash(1)
+	assert 1 in {asphalt} and asphalt in {1}
+	assert {asphalt: "a"}.get(1) == "a" and {1: "a"}.get(asphalt) == "a"
+
+def test_code_does_not_compare_equal_to_its_name():
+	assert SurfaceCode.Asphalt != "Asphalt"
+	assert "Asphalt" not in {SurfaceCode.Asphalt}
+
+def test_codes_of_different_enums_with_the_same_value():
+	# both are 2 but mean different things
+	assert SurfaceCode.Concrete != RunwayMarkingCode.NonPrecision
+	assert SurfaceCode.Concrete == 2 and RunwayMarkingCode.NonPrecision == 2
+
+def test_code_enum_lookup():
+	asphalt = SurfaceCode.Asphalt
+	assert SurfaceCode["Asphalt"] is asphalt and SurfaceCode[1] is asphalt and SurfaceCode["1"] is asphalt
+	assert SurfaceCode[" 1"] is asphalt and SurfaceCode["01"] is asphalt
+	# unknown codes fall back to the default
+	assert SurfaceCode[99] is asphalt
+	assert "Grass" in SurfaceCode and 3 in SurfaceCode and "Tarmac" not in SurfaceCode
+
+def test_code_formatting():
+	asphalt = SurfaceCode.Asphalt
+	assert f"{asphalt}" == "1" and f"{asphalt:>3}" == "  1"
+	assert str(asphalt) == "Asphalt" and asphalt.code == 1
+
+def test_code_pickles():
+	asphalt = pickle.loads(pickle.dumps(SurfaceCode.Asphalt))
+	assert asphalt == SurfaceCode.Asphalt and asphalt.name == "Asphalt"
+
+def test_osm2aptdat_parses_surfaces_to_codes():
+	assert parse_surface_type("asphalt") is SurfaceCode.Asphalt
+	assert parse_surface_type("concrete") is SurfaceCode.Concrete
+	assert parse_surface_type("grass") is SurfaceCode.Grass
+	assert parse_surface_type("xyz") is None
+
+APTDAT = """I
+1130 test
+
+1 1000 0 0 ABCD Test A
+100 30 1 0 0.25 0 0 0 09 47.0 8.0 0 0 0 0 0 0 27 47.0 8.1 0 0 0 0 0 0
+
+1 500 0 0 EFGH Test B
+100 30 1 0 0.25 0 0 0 09 46.0 8.0 0 0 0 0 0 0 27 46.0 8.1 0 0 0 0 0 0
+
+99
+"""
+
+def test_file_record_source_copies_records_verbatim(tmp_path, monkeypatch):
+	monkeypatch.setattr(constants, "CACHEDIR", str(tmp_path / "cache"))
+	path = tmp_path / "apt.dat"
+	path.write_text(APTDAT)
+	with aptdat.FileRecordSource(str(path)) as source:
+		diff = aptdat.update_aptdat(source, str(tmp_path / "out"), num_threads=4)
+		assert not source._file.closed
+	assert source._file.closed
+	assert sorted(diff.added) == ["ABCD", "EFGH"]
+	for icao in ("ABCD", "EFGH"):
+		text = (tmp_path / "out" / (icao + ".dat")).read_text()
+		record = APTDAT.split("\n\n")[1 if icao == "ABCD" else 2]
+		assert record + "\n" in text
+
+def test_index_is_only_written_to_the_cache(tmp_path, monkeypatch):
+	monkeypatch.setattr(constants, "CACHEDIR", str(tmp_path / "cache"))
+	path = tmp_path / "input" / "apt.dat"
+	path.parent.mkdir()
+	path.write_text(APTDAT)
+	index = aptdat.AptDatIndex.load(str(path))
+	assert sorted(index.records) == ["ABCD", "EFGH"]
+	assert [p.name for p in path.parent.iterdir()] == ["apt.dat"]
+	index_path = aptdat.AptDatIndex.get_index_path(str(path))
+	assert os.path.dirname(index_path) == str(tmp_path / "cache" / "aptdat-index") and os.path.isfile(index_path)
+	assert aptdat.AptDatIndex.load(str(path)).records == index.records
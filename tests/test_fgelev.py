@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import pytest
+
+from fgtools import fgelev
+
+def test_parse_reply():
+	assert fgelev.parse_reply(b"3: 123.4\n") == (3, 123.4)
+	assert fgelev.parse_reply("12: -5\n") == (12, -5.0)
+
+@pytest.mark.parametrize("line", [b"3 123.4 extra\n", b"3:\n", b"x: 1.0\n", b"3: high\n", b""])
+def test_parse_reply_rejects_malformed_replies(line):
+	with pytest.raises(ValueError):
+		fgelev.parse_reply(line)
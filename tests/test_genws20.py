@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+from fgtools.geo import make_rectangle
+from fgtools.scenery.genws20 import plan_osm_extracts, snap_bbox
+
+def _overlap(a, b):
+	return a.left < b.right and b.left < a.right and a.bottom < b.top and b.bottom < a.top
+
+# every extract is decoded into the same material folders, overlaps would end up there twice
+def test_osm_extracts_do_not_overlap():
+	bboxes = [make_rectangle(0, 0, 0.5, 0.125), make_rectangle(0.25, 0.125, 0.375, 0.625)]
+	extracts = plan_osm_extracts(bboxes)
+	for i, a in enumerate(extracts):
+		for b in extracts[i + 1:]:
+			assert not _overlap(a, b)
+
+def test_osm_extracts_cover_the_bboxes():
+	bboxes = [make_rectangle(0, 0, 0.5, 0.125), make_rectangle(1, 1, 1.25, 1.25), make_rectangle(0.5, 0, 0.75, 0.2)]
+	extracts = plan_osm_extracts(bboxes)
+	assert len(extracts) == 2
+	for bbox in bboxes:
+		assert any(e.left <= bbox.left and bbox.right <= e.right and e.bottom <= bbox.bottom and bbox.top <= e.top for e in extracts)
+
+def test_snap_bbox():
+	bbox = snap_bbox(make_rectangle(0.1, 0.1, 0.3, 0.2))
+	assert (bbox.left, bbox.bottom, bbox.right, bbox.top) == (0, 0, 0.5, 0.25)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import random
+
+import pytest
+
+from fgtools import geo
+from fgtools.geo import make_rectangle
+
+def _overlaps(a, b):
+	return a.left < b.right and b.left < a.right and a.bottom < b.top and b.bottom < a.top
+
+# Tiles touched by bbox, found by sampling points inside it
+def _sample_tiles(bbox, samples=40):
+	tiles = set()
+	for i in range(samples + 1):
+		for j in range(samples + 1):
+			lon = min(bbox.left + (bbox.right - bbox.left) * i / samples, bbox.right - 1e-9)
+			lat = min(bbox.bottom + (bbox.top - bbox.bottom) * j / samples, bbox.top - 1e-9)
+			tiles.add(geo.fg_tile_index(lon, lat))
+	return tiles
+
+# bboxes spanning the latitudes where the tile span changes
+@pytest.mark.parametrize("band", [-62, -22, 22, 62])
+def test_fg_tile_indices_use_the_span_of_each_row(band):
+	rng = random.Random(band)
+	for _ in range(50):
+		lon = rng.uniform(-10, 10)
+		lat = band + rng.uniform(-1, 0.5)
+		bbox = make_rectangle(lon, lat, lon + rng.uniform(0.01, 1), lat + rng.uniform(0.01, 1))
+		tiles = geo.get_fg_tile_indices(bbox)
+		assert len(tiles) == len(set(tiles))
+		assert _sample_tiles(bbox) <= set(tiles)
+		for tile in tiles:
+			assert _overlaps(geo.fg_tile_bbox(*geo.fg_tile_coords(tile)), bbox)
+		assert set(tiles) == set(geo.get_fg_tile_indices_for_bboxes([[bbox.left, bbox.bottom, bbox.right, bbox.top]]).tolist())
+
+def test_fg_tile_paths():
+	assert geo.get_fg_tile_paths(make_rectangle(8.5, 47.375, 9.0, 47.5)) == ["e000n40/e008n47/3088986", "e000n40/e008n47/3088987"]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import re
+import sys
+import subprocess
+
+import pytest
+
+# Console scripts, the module they are loaded from and the maximum time in milliseconds importing it may take.
+# Tools only needing the standard library have tight budgets, the scenery tools all pull in numpy.
+IMPORT_BUDGETS_MS = {
+	"javaprop2jsbcpct": ("fgtools.aircraft.javaprop2jsbcpct", 100),
+	"vsphist2jsbtable": ("fgtools.aircraft.vsphist2jsbtable", 60),
+	"vspstab2jsbtable": ("fgtools.aircraft.vspstab2jsbtable", 60),
+	"coord-converter": ("fgtools.misc.coord_converter", 60),
+	"scrape-emanualonline": ("fgtools.misc.scrape_emanualonline", 400),
+	"scrape-scribd": ("fgtools.misc.scrape_scribd", 400),
+	"tabletool": ("fgtools.misc.tabletool", 60),
+	"aptdat2airportsxml": ("fgtools.scenery.aptdat2airportsxml", 400),
+	"create-day-night-xml": ("fgtools.scenery.create_day_night_xml", 60),
+	"dsftxt2stg": ("fgtools.scenery.dsftxt2stg", 400),
+	"edit-stg": ("fgtools.scenery.edit_stg", 400),
+	"fix-aptdat-icaos": ("fgtools.scenery.fix_aptdat_icaos", 400),
+	"index-stg": ("fgtools.scenery.index_stg", 400),
+	"genws20": ("fgtools.scenery.genws20", 400),
+	"osm2aptdat": ("fgtools.scenery.osm2aptdat", 400),
+	"pull-xplane-aptdat": ("fgtools.scenery.pull_xplane_aptdat", 400),
+	"stg2ufo": ("fgtools.scenery.stg2ufo", 400),
+	"ungap-btg": ("fgtools.scenery.ungap_btg", 400),
+}
+
+# Number of interpreters started per module, the fastest one counts
+RUNS = 3
+
+# Cumulative time in milliseconds it takes to import a module in a fresh interpreter, as reported by -X importtime
+def measure_import_time(module, runs=RUNS):
+	pattern = re.compile(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*" + re.escape(module) + r"$")
+	best = None
+	for i in range(runs):
+		result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+								stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+		assert result.returncode == 0, f"importing {module} failed:\n{result.stderr[-2000:]}"
+		for line in result.stderr.splitlines():
+			match = pattern.match(line)
+			if match:
+				ms = int(match.group(1)) / 1000
+				best = ms if best is None else min(best, ms)
+				break
+	return best
+
+def test_budgets_cover_all_console_scripts():
+	import configparser
+	import os
+	config = configparser.ConfigParser()
+	config.read(os.path.join(os.path.dirname(__file__), os.pardir, "setup.cfg"))
+	scripts = [line.split("=")[0].strip() for line in config["options.entry_points"]["console_scripts"].splitlines() if line.strip()]
+	assert sorted(scripts) == sorted(IMPORT_BUDGETS_MS)
+
+@pytest.mark.parametrize("script", sorted(IMPORT_BUDGETS_MS))
+def test_import_time(script):
+	module, budget = IMPORT_BUDGETS_MS[script]
+	ms = measure_import_time(module)
+	assert ms is not None, f"-X importtime reported nothing for {module}"
+	assert ms <= budget, f"importing {module} for {script} took {ms:.1f} ms, the budget is {budget} ms"
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+from fgtools import stg
+
+CONTENT = """# generated by hand
+OBJECT_SHARED Models/Airport/windsock.xml 8.50000000 47.25000000 100.0 90.00
+OBJECT_STATIC tower.ac   8.51 47.26 412 0.0
+OBJECT_BASE 3088986.btg
+"""
+
+def test_untouched_objects_are_written_back_unchanged():
+	stgfile = stg.STGFile().parse(CONTENT)
+	assert stgfile.format() == CONTENT
+
+def test_modified_objects_are_reformatted():
+	stgfile = stg.STGFile().parse(CONTENT)
+	windsock, tower, base = stgfile.get_objects()
+	tower.elev = 415.5
+	stgfile.add_object(stg.STGObject("OBJECT_SHARED", "Models/Misc/pole.xml", 8.52, 47.27, 410.0, 180.0))
+	lines = stgfile.format().splitlines()
+	assert lines[1] == "OBJECT_SHARED Models/Airport/windsock.xml 8.50000000 47.25000000 100.0 90.00"
+	assert lines[2] == "OBJECT_STATIC tower.ac 8.51 47.26 415.5 0"
+	assert lines[3] == "OBJECT_BASE 3088986.btg"
+	assert lines[4] == "OBJECT_SHARED Models/Misc/pole.xml 8.52 47.27 410 180"
+
+def test_setting_an_unchanged_value_keeps_the_line():
+	stgfile = stg.STGFile().parse(CONTENT)
+	windsock = next(stgfile.get_objects())
+	windsock.elev = 100
+	assert stgfile.format() == CONTENT
+
+DIRECTIVES = """# offset 5
+# skipnext
+OBJECT_SHARED a.xml 1 2 3 4
+# a plain comment
+OBJECT_SHARED b.xml 1 2 3 4
+# offset 2
+# a plain comment
+OBJECT_SHARED c.xml 1 2 3 4
+"""
+
+def test_directives_until_comment():
+	objects = list(stg.STGFile().parse(DIRECTIVES, stg.DIRECTIVES_UNTIL_COMMENT).get_objects())
+	assert [(object.offset, object.skip) for object in objects] == [(5.0, True), (0.0, False), (0.0, False)]
+
+def test_directives_next_object():
+	objects = list(stg.STGFile().parse(DIRECTIVES, stg.DIRECTIVES_NEXT_OBJECT).get_objects())
+	assert [(object.offset, object.skip) for object in objects] == [(5.0, True), (0.0, False), (2.0, False)]
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+from fgtools import stg
+from fgtools.scenery import stg2ufo
+
+def test_main_returns_the_exit_status(tmp_path, monkeypatch):
+	path = tmp_path / "3088986.stg"
+	path.write_text("# offset 2\nOBJECT_SHARED Models/Airport/windsock.xml 8.5 47.25 100 90\n")
+	output = tmp_path / "ufo.xml"
+	monkeypatch.setattr("sys.argv", ["stg2ufo", "-i", str(path), "-o", str(output)])
+	assert stg2ufo.main() == 0
+	assert "<object-line>OBJECT_SHARED Models/Airport/windsock.xml 8.5 47.25 102.0 90.0 0 0</object-line>" in output.read_text()
+
+def test_nothing_to_write_is_an_error(tmp_path):
+	stgfile = stg.STGFile(str(tmp_path / "3088986.stg")).parse("OBJECT_BASE 3088986.btg\n")
+	assert stg2ufo.write_xml_files([stgfile], [str(tmp_path / "ufo.xml")]) == 1
+	assert not (tmp_path / "ufo.xml").exists()
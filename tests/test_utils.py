@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+import pytest
+
+from fgtools import utils
+from fgtools.utils import files
+
+def test_padded_print_is_deprecated(capsys):
+	with pytest.deprecated_call():
+		utils.padded_print("abc", end="\n")
+	assert capsys.readouterr().out.startswith("abc")
+
+def test_timestamps_are_deprecated(tmp_path):
+	path = str(tmp_path / "output" / "file")
+	with pytest.deprecated_call():
+		assert utils.read_timestamp(path) == -1
+	with pytest.deprecated_call():
+		utils.write_timestamp(path)
+	with pytest.deprecated_call():
+		assert utils.read_timestamp(path) > 0
+
+def test_get_newest_mtime_is_deprecated(tmp_path):
+	(tmp_path / "a.txt").write_text("a")
+	with pytest.deprecated_call():
+		assert files.get_newest_mtime(str(tmp_path), suffix=".txt") == (tmp_path / "a.txt").stat().st_mtime